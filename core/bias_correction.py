@@ -13,6 +13,8 @@ import numpy as np
 from netCDF4 import Dataset
 
 from core import err_handler
+from core import row_threads
+from core import source_window
 
 PARAM_NX = 384
 PARAM_NY = 190
@@ -356,25 +358,6 @@ def ncar_sw_hrrr_bias_correct(input_forcings, geo_meta_wrf_hydro, config_options
         0.006758 * math.cos(2.0 * frac_year) + 0.000907 * math.sin(2.0 * frac_year) - \
         0.002697 * math.cos(3.0 * frac_year) + 0.001480 * math.sin(3.0 * frac_year)
 
-    # Create temporary grids for calculating the solar zenith angle, which will be used in the bias correction.
-    # time offset in minutes from the prime meridian
-    time_offset = eqtime + 4.0 * geo_meta_wrf_hydro.longitude_grid
-
-    # tst is the true solar time: the number of minutes since solar midnight
-    tst = hh * 60.0 + mm + ss / 60.0 + time_offset
-
-    # solar hour angle in radians: the amount the sun is off from due south
-    ha = d2r * ((tst / 4.0) - 180.0)
-
-    # solar zenith angle is the angle between straight up and the center of the sun's disc
-    # the cosine of the sol_zen_ang is proportional to the solar intensity
-    # (not accounting for humidity or cloud cover)
-    sol_zen_ang = r2d * np.arccos(np.sin(geo_meta_wrf_hydro.latitude_grid * d2r) * math.sin(decl) +
-                                  np.cos(geo_meta_wrf_hydro.latitude_grid * d2r) * math.cos(decl) * np.cos(ha))
-
-    # Check for any values greater than 90 degrees.
-    sol_zen_ang[np.where(sol_zen_ang > 90.0)] = 90.0
-
     # Extract the current incoming shortwave field from the forcing object and set it to
     # a local grid. We will perform the bias correction on this grid, based on forecast
     # hour and datetime information. Once a correction has taken place, we will place
@@ -388,23 +371,38 @@ def ncar_sw_hrrr_bias_correct(input_forcings, geo_meta_wrf_hydro, config_options
         err_handler.log_critical(config_options, mpi_config)
     err_handler.check_program_status(config_options, mpi_config)
 
-    # Calculate where we have valid values.
-    ind_valid = None
-    try:
-        ind_valid = np.where(sw_tmp != config_options.globalNdv)
-    except NumpyExceptions as npe:
-        config_options.errMsg = "Unable to run a search for valid SW values for: " + input_forcings.productName + \
-                                " (" + str(npe) + ")"
-        err_handler.log_critical(config_options, mpi_config)
-    err_handler.check_program_status(config_options, mpi_config)
+    # Calculate the solar zenith angle and perform the bias correction where we have valid
+    # values, one block of rows at a time.
+    def kernel(rows):
+        # Create temporary grids for calculating the solar zenith angle, which will be used in the bias correction.
+        # time offset in minutes from the prime meridian
+        time_offset = eqtime + 4.0 * geo_meta_wrf_hydro.longitude_grid[rows, :]
+
+        # tst is the true solar time: the number of minutes since solar midnight
+        tst = hh * 60.0 + mm + ss / 60.0 + time_offset
+
+        # solar hour angle in radians: the amount the sun is off from due south
+        ha = d2r * ((tst / 4.0) - 180.0)
+
+        # solar zenith angle is the angle between straight up and the center of the sun's disc
+        # the cosine of the sol_zen_ang is proportional to the solar intensity
+        # (not accounting for humidity or cloud cover)
+        lat_rad = geo_meta_wrf_hydro.latitude_grid[rows, :] * d2r
+        sol_zen_ang = r2d * np.arccos(np.sin(lat_rad) * math.sin(decl) +
+                                      np.cos(lat_rad) * math.cos(decl) * np.cos(ha))
+
+        # Check for any values greater than 90 degrees.
+        sol_zen_ang[np.where(sol_zen_ang > 90.0)] = 90.0
+
+        # The second half of this calculation below is the actual calculation of the incoming SW bias, which is
+        # then added (or subtracted if negative) to the original values.
+        sw_rows = sw_tmp[rows, :]
+        np.add(sw_rows, (c1 + (c2 * ((f_hr - 1) / (n_fcst_hr - 1)))) * np.cos(sol_zen_ang * d2r) * sw_rows,
+               out=sw_rows, where=(sw_rows != config_options.globalNdv))
 
     # Perform the bias correction.
     try:
-        # The second half of this calculation below is the actual calculation of the incoming SW bias, which is then
-        # added (or subtracted if negative) to the original values.
-        sw_tmp[ind_valid] = sw_tmp[ind_valid] + \
-                          (c1 + (c2 * ((f_hr - 1) / (n_fcst_hr - 1)))) * np.cos(sol_zen_ang[ind_valid] * d2r) * \
-                          sw_tmp[ind_valid]
+        row_threads.map_grid(kernel, sw_tmp)
     except NumpyExceptions as npe:
         config_options.errMsg = "Unable to apply NCAR HRRR bias correction to incoming shortwave radiation: " + \
                                 str(npe)
@@ -422,11 +420,6 @@ def ncar_sw_hrrr_bias_correct(input_forcings, geo_meta_wrf_hydro, config_options
 
     # Reset variables to keep memory footprints low.
     del sw_tmp
-    del time_offset
-    del tst
-    del ha
-    del sol_zen_ang
-    del ind_valid
 
 
 def ncar_temp_hrrr_bias_correct(input_forcings, config_options, mpi_config, force_num):
@@ -642,9 +635,6 @@ def ncar_wspd_hrrr_bias_correct(input_forcings, config_options, mpi_config, forc
     ugrid_in = input_forcings.final_forcings[input_forcings.input_map_output[ugrd_idx], :, :]
     vgrid_in = input_forcings.final_forcings[input_forcings.input_map_output[vgrd_idx], :, :]
 
-    wdir = np.arctan2(vgrid_in, ugrid_in)
-    wspd = np.sqrt(np.square(ugrid_in) + np.square(vgrid_in))
-
     # determine if we're in AnA or SR configuration
     if config_options.ana_flag == 1:
         hh -= config_options.output_freq / 60
@@ -672,14 +662,20 @@ def ncar_wspd_hrrr_bias_correct(input_forcings, config_options, mpi_config, forc
                          diurnal_ampl_SR * math.sin(diurnal_offs_SR + hh / 24 * 2*math.pi) + \
                          monthly_ampl_SR * math.sin(monthly_offs_SR + MM / 12 * 2*math.pi)
 
-    wspd = wspd + wspd_bias_corr
-    wspd = np.where(wspd < 0, 0, wspd)
-
-    ugrid_out = wspd * np.cos(wdir)
-    vgrid_out = wspd * np.sin(wdir)
+    # Calculate the bias-corrected wind component one block of rows at a time.
     # TODO: cache the "other" value so we don't repeat this calculation unnecessarily
+    bias_corrected = np.empty(ugrid_in.shape, input_forcings.final_forcings.dtype)
+    component = np.cos if force_num == ugrd_idx else np.sin
+
+    def kernel(rows):
+        wdir = np.arctan2(vgrid_in[rows, :], ugrid_in[rows, :])
+        wspd = np.sqrt(np.square(ugrid_in[rows, :]) + np.square(vgrid_in[rows, :]))
+
+        wspd = wspd + wspd_bias_corr
+        wspd = np.where(wspd < 0, 0, wspd)
 
-    bias_corrected = ugrid_out if force_num == ugrd_idx else vgrid_out
+        bias_corrected[rows, :] = wspd * component(wdir)
+    row_threads.map_grid(kernel, ugrid_in)
 
     wind_in = None
     try:
@@ -742,21 +738,23 @@ def ncar_wspd_gfs_bias_correct(input_forcings, config_options, mpi_config, force
     ugrid_in = input_forcings.final_forcings[input_forcings.input_map_output[ugrd_idx], :, :]
     vgrid_in = input_forcings.final_forcings[input_forcings.input_map_output[vgrd_idx], :, :]
 
-    wdir = np.arctan2(vgrid_in, ugrid_in)
-    wspd = np.sqrt(np.square(ugrid_in) + np.square(vgrid_in))
-
     wspd_bias_corr = wspd_net_bias_mr + wspd_fhr_mult_mr * fhr + \
                 wspd_diurnal_ampl_mr * math.sin(wspd_diurnal_offs_mr + hh / 24 * TWO_PI)
 
-    wspd = wspd + wspd_bias_corr
-    wspd = np.where(wspd < 0, 0, wspd)
+    # Calculate the bias-corrected wind component one block of rows at a time.
+    # TODO: cache the "other" value so we don't repeat this calculation unnecessarily
+    bias_corrected = np.empty(ugrid_in.shape, input_forcings.final_forcings.dtype)
+    component = np.cos if force_num == ugrd_idx else np.sin
 
-    ugrid_out = wspd * np.cos(wdir)
-    vgrid_out = wspd * np.sin(wdir)
+    def kernel(rows):
+        wdir = np.arctan2(vgrid_in[rows, :], ugrid_in[rows, :])
+        wspd = np.sqrt(np.square(ugrid_in[rows, :]) + np.square(vgrid_in[rows, :]))
 
-    # TODO: cache the "other" value so we don't repeat this calculation unnecessarily
+        wspd = wspd + wspd_bias_corr
+        wspd = np.where(wspd < 0, 0, wspd)
 
-    bias_corrected = ugrid_out if force_num == ugrd_idx else vgrid_out
+        bias_corrected[rows, :] = wspd * component(wdir)
+    row_threads.map_grid(kernel, ugrid_in)
 
     wind_in = None
     try:
@@ -1007,6 +1005,12 @@ def cfsv2_nldas_nwm_bias_correct(input_forcings, config_options, mpi_config, for
         if nldas_zero_pcp is not None:
             nldas_zero_pcp = np.flip(nldas_zero_pcp, axis=0)
 
+        # Crop the parameters to the CFSv2 source window covering the WRF-Hydro domain.
+        nldas_param_1 = source_window.read_field(nldas_param_1, input_forcings.src_window, time_index=None)
+        nldas_param_2 = source_window.read_field(nldas_param_2, input_forcings.src_window, time_index=None)
+        if nldas_zero_pcp is not None:
+            nldas_zero_pcp = source_window.read_field(nldas_zero_pcp, input_forcings.src_window, time_index=None)
+
     else:
         nldas_param_1 = None
         nldas_param_2 = None
@@ -1014,12 +1018,13 @@ def cfsv2_nldas_nwm_bias_correct(input_forcings, config_options, mpi_config, for
     err_handler.check_program_status(config_options, mpi_config)
 
     # Scatter NLDAS parameters
-    nldas_param_1_sub = mpi_config.scatter_array(input_forcings, nldas_param_1, config_options)
+    nldas_param_1_sub = mpi_config.share_array(input_forcings, nldas_param_1, config_options, 'NLDAS_PARAM_1')
     err_handler.check_program_status(config_options, mpi_config)
-    nldas_param_2_sub = mpi_config.scatter_array(input_forcings, nldas_param_2, config_options)
+    nldas_param_2_sub = mpi_config.share_array(input_forcings, nldas_param_2, config_options, 'NLDAS_PARAM_2')
     err_handler.check_program_status(config_options, mpi_config)
     if force_num == 4:
-        nldas_zero_pcp_sub = mpi_config.scatter_array(input_forcings, nldas_zero_pcp, config_options)
+        nldas_zero_pcp_sub = mpi_config.share_array(input_forcings, nldas_zero_pcp, config_options,
+                                                    'NLDAS_ZERO_PCP')
         err_handler.check_program_status(config_options, mpi_config)
     else:
         nldas_zero_pcp_sub = None
@@ -1170,6 +1175,15 @@ def cfsv2_nldas_nwm_bias_correct(input_forcings, config_options, mpi_config, for
             zero_pcp = np.flip(zero_pcp, axis=0)
             prev_zero_pcp = np.flip(prev_zero_pcp, axis=0)
 
+        # Crop the parameters to the CFSv2 source window covering the WRF-Hydro domain.
+        param_1 = source_window.read_field(param_1, input_forcings.src_window, time_index=None)
+        param_2 = source_window.read_field(param_2, input_forcings.src_window, time_index=None)
+        prev_param_1 = source_window.read_field(prev_param_1, input_forcings.src_window, time_index=None)
+        prev_param_2 = source_window.read_field(prev_param_2, input_forcings.src_window, time_index=None)
+        if force_num == 4:
+            zero_pcp = source_window.read_field(zero_pcp, input_forcings.src_window, time_index=None)
+            prev_zero_pcp = source_window.read_field(prev_zero_pcp, input_forcings.src_window, time_index=None)
+
     else:
         param_1 = None
         param_2 = None
@@ -1183,18 +1197,21 @@ def cfsv2_nldas_nwm_bias_correct(input_forcings, config_options, mpi_config, for
         config_options.statusMsg = "Scattering CFS parameter grids"
         err_handler.log_msg(config_options, mpi_config)
     # Scatter CFS parameters
-    cfs_param_1_sub = mpi_config.scatter_array(input_forcings, param_1, config_options)
+    cfs_param_1_sub = mpi_config.share_array(input_forcings, param_1, config_options, 'CFS_PARAM_1')
     err_handler.check_program_status(config_options, mpi_config)
-    cfs_param_2_sub = mpi_config.scatter_array(input_forcings, param_2, config_options)
+    cfs_param_2_sub = mpi_config.share_array(input_forcings, param_2, config_options, 'CFS_PARAM_2')
     err_handler.check_program_status(config_options, mpi_config)
-    cfs_prev_param_1_sub = mpi_config.scatter_array(input_forcings, prev_param_1, config_options)
+    cfs_prev_param_1_sub = mpi_config.share_array(input_forcings, prev_param_1, config_options,
+                                                  'CFS_PREV_PARAM_1')
     err_handler.check_program_status(config_options, mpi_config)
-    cfs_prev_param_2_sub = mpi_config.scatter_array(input_forcings, prev_param_2, config_options)
+    cfs_prev_param_2_sub = mpi_config.share_array(input_forcings, prev_param_2, config_options,
+                                                  'CFS_PREV_PARAM_2')
     err_handler.check_program_status(config_options, mpi_config)
     if force_num == 4:
-        cfs_zero_pcp_sub = mpi_config.scatter_array(input_forcings, zero_pcp, config_options)
+        cfs_zero_pcp_sub = mpi_config.share_array(input_forcings, zero_pcp, config_options, 'CFS_ZERO_PCP')
         err_handler.check_program_status(config_options, mpi_config)
-        cfs_prev_zero_pcp_sub = mpi_config.scatter_array(input_forcings, prev_zero_pcp, config_options)
+        cfs_prev_zero_pcp_sub = mpi_config.share_array(input_forcings, prev_zero_pcp, config_options,
+                                                       'CFS_PREV_ZERO_PCP')
         err_handler.check_program_status(config_options, mpi_config)
     else:
         cfs_prev_zero_pcp_sub = None
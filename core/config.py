@@ -28,6 +28,15 @@ class ConfigOptions:
         self.supp_precip_file_types = None
         self.supp_precip_param_dir = None
         self.input_force_mandatory = None
+        self.parallel_reads = 0
+        self.shared_static_fields = 0
+        self.grib2_reader = 0
+        self.prefetch_inputs = 0
+        self.prefetcher = None
+        self.input_staging_dir = None
+        self.input_staging_steps = 2
+        self.input_stager = None
+        self.threads_per_rank = 1
         self.supp_precip_mandatory = None
         self.number_inputs = None
         self.number_supp_pcp = None
@@ -37,6 +46,9 @@ class ConfigOptions:
         self.scratch_dir = None
         self.useCompression = 0
         self.useFloats = 0
+        self.parallel_output = 0
+        self.output_servers = 0
+        self.pipeline_depth = 1
         self.num_output_steps = None
         self.retro_flag = None
         self.realtime_flag = None
@@ -54,6 +66,8 @@ class ConfigOptions:
         self.look_back = None
         self.fcst_freq = None
         self.nFcsts = None
+        self.cycle_groups = 1
+        self.cycle_group = 0
         self.fcst_shift = None
         self.fcst_input_horizons = None
         self.fcst_input_offsets = None
@@ -63,6 +77,11 @@ class ConfigOptions:
         self.ignored_border_widths = None
         self.regrid_opt = None
         self.weightsDir = None
+        self.regrid_multi_var = 0
+        self.regrid_engine = 0
+        self.regrid_cache_size = 0
+        self.regrid_cache_dir = None
+        self.regrid_cache = None
         self.regrid_opt_supp_pcp = None
         self.config_path = config
         self.errMsg = None
@@ -199,6 +218,72 @@ class ConfigOptions:
                 err_handler.err_out_screen('Invalid InputMandatory chosen in the configuration file. Please'
                                            ' choose a value of 0 or 1 for each corresponding input forcing.')
 
+        # Read in the parallel read flag (optional). When set, each processor reads its own
+        # hyperslab of input and geogrid fields instead of rank 0 reading and scattering.
+        try:
+            self.parallel_reads = int(config['Input']['ParallelReads'])
+        except (KeyError, configparser.NoOptionError):
+            self.parallel_reads = 0
+        except ValueError:
+            err_handler.err_out_screen('Improper ParallelReads value: {}'.format(config['Input']['ParallelReads']))
+        if self.parallel_reads < 0 or self.parallel_reads > 1:
+            err_handler.err_out_screen('Please choose a ParallelReads value of 0 or 1.')
+
+        # Read in the GRIB2 reader option (optional). Either convert GRIB2 files to temporary
+        # NetCDF files with wgrib2, or decode them in-process with ecCodes.
+        try:
+            self.grib2_reader = int(config['Input']['Grib2Reader'])
+        except (KeyError, configparser.NoOptionError):
+            self.grib2_reader = 0
+        except ValueError:
+            err_handler.err_out_screen('Improper Grib2Reader value: {}'.format(config['Input']['Grib2Reader']))
+        if self.grib2_reader < 0 or self.grib2_reader > 1:
+            err_handler.err_out_screen('Please choose a Grib2Reader value of 0 or 1.')
+
+        # Read in the input prefetch flag (optional). When set, a helper thread on rank 0
+        # converts the GRIB2 files needed by the next output step in the background.
+        try:
+            self.prefetch_inputs = int(config['Input']['PrefetchInputs'])
+        except (KeyError, configparser.NoOptionError):
+            self.prefetch_inputs = 0
+        except ValueError:
+            err_handler.err_out_screen('Improper PrefetchInputs value: {}'.format(config['Input']['PrefetchInputs']))
+        if self.prefetch_inputs < 0 or self.prefetch_inputs > 1:
+            err_handler.err_out_screen('Please choose a PrefetchInputs value of 0 or 1.')
+
+        # Read in the node-local input staging directory (optional). When set, helper threads on
+        # rank 0 copy the input files the next output steps will need into it, and rank 0 reads
+        # the staged copies instead of the files on the shared file system.
+        try:
+            self.input_staging_dir = config['Input']['InputStagingDir'].strip() or None
+        except (KeyError, configparser.NoOptionError):
+            self.input_staging_dir = None
+        if self.input_staging_dir is not None and not os.path.isdir(self.input_staging_dir):
+            err_handler.err_out_screen('Specified InputStagingDir: ' + self.input_staging_dir + ' not found.')
+
+        # Read in the number of output steps ahead to stage input files for (optional).
+        try:
+            self.input_staging_steps = int(config['Input']['InputStagingSteps'])
+        except (KeyError, configparser.NoOptionError):
+            self.input_staging_steps = 2
+        except ValueError:
+            err_handler.err_out_screen('Improper InputStagingSteps value: {}'.format(
+                config['Input']['InputStagingSteps']))
+        if self.input_staging_steps < 1:
+            err_handler.err_out_screen('Please choose an InputStagingSteps value of 1 or greater.')
+
+        # Read in the number of threads per processor (optional), used to process blocks of
+        # rows of the local slabs concurrently in the downscaling, bias correction, temporal
+        # interpolation and layering routines.
+        try:
+            self.threads_per_rank = int(config['Input']['ThreadsPerRank'])
+        except (KeyError, configparser.NoOptionError):
+            self.threads_per_rank = 1
+        except ValueError:
+            err_handler.err_out_screen('Improper ThreadsPerRank value: {}'.format(config['Input']['ThreadsPerRank']))
+        if self.threads_per_rank < 1:
+            err_handler.err_out_screen('Please choose a ThreadsPerRank value of 1 or greater.')
+
         # Read in the output frequency
         try:
             self.output_freq = int(config['Output']['OutputFrequency'])
@@ -261,6 +346,39 @@ class ConfigOptions:
         if self.useFloats < 0 or self.useFloats > 1:
             err_handler.err_out_screen('Please choose a floatOutput value of 0 or 1.')
 
+        # Read in the parallel output flag (optional). When set, every processor writes its own
+        # slab of the output files through parallel NetCDF (MPI-IO) instead of gathering to rank 0.
+        try:
+            self.parallel_output = int(config['Output']['ParallelOutput'])
+        except (KeyError, configparser.NoOptionError):
+            self.parallel_output = 0
+        except ValueError:
+            err_handler.err_out_screen('Improper ParallelOutput value: {}'.format(config['Output']['ParallelOutput']))
+        if self.parallel_output < 0 or self.parallel_output > 1:
+            err_handler.err_out_screen('Please choose a ParallelOutput value of 0 or 1.')
+
+        # Read in the number of output servers (optional). When set, the output files are handed
+        # off to dedicated server processes and written asynchronously.
+        try:
+            self.output_servers = int(config['Output']['OutputServers'])
+        except (KeyError, configparser.NoOptionError):
+            self.output_servers = 0
+        except ValueError:
+            err_handler.err_out_screen('Improper OutputServers value: {}'.format(config['Output']['OutputServers']))
+        if self.output_servers < 0:
+            err_handler.err_out_screen('Please choose an OutputServers value of 0 or greater.')
+
+        # Read in the pipeline depth (optional), the number of output steps that may be in flight
+        # at once: prefetched ahead of the step being processed, and handed off to each output server.
+        try:
+            self.pipeline_depth = int(config['Output']['PipelineDepth'])
+        except (KeyError, configparser.NoOptionError):
+            self.pipeline_depth = 1
+        except ValueError:
+            err_handler.err_out_screen('Improper PipelineDepth value: {}'.format(config['Output']['PipelineDepth']))
+        if self.pipeline_depth < 1:
+            err_handler.err_out_screen('Please choose a PipelineDepth value of 1 or greater.')
+
         # Read in retrospective options
         try:
             self.retro_flag = int(config['Retrospective']['RetroFlag'])
@@ -572,6 +690,18 @@ class ConfigOptions:
             err_handler.err_out_screen('Please specify IgnoredBorderWidths values greater than or equal to zero:'
                                        '({} was supplied'.format(self.ignored_border_widths))
 
+        # Read in the shared static field flag (optional). When set, static grids are held once per
+        # node in MPI-3 shared memory windows, and each processor maps a view of its slab.
+        try:
+            self.shared_static_fields = int(config['Geospatial']['SharedStaticFields'])
+        except (KeyError, configparser.NoOptionError):
+            self.shared_static_fields = 0
+        except ValueError:
+            err_handler.err_out_screen('Improper SharedStaticFields value: {}'.format(
+                config['Geospatial']['SharedStaticFields']))
+        if self.shared_static_fields < 0 or self.shared_static_fields > 1:
+            err_handler.err_out_screen('Please choose a SharedStaticFields value of 0 or 1.')
+
         # Process regridding options.
         try:
             self.regrid_opt = json.loads(config['Regridding']['RegridOpt'])
@@ -597,8 +727,50 @@ class ConfigOptions:
         if self.weightsDir is not None:
             # if we do have one specified, make sure it exists
             if not os.path.exists(self.weightsDir):
-                err_handler.err_out_screen('ESMF Weights file directory specifed ({}) but does not exist').format(
-                    self.weightsDir)
+                err_handler.err_out_screen('ESMF Weights file directory specifed ({}) but does not exist'.format(
+                    self.weightsDir))
+
+        # Read in the multi-variable regridding flag (optional). When set, all variables of an input
+        # product are stacked into a single ESMF field and regridded with one call.
+        try:
+            self.regrid_multi_var = int(config['Regridding']['RegridMultiVar'])
+        except (KeyError, configparser.NoOptionError):
+            self.regrid_multi_var = 0
+        except ValueError:
+            err_handler.err_out_screen('Improper RegridMultiVar value: {}'.format(
+                config['Regridding']['RegridMultiVar']))
+        if self.regrid_multi_var < 0 or self.regrid_multi_var > 1:
+            err_handler.err_out_screen('Please choose a RegridMultiVar value of 0 or 1.')
+
+        # Read in the regridding engine (optional). The sparse-matrix engine applies cached
+        # ESMF weight files directly, so it requires a weight directory and stacked regridding.
+        try:
+            self.regrid_engine = int(config['Regridding']['RegridEngine'])
+        except (KeyError, configparser.NoOptionError):
+            self.regrid_engine = 0
+        except ValueError:
+            err_handler.err_out_screen('Improper RegridEngine value: {}'.format(
+                config['Regridding']['RegridEngine']))
+        if self.regrid_engine < 0 or self.regrid_engine > 1:
+            err_handler.err_out_screen('Please choose a RegridEngine value of 0 or 1.')
+        if self.regrid_engine == 1:
+            if self.weightsDir is None:
+                err_handler.err_out_screen('RegridEngine = 1 requires RegridWeightsDir to be specified.')
+            if self.regrid_multi_var != 1:
+                err_handler.err_out_screen('RegridEngine = 1 requires RegridMultiVar = 1.')
+
+        # Read in the size limit (MB) of the regridded field cache (optional). The cache is kept
+        # in the scratch directory, shared by all cycle groups.
+        try:
+            self.regrid_cache_size = int(config['Regridding']['RegridCacheSize'])
+        except (KeyError, configparser.NoOptionError):
+            self.regrid_cache_size = 0
+        except ValueError:
+            err_handler.err_out_screen('Improper RegridCacheSize value: {}'.format(
+                config['Regridding']['RegridCacheSize']))
+        if self.regrid_cache_size < 0:
+            err_handler.err_out_screen('Please choose a RegridCacheSize value of 0 or greater.')
+        self.regrid_cache_dir = os.path.join(self.scratch_dir, 'REGRID_CACHE')
 
         # Calculate the beginning/ending processing dates if we are running realtime
         if self.realtime_flag:
@@ -787,6 +959,20 @@ class ConfigOptions:
         if self.ana_flag < 0 or self.ana_flag > 1:
             err_handler.err_out_screen('Please choose a AnAFlag value of 0 or 1.')
 
+        # Read in the number of forecast cycle groups (optional), processing disjoint sets of
+        # forecast cycles concurrently, each on its own set of processors.
+        try:
+            self.cycle_groups = int(config['Forecast']['CycleGroups'])
+        except (KeyError, configparser.NoOptionError):
+            self.cycle_groups = 1
+        except ValueError:
+            err_handler.err_out_screen('Improper CycleGroups value: {}'.format(config['Forecast']['CycleGroups']))
+        if self.cycle_groups < 1:
+            err_handler.err_out_screen('Please choose a CycleGroups value of 1 or greater.')
+        if self.cycle_groups > 1 and self.ana_flag:
+            err_handler.err_out_screen('CycleGroups cannot be used for AnA runs, whose cycles share '
+                                       'a single output directory and log file.')
+
         # Read in temperature bias correction options
         try:
             self.t2BiasCorrectOpt = json.loads(config['BiasCorrection']['TemperatureBiasCorrection'])
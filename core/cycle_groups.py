@@ -0,0 +1,93 @@
+"""
+Concurrent processing of forecast cycles in groups. The launched job is the
+first cycle group and spawns a copy of the forcing engine, on as many
+processors, for each of the other groups. Group g processes every
+CycleGroups-th forecast cycle starting with cycle g, with its own scratch
+directory, log files and completion flags. The groups share the regridding
+weights through the weight cache directory.
+"""
+import os
+import sys
+
+from core.parallel import MPI
+
+TAG_DONE = 1
+
+
+def spawn_groups(group_args, config_options, mpi_config):
+    """
+    Function to spawn the forcing engine once for every cycle group past the
+    first, on as many processors as this job.
+    :param group_args: Command line arguments of this job, passed on to the groups.
+    :param config_options:
+    :param mpi_config:
+    :return: The intercommunicators to the spawned groups.
+    """
+    script = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'genForcing.py')
+    # Start the groups in this job's directory, so relative paths in the configuration resolve the same.
+    info = MPI.Info.Create()
+    info.Set('wdir', os.getcwd())
+    groups = []
+    for group in range(1, config_options.cycle_groups):
+        try:
+            intercomm = mpi_config.comm.Spawn(sys.executable, args=[script] + group_args +
+                                              ['--cycle-group', str(group)], maxprocs=mpi_config.size,
+                                              info=info, root=0)
+        except MPI.Exception as mpi_exception:
+            config_options.errMsg = "Unable to spawn forecast cycle group " + str(group) + " on " + \
+                                    str(mpi_config.size) + " processors (" + str(mpi_exception) + ")"
+            info.Free()
+            raise mpi_exception
+        groups.append(intercomm)
+    info.Free()
+
+    return groups
+
+
+def use_group_scratch(config_options, mpi_config):
+    """
+    Function to point a cycle group at its own sub-directory of the scratch
+    directory, as the temporary files of the groups would otherwise collide.
+    :param config_options:
+    :param mpi_config:
+    :return:
+    """
+    config_options.scratch_dir = os.path.join(config_options.scratch_dir,
+                                              "CYCLE_GROUP_" + str(config_options.cycle_group))
+    if mpi_config.rank == 0:
+        try:
+            os.makedirs(config_options.scratch_dir, exist_ok=True)
+        except OSError:
+            config_options.errMsg = "Unable to create cycle group scratch directory: " + config_options.scratch_dir
+            raise
+    mpi_config.comm.barrier()
+
+
+def join_groups(groups, mpi_config):
+    """
+    Function to wait for the spawned cycle groups to finish their forecast
+    cycles, and disconnect from them.
+    :param groups:
+    :param mpi_config:
+    :return:
+    """
+    for intercomm in groups:
+        if mpi_config.rank == 0:
+            intercomm.recv(source=0, tag=TAG_DONE)
+        intercomm.Disconnect()
+
+
+def report_done(mpi_config):
+    """
+    Function run at the end of a spawned cycle group to let the first group
+    know its forecast cycles are complete, and disconnect from it.
+    :param mpi_config:
+    :return:
+    """
+    parent = MPI.Comm.Get_parent()
+    if parent == MPI.COMM_NULL:
+        return
+    mpi_config.comm.barrier()
+    if mpi_config.rank == 0:
+        parent.send(None, dest=0, tag=TAG_DONE)
+    parent.Disconnect()
@@ -11,6 +11,8 @@ import numpy as np
 from netCDF4 import Dataset
 
 from core import err_handler
+from core import ndv_mask
+from core import row_threads
 
 
 def run_downscaling(input_forcings, config_options, geo_meta_wrf_hydro, mpi_config):
@@ -23,6 +25,11 @@ def run_downscaling(input_forcings, config_options, geo_meta_wrf_hydro, mpi_conf
     :param config_options:
     :return:
     """
+    # Establish where we have missing values once for all downscaling routines. Each
+    # routine restores these cells to missing values after adjusting its variable.
+    input_forcings.ndv_mask = ndv_mask.missing_mask(input_forcings.final_forcings, config_options.globalNdv,
+                                                    out=input_forcings.ndv_mask)
+
     # Dictionary mapping to temperature downscaling.
     downscale_temperature = {
         0: no_downscale,
@@ -96,14 +103,12 @@ def simple_lapse(input_forcings,ConfigOptions,GeoMetaWrfHydro,MpiConfig):
         ConfigOptions.statusMsg = "Applying simple lapse rate to temperature downscaling"
         err_handler.log_msg(ConfigOptions, MpiConfig)
 
-    # Calculate the elevation difference.
+    # Make sure we have input terrain height to calculate the elevation difference.
     if input_forcings.height is None:
         ConfigOptions.errMsg = "Unable to perform downscaling without terrain height input"
         err_handler.log_critical(ConfigOptions, MpiConfig)
         return
 
-    elevDiff = input_forcings.height - GeoMetaWrfHydro.height
-
     # Assign existing, un-downscaled temperatures to a temporary placeholder, which
     # will be used for specific humidity downscaling.
     if input_forcings.q2dDownscaleOpt > 0:
@@ -111,24 +116,17 @@ def simple_lapse(input_forcings,ConfigOptions,GeoMetaWrfHydro,MpiConfig):
 
     # Apply single lapse rate value to the input 2-meter
     # temperature values.
+    def kernel(rows):
+        elevDiff = input_forcings.height[rows,:] - GeoMetaWrfHydro.height[rows,:]
+        input_forcings.final_forcings[4,rows,:] += (6.49/1000.0)*elevDiff
     try:
-        indNdv = np.where(input_forcings.final_forcings == ConfigOptions.globalNdv)
-    except:
-        ConfigOptions.errMsg = "Unable to perform NDV search on input forcings"
-        err_handler.log_critical(ConfigOptions, MpiConfig)
-        return
-    try:
-        input_forcings.final_forcings[4,:,:] = input_forcings.final_forcings[4,:,:] + \
-                                               (6.49/1000.0)*elevDiff
+        row_threads.map_rows(kernel, GeoMetaWrfHydro.ny_local, GeoMetaWrfHydro.nx_local)
     except:
         ConfigOptions.errMsg = "Unable to apply lapse rate to input 2-meter temperatures."
         err_handler.log_critical(ConfigOptions, MpiConfig)
         return
 
-    input_forcings.final_forcings[indNdv] = ConfigOptions.globalNdv
-
-    # Reset for memory efficiency
-    indNdv = None
+    ndv_mask.set_missing(input_forcings.final_forcings, input_forcings.ndv_mask, ConfigOptions.globalNdv)
 
 def param_lapse(input_forcings,ConfigOptions,GeoMetaWrfHydro,MpiConfig):
     """
@@ -146,12 +144,11 @@ def param_lapse(input_forcings,ConfigOptions,GeoMetaWrfHydro,MpiConfig):
         ConfigOptions.statusMsg = "Applying aprior lapse rate grid to temperature downscaling"
         err_handler.log_msg(ConfigOptions, MpiConfig)
 
-    # Calculate the elevation difference.
+    # Make sure we have input terrain height to calculate the elevation difference.
     if input_forcings.height is None:
         ConfigOptions.errMsg = "Unable to perform downscaling without terrain height input"
         err_handler.log_critical(ConfigOptions, MpiConfig)
         return
-    elevDiff = input_forcings.height - GeoMetaWrfHydro.height
 
     if input_forcings.lapseGrid is None:
     #if not np.any(input_forcings.lapseGrid):
@@ -237,28 +234,19 @@ def param_lapse(input_forcings,ConfigOptions,GeoMetaWrfHydro,MpiConfig):
         err_handler.check_program_status(ConfigOptions, MpiConfig)
 
         # Scatter the lapse rate grid to the other processors.
-        input_forcings.lapseGrid = MpiConfig.scatter_array(GeoMetaWrfHydro,lapseTmp,ConfigOptions)
+        input_forcings.lapseGrid = MpiConfig.share_array(GeoMetaWrfHydro,lapseTmp,ConfigOptions,
+                                                         'LAPSE_' + str(input_forcings.keyValue))
         err_handler.check_program_status(ConfigOptions, MpiConfig)
 
     # Apply the local lapse rate grid to our local slab of 2-meter temperature data.
     temperature_grid_tmp = input_forcings.final_forcings[4, :, :]
+
+    def kernel(rows):
+        elevDiff = input_forcings.height[rows, :] - GeoMetaWrfHydro.height[rows, :]
+        np.add(temperature_grid_tmp[rows, :], (input_forcings.lapseGrid[rows, :]/1000.0) * elevDiff,
+               out=temperature_grid_tmp[rows, :], where=np.logical_not(input_forcings.ndv_mask[4, rows, :]))
     try:
-        indNdv = np.where(input_forcings.final_forcings == ConfigOptions.globalNdv)
-    except:
-        ConfigOptions.errMsg = "Unable to perform NDV search on input " + \
-                               input_forcings.productName + " regridded forcings."
-        err_handler.log_critical(ConfigOptions, MpiConfig)
-        return
-    try:
-        indValid = np.where(temperature_grid_tmp != ConfigOptions.globalNdv)
-    except:
-        ConfigOptions.errMsg = "Unable to perform search for valid values on input " + \
-                               input_forcings.productName + " regridded temperature forcings."
-        err_handler.log_critical(ConfigOptions, MpiConfig)
-        return
-    try:
-        temperature_grid_tmp[indValid] = temperature_grid_tmp[indValid] + \
-                                         ((input_forcings.lapseGrid[indValid]/1000.0) * elevDiff[indValid])
+        row_threads.map_rows(kernel, GeoMetaWrfHydro.ny_local, GeoMetaWrfHydro.nx_local)
     except:
         ConfigOptions.errMsg = "Unable to apply spatial lapse rate values to input " + \
                                input_forcings.productName + " regridded temperature forcings."
@@ -266,13 +254,10 @@ def param_lapse(input_forcings,ConfigOptions,GeoMetaWrfHydro,MpiConfig):
         return
 
     input_forcings.final_forcings[4,:,:] = temperature_grid_tmp
-    input_forcings.final_forcings[indNdv] = ConfigOptions.globalNdv
+    ndv_mask.set_missing(input_forcings.final_forcings, input_forcings.ndv_mask, ConfigOptions.globalNdv)
 
     # Reset for memory efficiency
     indTmp = None
-    indNdv = None
-    indValid = None
-    elevDiff = None
     temperature_grid_tmp = None
 
 def pressure_down_classic(input_forcings,ConfigOptions,GeoMetaWrfHydro,MpiConfig):
@@ -287,37 +272,29 @@ def pressure_down_classic(input_forcings,ConfigOptions,GeoMetaWrfHydro,MpiConfig
         ConfigOptions.statusMsg = "Performing topographic adjustment to surface pressure."
         err_handler.log_msg(ConfigOptions, MpiConfig)
 
-    # Calculate the elevation difference.
+    # Make sure we have input terrain height to calculate the elevation difference.
     if input_forcings.height is None:
         ConfigOptions.errMsg = "Unable to perform downscaling without terrain height input"
         err_handler.log_critical(ConfigOptions, MpiConfig)
         return
-    elevDiff = input_forcings.height - GeoMetaWrfHydro.height
 
     # Assign existing, un-downscaled pressure values to a temporary placeholder, which
     # will be used for specific humidity downscaling.
     if input_forcings.q2dDownscaleOpt > 0:
         input_forcings.psfcTmp[:, :] = input_forcings.final_forcings[6, :, :]
 
+    def kernel(rows):
+        elevDiff = input_forcings.height[rows,:] - GeoMetaWrfHydro.height[rows,:]
+        input_forcings.final_forcings[6,rows,:] += (input_forcings.final_forcings[6,rows,:]*elevDiff*9.8)/\
+                                                   (input_forcings.final_forcings[4,rows,:]*287.05)
     try:
-        indNdv = np.where(input_forcings.final_forcings == ConfigOptions.globalNdv)
-    except:
-        ConfigOptions.errMsg = "Unable to perform NDV search on input forcings"
-        err_handler.log_critical(ConfigOptions, MpiConfig)
-        return
-    try:
-        input_forcings.final_forcings[6,:,:] = input_forcings.final_forcings[6,:,:] +\
-                                               (input_forcings.final_forcings[6,:,:]*elevDiff*9.8)/\
-                                               (input_forcings.final_forcings[4,:,:]*287.05)
+        row_threads.map_rows(kernel, GeoMetaWrfHydro.ny_local, GeoMetaWrfHydro.nx_local)
     except:
         ConfigOptions.errMsg = "Unable to downscale surface pressure to input forcings."
         err_handler.log_critical(ConfigOptions, MpiConfig)
         return
 
-    input_forcings.final_forcings[indNdv] = ConfigOptions.globalNdv
-
-    # Reset for memory efficiency
-    indNdv = None
+    ndv_mask.set_missing(input_forcings.final_forcings, input_forcings.ndv_mask, ConfigOptions.globalNdv)
 
 def q2_down_classic(input_forcings,ConfigOptions,GeoMetaWrfHydro,MpiConfig):
     """
@@ -333,36 +310,19 @@ def q2_down_classic(input_forcings,ConfigOptions,GeoMetaWrfHydro,MpiConfig):
         ConfigOptions.statusMsg = "Performing topographic adjustment to specific humidity."
         err_handler.log_msg(ConfigOptions, MpiConfig)
 
-    # Establish where we have missing values.
-    try:
-        indNdv = np.where(input_forcings.final_forcings == ConfigOptions.globalNdv)
-    except:
-        ConfigOptions.errMsg = "Unable to perform NDV search on input forcings"
-        err_handler.log_critical(ConfigOptions, MpiConfig)
-        return
-
     # First calculate relative humidity given original surface pressure and 2-meter
-    # temperature
-    try:
-        relHum = rel_hum(input_forcings,ConfigOptions)
-    except:
-        ConfigOptions.errMsg = "Unable to perform topographic downscaling of incoming " \
-                               "specific humidity to relative humidity"
-        err_handler.log_critical(ConfigOptions, MpiConfig)
-        return
-
-    # Downscale 2-meter specific humidity
+    # temperature, then downscale 2-meter specific humidity, one block of rows at a time.
+    def kernel(rows):
+        relHum = rel_hum(input_forcings,ConfigOptions,rows=rows)
+        input_forcings.final_forcings[5,rows,:] = mixhum_ptrh(input_forcings,relHum,2,ConfigOptions,rows=rows)
     try:
-        q2Tmp = mixhum_ptrh(input_forcings,relHum,2,ConfigOptions)
+        row_threads.map_rows(kernel, GeoMetaWrfHydro.ny_local, GeoMetaWrfHydro.nx_local)
     except:
         ConfigOptions.errMsg = "Unable to perform topographic downscaling of " \
                                "incoming specific humidity"
         err_handler.log_critical(ConfigOptions, MpiConfig)
         return
-    input_forcings.final_forcings[5,:,:] = q2Tmp
-    input_forcings.final_forcings[indNdv] = ConfigOptions.globalNdv
-    q2Tmp = None
-    indNdv = None
+    ndv_mask.set_missing(input_forcings.final_forcings, input_forcings.ndv_mask, ConfigOptions.globalNdv)
 
 def nwm_monthly_PRISM_downscale(input_forcings,ConfigOptions,GeoMetaWrfHydro,MpiConfig):
     """
@@ -521,10 +481,12 @@ def nwm_monthly_PRISM_downscale(input_forcings,ConfigOptions,GeoMetaWrfHydro,Mpi
         err_handler.check_program_status(ConfigOptions, MpiConfig)
 
         # Scatter the array out to the local processors
-        input_forcings.nwmPRISM_numGrid = MpiConfig.scatter_array(GeoMetaWrfHydro, numDataTmp, ConfigOptions)
+        input_forcings.nwmPRISM_numGrid = MpiConfig.share_array(GeoMetaWrfHydro, numDataTmp, ConfigOptions,
+                                                                'PRISM_NUM_' + str(input_forcings.keyValue))
         err_handler.check_program_status(ConfigOptions, MpiConfig)
 
-        input_forcings.nwmPRISM_denGrid = MpiConfig.scatter_array(GeoMetaWrfHydro, denDataTmp, ConfigOptions)
+        input_forcings.nwmPRISM_denGrid = MpiConfig.share_array(GeoMetaWrfHydro, denDataTmp, ConfigOptions,
+                                                                'PRISM_DEN_' + str(input_forcings.keyValue))
         err_handler.check_program_status(ConfigOptions, MpiConfig)
 
     # Create temporary grids from the local slabs of params/precip forcings.
@@ -532,42 +494,22 @@ def nwm_monthly_PRISM_downscale(input_forcings,ConfigOptions,GeoMetaWrfHydro,Mpi
     numLocal = input_forcings.nwmPRISM_numGrid[:,:]
     denLocal = input_forcings.nwmPRISM_denGrid[:,:]
 
-    # Establish index of where we have valid data.
+    # Scale the precipitation rate by the ratio of the PRISM numerator and denominator
+    # where we have valid data, one block of rows at a time. The rate (mm/s) is converted
+    # to mm while being scaled, then back to a rate.
+    def kernel(rows):
+        rainRows = localRainRate[rows,:]
+        numRows = numLocal[rows,:]
+        denRows = denLocal[rows,:]
+        valid = (rainRows > 0.0) & (denRows > 0.0) & (numRows > 0.0)
+        np.multiply(rainRows, 3600.0, out=rainRows, where=valid)
+        np.multiply(rainRows, numRows, out=rainRows, where=valid)
+        np.divide(rainRows, denRows, out=rainRows, where=valid)
+        np.divide(rainRows, 3600.0, out=rainRows, where=valid)
     try:
-        indValid = np.where((localRainRate > 0.0) & (denLocal > 0.0) & (numLocal > 0.0))
+        row_threads.map_rows(kernel, GeoMetaWrfHydro.ny_local, GeoMetaWrfHydro.nx_local)
     except:
-        ConfigOptions.errMsg = "Unable to run numpy search for valid values on precip and " \
-                               "param grid in mountain mapper downscaling"
-        err_handler.log_critical(ConfigOptions, MpiConfig)
-    err_handler.check_program_status(ConfigOptions, MpiConfig)
-
-    # Convert precipitation rate, which is mm/s to mm, which is needed to run the PRISM downscaling.
-    try:
-        localRainRate[indValid] = localRainRate[indValid]*3600.0
-    except:
-        ConfigOptions.errMsg = "Unable to convert temporary precip rate from mm/s to mm."
-        err_handler.log_critical(ConfigOptions, MpiConfig)
-    err_handler.check_program_status(ConfigOptions, MpiConfig)
-
-    try:
-        localRainRate[indValid] = localRainRate[indValid] * numLocal[indValid]
-    except:
-        ConfigOptions.errMsg = "Unable to multiply precip by numerator in mountain mapper downscaling"
-        err_handler.log_critical(ConfigOptions, MpiConfig)
-    err_handler.check_program_status(ConfigOptions, MpiConfig)
-
-    try:
-        localRainRate[indValid] = localRainRate[indValid] / denLocal[indValid]
-    except:
-        ConfigOptions.errMsg = "Unable to divide precip by denominator in mountain mapper downscaling"
-        err_handler.log_critical(ConfigOptions, MpiConfig)
-    err_handler.check_program_status(ConfigOptions, MpiConfig)
-
-    # Convert local precip back to a rate (mm/s)
-    try:
-        localRainRate[indValid] = localRainRate[indValid]/3600.0
-    except:
-        ConfigOptions.errMsg = "Unable to convert temporary precip rate from mm to mm/s."
+        ConfigOptions.errMsg = "Unable to apply the PRISM numerator and denominator in mountain mapper downscaling"
         err_handler.log_critical(ConfigOptions, MpiConfig)
     err_handler.check_program_status(ConfigOptions, MpiConfig)
 
@@ -593,14 +535,6 @@ def ncar_topo_adj(input_forcings,ConfigOptions,GeoMetaWrfHydro,MpiConfig):
                                   "shortwave radiation flux."
         err_handler.log_msg(ConfigOptions, MpiConfig)
 
-    # Establish where we have missing values.
-    try:
-        indNdv = np.where(input_forcings.final_forcings == ConfigOptions.globalNdv)
-    except:
-        ConfigOptions.errMsg = "Unable to perform NDV search on input forcings"
-        err_handler.log_critical(ConfigOptions, MpiConfig)
-        return
-
     # By the time this function has been called, necessary input static grids (height, slope, etc),
     # should have been calculated for each local slab of data.
     DEGRAD = math.pi/180.0
@@ -612,17 +546,13 @@ def ncar_topo_adj(input_forcings,ConfigOptions,GeoMetaWrfHydro,MpiConfig):
         err_handler.log_critical(ConfigOptions, MpiConfig)
         return
 
-    try:
-        coszen_loc, hrang_loc = calc_coszen(ConfigOptions,DECLIN,GeoMetaWrfHydro)
-    except:
-        ConfigOptions.errMsg = "Unable to calculate COSZEN or HRANG variables for topographic adjustment " \
-                               "of incoming shortwave radiation"
-        err_handler.log_critical(ConfigOptions, MpiConfig)
-        return
-
-    try:
+    # Calculate COSZEN and HRANG, and perform the adjustment, one block of rows at a time.
+    def kernel(rows):
+        coszen_loc, hrang_loc = calc_coszen(ConfigOptions,DECLIN,GeoMetaWrfHydro,rows=rows)
         TOPO_RAD_ADJ_DRVR(GeoMetaWrfHydro,input_forcings,coszen_loc,DECLIN,SOLCON,
-                          hrang_loc)
+                          hrang_loc,rows=rows)
+    try:
+        row_threads.map_rows(kernel, GeoMetaWrfHydro.ny_local, GeoMetaWrfHydro.nx_local)
     except:
         ConfigOptions.errMsg = "Unable to perform final topographic adjustment of incoming " \
                                "shortwave radiation fluxes."
@@ -630,14 +560,11 @@ def ncar_topo_adj(input_forcings,ConfigOptions,GeoMetaWrfHydro,MpiConfig):
         return
 
     # Assign missing values based on our mask.
-    input_forcings.final_forcings[indNdv] = ConfigOptions.globalNdv
+    ndv_mask.set_missing(input_forcings.final_forcings, input_forcings.ndv_mask, ConfigOptions.globalNdv)
 
     # Reset variables to free up memory
     DECLIN = None
     SOLCON = None
-    coszen_loc = None
-    hrang_loc = None
-    indNdv = None
 
 def radconst(ConfigOptions):
     """
@@ -679,13 +606,14 @@ def radconst(ConfigOptions):
 
     return DECLIN, SOLCON
 
-def calc_coszen(ConfigOptions,declin,GeoMetaWrfHydro):
+def calc_coszen(ConfigOptions,declin,GeoMetaWrfHydro,rows=slice(None)):
     """
     Downscaling function to compute radiation terms based on current datetime
     information and lat/lon grids.
     :param ConfigOptions:
     :param input_forcings:
     :param declin:
+    :param rows: Optional block of rows of the local slab.
     :return:
     """
     degrad = math.pi / 180.0
@@ -700,9 +628,9 @@ def calc_coszen(ConfigOptions,declin,GeoMetaWrfHydro):
            (0.014615 * math.cos(2 * da)) - (0.04089 * math.sin(2 * da))) * 229.18
     xtime = dCurrent.hour * 60.0  # Minutes of day
     xt24 = int(xtime) % 1440 + eot
-    tloctm = GeoMetaWrfHydro.longitude_grid/15.0 + gmt + xt24/60.0
+    tloctm = GeoMetaWrfHydro.longitude_grid[rows,:]/15.0 + gmt + xt24/60.0
     hrang = ((tloctm - 12.0) * degrad) * 15.0
-    xxlat = GeoMetaWrfHydro.latitude_grid * degrad
+    xxlat = GeoMetaWrfHydro.latitude_grid[rows,:] * degrad
     coszen = np.sin(xxlat) * math.sin(declin) + np.cos(xxlat) * math.cos(declin) * np.cos(hrang)
 
     # Reset temporary variables to free up memory.
@@ -711,7 +639,7 @@ def calc_coszen(ConfigOptions,declin,GeoMetaWrfHydro):
 
     return coszen, hrang
 
-def TOPO_RAD_ADJ_DRVR(GeoMetaWrfHydro,input_forcings,COSZEN,declin,solcon,hrang2d):
+def TOPO_RAD_ADJ_DRVR(GeoMetaWrfHydro,input_forcings,COSZEN,declin,solcon,hrang2d,rows=slice(None)):
     """
     Downscaling driver for correcting incoming shortwave radiation fluxes from a low
     resolution to a a higher resolution.
@@ -721,17 +649,20 @@ def TOPO_RAD_ADJ_DRVR(GeoMetaWrfHydro,input_forcings,COSZEN,declin,solcon,hrang2
     :param declin:
     :param solcon:
     :param hrang2d:
+    :param rows: Optional block of rows of the local slab.
     :return:
     """
     degrad = math.pi / 180.0
 
-    ny = GeoMetaWrfHydro.ny_local
-    nx = GeoMetaWrfHydro.nx_local
+    xxlat = GeoMetaWrfHydro.latitude_grid[rows,:]*degrad
+    slope = GeoMetaWrfHydro.slope[rows,:]
+    slp_azi = GeoMetaWrfHydro.slp_azi[rows,:]
 
-    xxlat = GeoMetaWrfHydro.latitude_grid*degrad
+    ny = xxlat.shape[0]
+    nx = xxlat.shape[1]
 
     # Sanity checking on incoming shortwave grid.
-    SWDOWN = input_forcings.final_forcings[7,:,:]
+    SWDOWN = input_forcings.final_forcings[7,rows,:]
     SWDOWN[np.where(SWDOWN < 0.0)] = 0.0
     SWDOWN[np.where(SWDOWN >= 1400.0)] = 1400.0
 
@@ -744,19 +675,19 @@ def TOPO_RAD_ADJ_DRVR(GeoMetaWrfHydro,input_forcings,COSZEN,declin,solcon,hrang2
     diffuse_frac[:, :] = 0
     # shadow_mask[:,:] = 0
 
-    indTmp = np.where((GeoMetaWrfHydro.slope[:,:] == 0.0) &
+    indTmp = np.where((slope == 0.0) &
                       (SWDOWN <= 10.0))
     corr_frac[indTmp] = 1
 
     term1 = np.sin(xxlat) * np.cos(hrang2d)
-    term2 = ((0 - np.cos(GeoMetaWrfHydro.slp_azi)) *
-             np.sin(GeoMetaWrfHydro.slope))
-    term3 = np.sin(hrang2d) * (np.sin(GeoMetaWrfHydro.slp_azi) *
-                               np.sin(GeoMetaWrfHydro.slope))
-    term4 = (np.cos(xxlat) * np.cos(hrang2d)) * np.cos(GeoMetaWrfHydro.slope)
-    term5 = np.cos(xxlat) * (np.cos(GeoMetaWrfHydro.slp_azi) *
-                             np.sin(GeoMetaWrfHydro.slope))
-    term6 = np.sin(xxlat) * np.cos(GeoMetaWrfHydro.slope)
+    term2 = ((0 - np.cos(slp_azi)) *
+             np.sin(slope))
+    term3 = np.sin(hrang2d) * (np.sin(slp_azi) *
+                               np.sin(slope))
+    term4 = (np.cos(xxlat) * np.cos(hrang2d)) * np.cos(slope)
+    term5 = np.cos(xxlat) * (np.cos(slp_azi) *
+                             np.sin(slope))
+    term6 = np.sin(xxlat) * np.cos(slope)
 
     csza_slp = (term1 * term2 - term3 + term4) * math.cos(declin) + \
                (term5 + term6) * math.sin(declin)
@@ -783,22 +714,26 @@ def TOPO_RAD_ADJ_DRVR(GeoMetaWrfHydro,input_forcings,COSZEN,declin,solcon,hrang2
     term5 = None
     term6 = None
 
-    input_forcings.final_forcings[7,:,:] = SWDOWN_OUT
+    input_forcings.final_forcings[7,rows,:] = SWDOWN_OUT
 
     # Reset variables to free up memory
     SWDOWN = None
     SWDOWN_OUT = None
 
-def rel_hum(input_forcings,ConfigOptions):
+def rel_hum(input_forcings,ConfigOptions,rows=slice(None)):
     """
     Function to calculate relative humidity given
     original, undownscaled surface pressure and 2-meter
     temperature.
     :param input_forcings:
     :param ConfigOptions:
+    :param rows: Optional block of rows of the local slab.
     :return:
     """
-    tmpHumidity = input_forcings.final_forcings[5,:,:]/(1-input_forcings.final_forcings[5,:,:])
+    # The saturation vapor pressure is computed in double precision, as its
+    # exponential amplifies the rounding of the single precision grids.
+    q2dTmp = input_forcings.final_forcings[5,rows,:].astype(np.float64)
+    tmpHumidity = q2dTmp/(1-q2dTmp)
 
     T0 = 273.15
     EP = 0.622
@@ -807,8 +742,9 @@ def rel_hum(input_forcings,ConfigOptions):
     A = 17.269
     B = 35.86
 
-    EST = ES0 * np.exp((A * (input_forcings.t2dTmp - T0)) / (input_forcings.t2dTmp - B))
-    QST = (EP * EST) / ((input_forcings.psfcTmp * 0.01) - ONEMEP * EST)
+    t2dTmp = input_forcings.t2dTmp[rows,:].astype(np.float64)
+    EST = ES0 * np.exp((A * (t2dTmp - T0)) / (t2dTmp - B))
+    QST = (EP * EST) / ((input_forcings.psfcTmp[rows,:] * 0.01) - ONEMEP * EST)
     RH = 100 * (tmpHumidity / QST)
 
     # Reset variables to free up memory
@@ -816,12 +752,13 @@ def rel_hum(input_forcings,ConfigOptions):
 
     return RH
 
-def mixhum_ptrh(input_forcings,relHum,iswit,ConfigOptions):
+def mixhum_ptrh(input_forcings,relHum,iswit,ConfigOptions,rows=slice(None)):
     """
     Functionto convert relative humidity back to a downscaled
     2-meter specific humidity
     :param input_forcings:
     :param ConfigOptions:
+    :param rows: Optional block of rows of the local slab.
     :return:
     """
     T0 = 273.15
@@ -831,11 +768,13 @@ def mixhum_ptrh(input_forcings,relHum,iswit,ConfigOptions):
     A = 17.269
     B = 35.86
 
-    term1 = A * (input_forcings.final_forcings[4,:,:] - T0)
-    term2 = input_forcings.final_forcings[4,:,:] - B
+    # As in rel_hum, the saturation vapor pressure is computed in double precision.
+    t2dTmp = input_forcings.final_forcings[4,rows,:].astype(np.float64)
+    term1 = A * (t2dTmp - T0)
+    term2 = t2dTmp - B
     EST = np.exp(term1 / term2) * ES0
 
-    QST = (EP * EST) / ((input_forcings.final_forcings[6,:,:]/100.0) - ONEMEP * EST)
+    QST = (EP * EST) / ((input_forcings.final_forcings[6,rows,:]/100.0) - ONEMEP * EST)
     QW = QST * (relHum * 0.01)
     if iswit == 2:
         QW = QW / (1.0 + QW)
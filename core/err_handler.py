@@ -4,7 +4,11 @@ import sys
 import traceback
 
 import numpy as np
-from mpi4py import MPI
+try:
+    from mpi4py import MPI
+except ImportError:
+    # Serial runs on a single processor (parallel.LocalConfig) do not need mpi4py.
+    MPI = None
 
 
 def err_out_screen(err_msg):
@@ -36,37 +40,23 @@ def err_out_screen_para(err_msg,MpiConfig):
 
 def check_program_status(ConfigOptions, MpiConfig):
     """
-    Generic function to check the err statuses for each processor in the program.
-    If any flags come back, gracefully exit the program.
+    Generic function to check the err status of this processor. If its flag
+    is set, the error has already been logged, and the whole program is
+    aborted from this processor. No communication takes place, so checking
+    is free when no errors occurred and processors never wait on each other.
+    On a single processor without MPI, the error is raised as an exception.
     :param ConfigOptions:
     :param MpiConfig:
     :return:
     """
-    # Sync up processors to ensure everyone is on the same page.
-    #MpiConfig.comm.barrier()
-
-    # Collect values from each processor.
-    # data = MpiConfig.comm.gather(ConfigOptions.errFlag, root=0)
-    # if MpiConfig.rank == 0:
-    #     for i in range(MpiConfig.size):
-    #         if data[i] != 0:
-    #             MpiConfig.comm.Abort()
-    #             sys.exit(1)
-    # else:
-    #     assert data is None
-
-    # Reduce version:
-    any_error = MpiConfig.comm.reduce(ConfigOptions.errFlag)
-    if MpiConfig.rank == 0:
-        if ConfigOptions.errFlag:
-            # print("any_error: ", any_error, type(any_error), flush=True)
-            stack = traceback.format_stack()[:-1]
-            [print(frame, flush=True, end='') for frame in stack]
-            MpiConfig.comm.Abort()
-            sys.exit(1)
-
-    # Sync up processors.
-    # MpiConfig.comm.barrier()
+    if ConfigOptions.errFlag:
+        if MpiConfig.serial:
+            raise RuntimeError(ConfigOptions.errMsg)
+        stack = traceback.format_stack()[:-1]
+        [print(frame, flush=True, end='') for frame in stack]
+        print('ERROR: RANK - ' + str(MpiConfig.rank) + ' : ' + str(ConfigOptions.errMsg), flush=True)
+        MpiConfig.comm.Abort()
+        sys.exit(1)
 
 def init_log(ConfigOptions,MpiConfig):
     """
@@ -131,7 +121,8 @@ def err_out(ConfigOptions):
         ConfigOptions.errMsg = "Unable to write error message to: " + \
             ConfigOptions.logFile
         raise Exception()
-    MPI.Finalize()
+    if MPI is not None:
+        MPI.Finalize()
     sys.exit(1)
 
 def log_error(ConfigOptions,MpiConfig):
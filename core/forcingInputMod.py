@@ -70,6 +70,14 @@ class input_forcings:
         self.regridObj = None
         self.esmf_field_in = None
         self.esmf_field_out = None
+        # Stacked [nvar] ESMF fields used when all variables
+        # of a product are regridded in a single call.
+        self.esmf_field_in_stack = None
+        self.esmf_field_out_stack = None
+        # Cached ESMF weight file and the sparse-matrix
+        # regridder built from it (RegridEngine = 1).
+        self.weight_file = None
+        self.sparse_regridder = None
         # --------------------------------
         # Only used for CFSv2 bias correction
         # as bias correction needs to take
@@ -82,7 +90,9 @@ class input_forcings:
         self.globalPcpRate1 = None
         self.globalPcpRate2 = None
         self.regridded_mask = None
+        self.outside_mask = None
         self.final_forcings = None
+        self.ndv_mask = None
         self.ndv = None
         self.file_in1 = None
         self.file_in2 = None
@@ -104,6 +114,7 @@ class input_forcings:
         self.regridded_precip1 = None
         self.regridded_precip2 = None
         self.border = None
+        self.src_window = None
 
     def define_product(self):
         """
@@ -430,7 +441,11 @@ class input_forcings:
             17: regrid.regrid_nam_nest,
             18: regrid.regrid_hourly_wrf_arw,
         }
-        regrid_inputs[self.keyValue](self,ConfigOptions,wrfHyroGeoMeta,MpiConfig)
+        if ConfigOptions.regrid_cache is not None:
+            ConfigOptions.regrid_cache.regrid_forcings(self, regrid_inputs[self.keyValue], ConfigOptions,
+                                                       wrfHyroGeoMeta, MpiConfig)
+        else:
+            regrid_inputs[self.keyValue](self,ConfigOptions,wrfHyroGeoMeta,MpiConfig)
 
     def temporal_interpolate_inputs(self,ConfigOptions,MpiConfig):
         """
@@ -516,15 +531,23 @@ def initDict(ConfigOptions,GeoMetaWrfHydro):
         # Initialize the local final grid of values. This is represntative
         # of the local grid for this forcing, for a specific output timesetp.
         # This grid will be updated from one output timestep to another, and
-        # also through downscaling and bias correction.
+        # also through downscaling and bias correction. Like the regridded
+        # grids and the output slabs, it is kept in single precision.
         InputDict[force_key].final_forcings = np.empty([8,GeoMetaWrfHydro.ny_local,
                                                         GeoMetaWrfHydro.nx_local],
-                                                       np.float64)
+                                                       np.float32)
         InputDict[force_key].height = np.empty([GeoMetaWrfHydro.ny_local,
                                                 GeoMetaWrfHydro.nx_local],np.float32)
         InputDict[force_key].regridded_mask = np.empty([GeoMetaWrfHydro.ny_local,
                                                 GeoMetaWrfHydro.nx_local],np.float32)
 
+        # Boolean masks of the cells outside the input domain (set when regridding weights
+        # are calculated), and of the missing values in the final grids of this output step.
+        InputDict[force_key].outside_mask = np.zeros([GeoMetaWrfHydro.ny_local,
+                                                      GeoMetaWrfHydro.nx_local], bool)
+        InputDict[force_key].ndv_mask = np.zeros([8, GeoMetaWrfHydro.ny_local,
+                                                  GeoMetaWrfHydro.nx_local], bool)
+
         # Obtain custom input cycle frequencies
         if force_key == 10 or force_key == 11:
             InputDict[force_key].cycleFreq = ConfigOptions.customFcstFreq[custom_count]
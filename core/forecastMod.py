@@ -4,7 +4,11 @@ import os
 from core import bias_correction
 from core import downscale
 from core import err_handler
+from core import input_staging
 from core import layeringMod
+from core import prefetch
+from core import regrid_cache
+from core import row_threads
 
 
 def process_forecasts(ConfigOptions, wrfHydroGeoMeta, inputForcingMod, suppPcpMod, MpiConfig, OutputObj):
@@ -33,12 +37,31 @@ def process_forecasts(ConfigOptions, wrfHydroGeoMeta, inputForcingMod, suppPcpMo
     # checked upon the beginning of this program to see if we
     # need to process any files.
 
+    # Start the helper threads that stage the input files of the next output steps to node-local storage.
+    if ConfigOptions.input_staging_dir is not None:
+        ConfigOptions.input_stager = input_staging.InputStager(ConfigOptions, MpiConfig)
+
+    # Start the helper thread that prefetches the next output step's input files.
+    if ConfigOptions.prefetch_inputs == 1 and MpiConfig.rank == 0:
+        ConfigOptions.prefetcher = prefetch.InputPrefetcher(ConfigOptions)
+
+    # Open the cache of regridded input fields.
+    if ConfigOptions.regrid_cache_size > 0:
+        ConfigOptions.regrid_cache = regrid_cache.RegridCache(ConfigOptions, MpiConfig)
+
+    # Start the threads that process row blocks of the local slabs.
+    row_threads.initialize(ConfigOptions.threads_per_rank)
+
     for fcstCycleNum in range(ConfigOptions.nFcsts):
         ConfigOptions.current_fcst_cycle = ConfigOptions.b_date_proc + datetime.timedelta(
             seconds=ConfigOptions.fcst_freq * 60 * fcstCycleNum)
         if ConfigOptions.first_fcst_cycle is None:
             ConfigOptions.first_fcst_cycle = ConfigOptions.current_fcst_cycle
 
+        # With concurrent cycle groups, the other cycles are processed by the other groups.
+        if fcstCycleNum % ConfigOptions.cycle_groups != ConfigOptions.cycle_group:
+            continue
+
         if ConfigOptions.ana_flag:
             fcstCycleOutDir = ConfigOptions.output_dir + "/" + ConfigOptions.e_date_proc.strftime('%Y%m%d%H')
         else:
@@ -115,6 +138,7 @@ def process_forecasts(ConfigOptions, wrfHydroGeoMeta, inputForcingMod, suppPcpMo
         for outStep in range(1, ConfigOptions.num_output_steps + 1):
             # Reset out final grids to missing values.
             OutputObj.output_local[:, :, :] = -9999.0
+            collectives_start = MpiConfig.comm.collective_count
 
             ConfigOptions.current_output_step = outStep
             OutputObj.outDate = ConfigOptions.current_fcst_cycle + datetime.timedelta(
@@ -159,6 +183,27 @@ def process_forecasts(ConfigOptions, wrfHydroGeoMeta, inputForcingMod, suppPcpMo
             else:
                 ConfigOptions.currentForceNum = 0
                 ConfigOptions.currentCustomForceNum = 0
+
+                # Stage the input files of all products needed up to InputStagingSteps output steps ahead.
+                if ConfigOptions.input_stager is not None:
+                    for forceKey in ConfigOptions.input_forcings:
+                        ConfigOptions.input_stager.stage_inputs(inputForcingMod[forceKey], ConfigOptions,
+                                                                OutputObj.outDate, MpiConfig)
+                        err_handler.check_program_status(ConfigOptions, MpiConfig)
+                    if ConfigOptions.number_supp_pcp > 0:
+                        for suppPcpKey in ConfigOptions.supp_precip_forcings:
+                            ConfigOptions.input_stager.stage_inputs(suppPcpMod[suppPcpKey], ConfigOptions,
+                                                                    OutputObj.outDate, MpiConfig)
+                            err_handler.check_program_status(ConfigOptions, MpiConfig)
+
+                # Queue this output step's input files of all products at once, so they are prepared
+                # concurrently while the products are regridded and layered in order below.
+                if ConfigOptions.prefetch_inputs == 1:
+                    for forceKey in ConfigOptions.input_forcings:
+                        prefetch.prefetch_inputs(inputForcingMod[forceKey], ConfigOptions, OutputObj.outDate, [0],
+                                                 MpiConfig)
+                        err_handler.check_program_status(ConfigOptions, MpiConfig)
+
                 # Loop over each of the input forcings specifed.
                 for forceKey in ConfigOptions.input_forcings:
                     input_forcings = inputForcingMod[forceKey]
@@ -193,6 +238,13 @@ def process_forecasts(ConfigOptions, wrfHydroGeoMeta, inputForcingMod, suppPcpMo
 
                         input_forcings.rstFlag = 0
 
+                    # Queue the input file needed by the next output step while this one is processed.
+                    if ConfigOptions.prefetch_inputs == 1 and outStep < ConfigOptions.num_output_steps:
+                        prefetch.prefetch_next_inputs(input_forcings, ConfigOptions, OutputObj.outDate +
+                                                      datetime.timedelta(seconds=ConfigOptions.output_freq * 60),
+                                                      MpiConfig)
+                        err_handler.check_program_status(ConfigOptions, MpiConfig)
+
                     # Run temporal interpolation on the grids.
                     input_forcings.temporal_interpolate_inputs(ConfigOptions, MpiConfig)
                     err_handler.check_program_status(ConfigOptions, MpiConfig)
@@ -252,6 +304,11 @@ def process_forecasts(ConfigOptions, wrfHydroGeoMeta, inputForcingMod, suppPcpMo
                 OutputObj.output_final_ldasin(ConfigOptions, wrfHydroGeoMeta, MpiConfig)
                 err_handler.check_program_status(ConfigOptions, MpiConfig)
 
+                if MpiConfig.rank == 0:
+                    ConfigOptions.statusMsg = "MPI collectives for this output step: " + \
+                                              str(MpiConfig.comm.collective_count - collectives_start)
+                    err_handler.log_msg(ConfigOptions, MpiConfig)
+
         if (not ConfigOptions.ana_flag) or (fcstCycleNum == (ConfigOptions.nFcsts - 1)):
             if MpiConfig.rank == 0:
                 ConfigOptions.statusMsg = "Forcings complete for forecast cycle: " + \
@@ -267,10 +324,29 @@ def process_forecasts(ConfigOptions, wrfHydroGeoMeta, inputForcingMod, suppPcpMo
                     err_handler.err_out_screen_para(ConfigOptions.errMsg, MpiConfig)
 
             # Success.... Now touch an empty complete file for this forecast cycle to indicate
-            # completion in case the code is re-ran.
-            try:
-                open(completeFlag, 'a').close()
-            except:
-                ConfigOptions.errMsg = "Unable to create completion file: " + completeFlag
-                err_handler.log_critical(ConfigOptions, MpiConfig)
+            # completion in case the code is re-ran. With output servers, the servers touch it
+            # once they have written all of this cycle's output files.
+            if MpiConfig.io_servers is not None:
+                MpiConfig.io_servers.mark_complete(completeFlag, MpiConfig)
+            else:
+                try:
+                    open(completeFlag, 'a').close()
+                except:
+                    ConfigOptions.errMsg = "Unable to create completion file: " + completeFlag
+                    err_handler.log_critical(ConfigOptions, MpiConfig)
             err_handler.check_program_status(ConfigOptions, MpiConfig)
+
+    # Stop the prefetch helper thread, removing any unused prefetched files.
+    if ConfigOptions.prefetcher is not None:
+        ConfigOptions.prefetcher.shutdown()
+        ConfigOptions.prefetcher = None
+    # Stop the staging helper threads, removing the staged files.
+    if ConfigOptions.input_stager is not None:
+        ConfigOptions.input_stager.shutdown()
+        ConfigOptions.input_stager = None
+    row_threads.shutdown()
+
+    # Wait for the output servers to receive the last output files, and stop them.
+    if MpiConfig.io_servers is not None:
+        MpiConfig.io_servers.shutdown(MpiConfig)
+        MpiConfig.io_servers = None
@@ -1,9 +1,12 @@
+import hashlib
 import math
 
 import ESMF
 import numpy as np
 from netCDF4 import Dataset
 
+from core import ioMod
+
 
 class GeoMetaWrfHydro:
     """
@@ -37,6 +40,7 @@ class GeoMetaWrfHydro:
         self.y_coord_atts = None
         self.y_coords = None
         self.spatial_global_atts = None
+        self.grid_digest = None
         
     def get_processor_bounds(self):
         """
@@ -67,6 +71,7 @@ class GeoMetaWrfHydro:
         """
         # Open the geogrid file and extract necessary information
         # to create ESMF fields.
+        idTmp = None
         if MpiConfig.rank == 0:
             try:
                 idTmp = Dataset(ConfigOptions.geogrid,'r')
@@ -132,15 +137,22 @@ class GeoMetaWrfHydro:
         # Obtain the local boundaries for this processor.
         self.get_processor_bounds()
 
-        # Scatter global XLAT_M grid to processors..
-        if MpiConfig.rank == 0:
-            varTmp = idTmp.variables['XLAT_M'][0,:,:]
-        else:
-            varTmp = None
+        # With parallel reads enabled, every processor opens the geogrid file
+        # and reads its own hyperslab of the static fields.
+        if ConfigOptions.parallel_reads == 1 and MpiConfig.rank != 0:
+            try:
+                idTmp = Dataset(ConfigOptions.geogrid,'r')
+            except:
+                ConfigOptions.errMsg = "Unable to open the WRF-Hydro " + \
+                                       "geogrid file: " + ConfigOptions.geogrid + \
+                                       " on RANK: " + str(MpiConfig.rank)
+                raise Exception
 
-        #MpiConfig.comm.barrier()
+        # Start a content hash of the destination grid, used to key cached regridding weights.
+        gridHash = hashlib.sha1()
 
-        varSubTmp = MpiConfig.scatter_array(self,varTmp,ConfigOptions)
+        # Scatter global XLAT_M grid to processors..
+        varSubTmp = self.read_geogrid_field(idTmp,'XLAT_M',ConfigOptions,MpiConfig,gridHash=gridHash)
 
         #MpiConfig.comm.barrier()
 
@@ -158,14 +170,16 @@ class GeoMetaWrfHydro:
         #MpiConfig.comm.barrier()
 
         # Scatter global XLONG_M grid to processors..
-        if MpiConfig.rank == 0:
-            varTmp = idTmp.variables['XLONG_M'][0, :, :]
-        else:
-            varTmp = None
+        varSubTmp = self.read_geogrid_field(idTmp,'XLONG_M',ConfigOptions,MpiConfig,gridHash=gridHash)
 
-        #MpiConfig.comm.barrier()
-
-        varSubTmp = MpiConfig.scatter_array(self,varTmp,ConfigOptions)
+        # The digest is taken over the global grids on rank 0, so it does not depend on the
+        # number of processors or on parallel reads, where each processor only reads its slab.
+        if MpiConfig.rank == 0:
+            if ConfigOptions.parallel_reads == 1:
+                for varName in ['XLAT_M', 'XLONG_M']:
+                    gridHash.update(np.ascontiguousarray(np.ma.getdata(idTmp.variables[varName][0,:,:])).data)
+            self.grid_digest = gridHash.hexdigest()
+        self.grid_digest = MpiConfig.comm.bcast(self.grid_digest, root=0)
 
         #MpiConfig.comm.barrier()
 
@@ -181,44 +195,23 @@ class GeoMetaWrfHydro:
         #MpiConfig.comm.barrier()
 
         # Scatter the COSALPHA,SINALPHA grids to the processors.
-        if MpiConfig.rank == 0:
-            varTmp = idTmp.variables['COSALPHA'][0,:,:]
-        else:
-            varTmp = None
-        #MpiConfig.comm.barrier()
-
-        varSubTmp = MpiConfig.scatter_array(self,varTmp,ConfigOptions)
+        varSubTmp = self.read_geogrid_field(idTmp,'COSALPHA',ConfigOptions,MpiConfig)
         #MpiConfig.comm.barrier()
 
         self.cosa_grid = varSubTmp[:,:]
         varSubTmp = None
-        varTmp = None
-
-        if MpiConfig.rank == 0:
-            varTmp = idTmp.variables['SINALPHA'][0, :, :]
-        else:
-            varTmp = None
-        #MpiConfig.comm.barrier()
 
-        varSubTmp = MpiConfig.scatter_array(self, varTmp, ConfigOptions)
+        varSubTmp = self.read_geogrid_field(idTmp,'SINALPHA',ConfigOptions,MpiConfig)
         #MpiConfig.comm.barrier()
         self.sina_grid = varSubTmp[:, :]
         varSubTmp = None
-        varTmp = None
 
         # Read in a scatter the WRF-Hydro elevation, which is used for downscaling
         # purposes.
-        if MpiConfig.rank == 0:
-            varTmp = idTmp.variables['HGT_M'][0, :, :]
-        else:
-            varTmp = None
-        #MpiConfig.comm.barrier()
-
-        varSubTmp = MpiConfig.scatter_array(self, varTmp, ConfigOptions)
+        varSubTmp = self.read_geogrid_field(idTmp,'HGT_M',ConfigOptions,MpiConfig)
         #MpiConfig.comm.barrier()
         self.height = varSubTmp
         varSubTmp = None
-        varTmp = None
 
         # Calculate the slope from the domain using elevation on the WRF-Hydro domain. This will
         # be used for downscaling purposes.
@@ -232,17 +225,17 @@ class GeoMetaWrfHydro:
             slp_azi_tmp = None
         #MpiConfig.comm.barrier()
 
-        slopeSubTmp = MpiConfig.scatter_array(self,slopeTmp,ConfigOptions)
+        slopeSubTmp = MpiConfig.share_array(self,slopeTmp,ConfigOptions,'GEOGRID_SLOPE')
         self.slope = slopeSubTmp[:,:]
         slopeSubTmp = None
         #MpiConfig.comm.barrier()
 
-        slp_azi_sub = MpiConfig.scatter_array(self,slp_azi_tmp,ConfigOptions)
+        slp_azi_sub = MpiConfig.share_array(self,slp_azi_tmp,ConfigOptions,'GEOGRID_SLP_AZI')
         self.slp_azi = slp_azi_sub[:,:]
         slp_azi_tmp = None
         #MpiConfig.comm.barrier()
 
-        if MpiConfig.rank == 0:
+        if MpiConfig.rank == 0 or ConfigOptions.parallel_reads == 1:
             # Close the geogrid file
             try:
                 idTmp.close()
@@ -253,7 +246,60 @@ class GeoMetaWrfHydro:
         # Reset temporary variables to free up memory
         slopeTmp = None
         slp_azi_tmp = None
+
+    def read_geogrid_field(self,idTmp,varName,ConfigOptions,MpiConfig,gridHash=None):
+        """
+        Function to obtain this processor's slab of a static geogrid field. With
+        parallel reads enabled, each processor reads its own hyperslab, otherwise
+        rank 0 reads the global field and scatters it.
+        :param idTmp:
+        :param varName:
+        :param ConfigOptions:
+        :param MpiConfig:
+        :param gridHash: Optional hash object updated with the global field values, without parallel reads.
+        :return:
+        """
+        if MpiConfig.node_comm is not None:
+            return self.share_geogrid_field(idTmp,varName,ConfigOptions,MpiConfig,gridHash=gridHash)
+
+        if ConfigOptions.parallel_reads == 1:
+            varSubTmp = ioMod.read_local_slab(idTmp,varName,self,ConfigOptions,MpiConfig)
+            if varSubTmp is None:
+                raise Exception
+            return varSubTmp
+
+        if MpiConfig.rank == 0:
+            varTmp = idTmp.variables[varName][0,:,:]
+            if gridHash is not None:
+                gridHash.update(np.ascontiguousarray(np.ma.getdata(varTmp)).data)
+        else:
+            varTmp = None
+
+        return MpiConfig.scatter_array(self,varTmp,ConfigOptions)
+
+    def share_geogrid_field(self,idTmp,varName,ConfigOptions,MpiConfig,gridHash=None):
+        """
+        Function to place a static geogrid field in node-level shared memory and
+        return a view of this processor's slab. With parallel reads enabled, each
+        node leader reads the field itself, otherwise rank 0 reads and broadcasts it.
+        The grid hash is computed as by read_geogrid_field.
+        :param idTmp:
+        :param varName:
+        :param ConfigOptions:
+        :param MpiConfig:
+        :param gridHash: Optional hash object updated with the field values.
+        :return:
+        """
         varTmp = None
+        readRows = None
+        if ConfigOptions.parallel_reads == 1:
+            readRows = lambda yLower, yUpper: idTmp.variables[varName][0,yLower:yUpper,:]
+        elif MpiConfig.rank == 0:
+            varTmp = idTmp.variables[varName][0,:,:]
+            if gridHash is not None:
+                gridHash.update(np.ascontiguousarray(np.ma.getdata(varTmp)).data)
+
+        return MpiConfig.share_array(self,varTmp,ConfigOptions,'GEOGRID_' + varName,read_rows=readRows)
 
     def initialize_geospatial_metadata(self,ConfigOptions,MpiConfig):
         """
@@ -368,6 +414,13 @@ class GeoMetaWrfHydro:
                 ConfigOptions.errMsg = "Unable to close spatial metadata file: " + ConfigOptions.spatial_meta
                 raise Exception
 
+        # With parallel output, every processor defines the output file metadata, so they all need it.
+        if ConfigOptions.parallel_output == 1:
+            self.x_coords, self.y_coords, self.x_coord_atts, self.y_coord_atts, self.crs_atts, \
+                self.spatial_global_atts = MpiConfig.comm.bcast(
+                    (self.x_coords, self.y_coords, self.x_coord_atts, self.y_coord_atts, self.crs_atts,
+                     self.spatial_global_atts), root=0)
+
         #MpiConfig.comm.barrier()
 
     def calc_slope(self,idTmp,ConfigOptions):
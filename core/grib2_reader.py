@@ -0,0 +1,430 @@
+"""
+In-process GRIB2 reader. Decodes GRIB2 messages with ecCodes and returns an
+in-memory object exposing the same variable naming and layout as the NetCDF
+files produced by "wgrib2 -netcdf", so the regridding routines can use either.
+
+Forecast GRIB2 files hold hundreds of messages, of which only a handful are
+needed. The messages are located through the file's wgrib2-style ".idx"
+inventory, so only the byte ranges of the matching messages are read. Files
+without an inventory are scanned once and their inventory is written next to
+them (or kept in memory if the directory is not writable). Inventories are
+cached in memory, so the repeated matches on the same file reuse them.
+"""
+import gzip
+import mmap
+import os
+import re
+import threading
+
+import numpy as np
+
+try:
+    import eccodes
+except ImportError:
+    eccodes = None
+
+# Mapping of (discipline, parameter category, parameter number) to the wgrib2
+# variable abbreviations used by the forcing engine.
+GRIB2_NAMES = {
+    (0, 0, 0): 'TMP',
+    (0, 1, 0): 'SPFH',
+    (0, 1, 7): 'PRATE',
+    (0, 1, 8): 'APCP',
+    (0, 2, 2): 'UGRD',
+    (0, 2, 3): 'VGRD',
+    (0, 3, 0): 'PRES',
+    (0, 3, 5): 'HGT',
+    (0, 4, 7): 'DSWRF',
+    (0, 5, 3): 'DLWRF',
+    (209, 3, 51): 'RadarQualityIndex',
+    (209, 6, 1): 'GaugeCorrQPE01H',
+    (209, 6, 2): 'RadarOnlyQPE01H',
+    (209, 6, 30): 'MultiSensorQPE01H',
+    (209, 6, 37): 'MultiSensorQPE01H'
+}
+
+# Mapping of GRIB2 fixed surface types to wgrib2 level descriptions.
+GRIB2_LEVELS = {
+    1: 'surface',
+    102: '{} m above mean sea level',
+    103: '{} m above ground'
+}
+
+# Inventories of the GRIB2 files read so far, keyed by path, along with the
+# size and modification time of the file they were taken from.
+_inventories = {}
+_inventory_lock = threading.Lock()
+
+# ecCodes is only thread-safe when built with ECCODES_THREADS, so the messages
+# are decoded one at a time, whichever thread (or prefetch helper) decodes them.
+_eccodes_lock = threading.Lock()
+
+
+class Grib2Variable:
+    """
+    Minimal NetCDF-like variable holding a decoded GRIB2 field. Indexing
+    returns a copy, as a NetCDF read would, so callers may modify the result.
+    """
+    def __init__(self, data, dimensions):
+        self._data = data
+        self.dimensions = dimensions
+        self.shape = data.shape
+        self.ndim = data.ndim
+
+    def __getitem__(self, key):
+        return np.ma.array(self._data[key], copy=True)
+
+
+class Grib2Dataset:
+    """
+    Minimal NetCDF-like dataset holding the decoded GRIB2 fields along
+    with the latitude/longitude coordinates of the grid.
+    """
+    def __init__(self, file_path):
+        self.filepath = file_path
+        self.variables = {}
+
+    def __getitem__(self, key):
+        return self.variables[key]
+
+    def close(self):
+        self.variables = {}
+
+
+def decompress(file_path):
+    """
+    Function to read a (optionally gzipped) GRIB2 file into memory. Gzipped
+    files, including multi-member ones written by pigz or bgzip, are
+    decompressed in memory. zlib releases the GIL while decompressing, so
+    several files can be decompressed concurrently on threads.
+    :param file_path:
+    :return: The uncompressed GRIB2 bytes.
+    """
+    with open(file_path, 'rb') as f_in:
+        buffer = f_in.read()
+    if buffer[:2] == b'\x1f\x8b':
+        buffer = gzip.decompress(buffer)
+    return buffer
+
+
+def split_fields(message):
+    """
+    Function to split a GRIB2 message holding several fields (sub-messages,
+    repeating sections 2-7 or 3-7 or 4-7) into one message per field, as
+    ecCodes only decodes the first field of a message it is handed. The
+    sections a field does not repeat are carried over from the previous
+    fields, including a bitmap marked as predefined (indicator 254).
+    :param message: Raw GRIB2 message.
+    :return: List of the single-field messages, in field order.
+    """
+    sections = {}
+    bitmap = None
+    fields = []
+    # Sections 1 to 7 start with their length (4 octets) and number (1 octet), after section 0.
+    pos = 16
+    while pos + 5 <= len(message) - 4:
+        sec_len = int.from_bytes(message[pos:pos + 4], 'big')
+        sec_num = message[pos + 4]
+        if sec_len < 5:
+            break
+        section = message[pos:pos + sec_len]
+        if sec_num == 6:
+            if section[5] == 254 and bitmap is not None:
+                section = bitmap
+            elif section[5] == 0:
+                bitmap = section
+        sections[sec_num] = section
+        if sec_num == 7:
+            fields.append(b''.join(sections.get(num, b'') for num in range(1, 8)))
+        pos += sec_len
+
+    if len(fields) <= 1:
+        return [message]
+    # Section 0 is repeated with the total length of each field's message.
+    return [message[:8] + (16 + len(body) + 4).to_bytes(8, 'big') + body + b'7777' for body in fields]
+
+
+def grib2_messages(file_path, buffer=None):
+    """
+    Generator yielding the raw GRIB2 messages of a (optionally gzipped) file,
+    read into memory in a single pass, one message per field.
+    :param file_path:
+    :param buffer: Uncompressed contents of the file, if already in memory.
+    :return:
+    """
+    if buffer is None:
+        buffer = decompress(file_path)
+
+    offset = buffer.find(b'GRIB')
+    while offset >= 0:
+        # Octets 9-16 of section 0 hold the total length of a GRIB2 message.
+        msg_len = int.from_bytes(buffer[offset + 8:offset + 16], 'big')
+        for field in split_fields(buffer[offset:offset + msg_len]):
+            yield field
+        offset = buffer.find(b'GRIB', offset + msg_len)
+
+
+def inventory_entry(gid):
+    """
+    Function to compose the wgrib2-style inventory fields (name, level, time)
+    of a GRIB2 message, used for field matching and variable naming.
+    :param gid:
+    :return:
+    """
+    key = (eccodes.codes_get(gid, 'discipline'), eccodes.codes_get(gid, 'parameterCategory'),
+           eccodes.codes_get(gid, 'parameterNumber'))
+    name = GRIB2_NAMES.get(key, eccodes.codes_get(gid, 'shortName'))
+
+    surface = eccodes.codes_get(gid, 'typeOfFirstFixedSurface')
+    level_fmt = GRIB2_LEVELS.get(surface, 'level {}'.format(surface))
+    if '{}' in level_fmt:
+        value = eccodes.codes_get(gid, 'scaledValueOfFirstFixedSurface') / \
+            10 ** eccodes.codes_get(gid, 'scaleFactorOfFirstFixedSurface')
+        level_fmt = level_fmt.format(int(value) if float(value).is_integer() else value)
+
+    eccodes.codes_set(gid, 'stepUnits', 'h')
+    step_type = eccodes.codes_get(gid, 'stepType')
+    start_step = eccodes.codes_get(gid, 'startStep')
+    end_step = eccodes.codes_get(gid, 'endStep')
+    if step_type == 'accum':
+        time_str = "{}-{} hour acc fcst".format(start_step, end_step)
+    elif step_type == 'avg':
+        time_str = "{}-{} hour ave fcst".format(start_step, end_step)
+    elif end_step == 0:
+        time_str = "anl"
+    else:
+        time_str = "{} hour fcst".format(end_step)
+
+    return name, level_fmt, time_str
+
+
+def read_idx(idx_path, file_size):
+    """
+    Function to read a wgrib2-style inventory ("n:offset:d=date:VAR:level:time:")
+    of a GRIB2 file.
+    :param idx_path:
+    :param file_size: Size of the GRIB2 file, used to reject inventories of another file.
+    :return: List of the (byte offset, inventory line) of each message, None if unusable.
+    """
+    entries = []
+    try:
+        with open(idx_path, 'r') as idx_file:
+            for line in idx_file:
+                line = line.rstrip('\n')
+                if line:
+                    entries.append((int(line.split(':')[1]), line))
+    except (OSError, ValueError, IndexError):
+        return None
+
+    if not entries or max(offset for offset, line in entries) >= file_size:
+        return None
+    return entries
+
+
+def scan_inventory(file_path):
+    """
+    Function to build the wgrib2-style inventory of a GRIB2 file by scanning
+    its messages once. As with wgrib2, the fields of a message holding several
+    are listed as "n.1", "n.2", ... at the offset of their message.
+    :param file_path:
+    :return: List of the (byte offset, inventory line) of each field.
+    """
+    entries = []
+    msg_num = 0
+    with open(file_path, 'rb') as f_in, mmap.mmap(f_in.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        offset = buffer.find(b'GRIB')
+        while offset >= 0:
+            msg_num += 1
+            msg_len = int.from_bytes(buffer[offset + 8:offset + 16], 'big')
+            fields = split_fields(buffer[offset:offset + msg_len])
+            for field_num, field in enumerate(fields, start=1):
+                with _eccodes_lock:
+                    gid = eccodes.codes_new_from_message(field)
+                    try:
+                        name, level, time_str = inventory_entry(gid)
+                        date = "{:08d}{:02d}".format(eccodes.codes_get(gid, 'dataDate'),
+                                                     eccodes.codes_get(gid, 'dataTime') // 100)
+                    finally:
+                        eccodes.codes_release(gid)
+                record = str(msg_num) if len(fields) == 1 else "{}.{}".format(msg_num, field_num)
+                entries.append((offset, "{}:{}:d={}:{}:{}:{}:".format(record, offset, date, name, level,
+                                                                      time_str)))
+            offset = buffer.find(b'GRIB', offset + msg_len)
+    return entries
+
+
+def write_idx(idx_path, entries):
+    """
+    Function to write a wgrib2-style inventory next to its GRIB2 file. The
+    inventory is only an optimization, so failing to write it is not an error.
+    :param idx_path:
+    :param entries:
+    :return:
+    """
+    tmp_path = "{}.{}.{}.tmp".format(idx_path, os.getpid(), threading.get_ident())
+    try:
+        with open(tmp_path, 'w') as idx_file:
+            idx_file.writelines(line + '\n' for offset, line in entries)
+        os.replace(tmp_path, idx_path)
+    except OSError:
+        if os.path.isfile(tmp_path):
+            os.remove(tmp_path)
+
+
+def grib2_inventory(file_path, rescan=False):
+    """
+    Function to return the inventory of a GRIB2 file, from the in-memory cache,
+    the ".idx" file next to it, or by scanning the file.
+    :param file_path:
+    :param rescan: Scan the file even if an inventory exists, as it was found to be out of date.
+    :return: List of the (byte offset, inventory line) of each message, None if not available.
+    """
+    stat = os.stat(file_path)
+    file_key = (stat.st_size, stat.st_mtime_ns)
+    with _inventory_lock:
+        cached = _inventories.get(file_path)
+    if cached is not None and cached[0] == file_key and not rescan:
+        return cached[1]
+
+    idx_path = file_path + '.idx'
+    entries = None if rescan else read_idx(idx_path, stat.st_size)
+    if entries is None:
+        if eccodes is None:
+            return None
+        entries = scan_inventory(file_path)
+        if not entries:
+            # Not a plain GRIB2 file, such as a compressed one.
+            return None
+        write_idx(idx_path, entries)
+
+    with _inventory_lock:
+        _inventories[file_path] = (file_key, entries)
+    return entries
+
+
+def matching_messages(file_path, match):
+    """
+    Function to read the GRIB2 messages of a file whose inventory line matches
+    the given regular expression, seeking to their byte ranges.
+    :param file_path:
+    :param match: Regular expression as passed to "wgrib2 -match", or None for all messages.
+    :return: List of the raw single-field messages, None if the file has no usable inventory.
+    """
+    # Byte ranges cannot be read from compressed files.
+    if file_path.endswith('.gz'):
+        return None
+
+    for rescan in (False, True):
+        entries = grib2_inventory(file_path, rescan=rescan)
+        if entries is None:
+            return None
+        # The fields of a multi-field message share its offset, and are numbered "n.m" in the
+        # inventory. Each message is read once, and the matching fields taken out of it.
+        wanted = {}
+        for offset, line in entries:
+            if match is None or re.search(match, line):
+                record = line.split(':')[0]
+                field_num = int(record.split('.')[1]) if '.' in record else 1
+                wanted.setdefault(offset, []).append(field_num)
+
+        messages = []
+        with open(file_path, 'rb') as f_in:
+            for offset, field_nums in sorted(wanted.items()):
+                f_in.seek(offset)
+                header = f_in.read(16)
+                if header[:4] != b'GRIB':
+                    # The inventory does not describe this file, scan it instead.
+                    break
+                msg_len = int.from_bytes(header[8:16], 'big')
+                fields = split_fields(header + f_in.read(msg_len - 16))
+                if max(field_nums) > len(fields):
+                    break
+                messages.extend(fields[field_num - 1] for field_num in field_nums)
+            else:
+                return messages
+    return None
+
+
+def extract_grib2(file_path, match, subset_path):
+    """
+    Function to write the GRIB2 messages of a file matching the given regular
+    expression into a smaller GRIB2 file, so wgrib2 only has to process those.
+    :param file_path:
+    :param match: Regular expression as passed to "wgrib2 -match".
+    :param subset_path:
+    :return: True if the subset file was written, False if the file has no usable inventory.
+    """
+    messages = matching_messages(file_path, match)
+    if messages is None:
+        return False
+    with open(subset_path, 'wb') as f_out:
+        for message in messages:
+            f_out.write(message)
+    return True
+
+
+def read_grib2(file_path, match=None, buffer=None):
+    """
+    Function to decode the GRIB2 messages of a file whose wgrib2-style inventory
+    entry (":VAR:level:time:") matches the given regular expression. Fields
+    are returned south to north, as wgrib2 -netcdf would write them.
+    :param file_path:
+    :param match: Regular expression as passed to "wgrib2 -match", or None for all messages.
+    :param buffer: Uncompressed contents of the file, if already in memory.
+    :return:
+    """
+    if eccodes is None:
+        raise ImportError("The eccodes package is required for in-process GRIB2 decoding.")
+
+    # Read only the matching messages if the file has an inventory, otherwise
+    # read through the whole file and match the messages as they are decoded.
+    messages = matching_messages(file_path, match) if buffer is None else None
+    matched = messages is not None
+    if not matched:
+        messages = grib2_messages(file_path, buffer)
+
+    dataset = Grib2Dataset(file_path)
+    for message in messages:
+        with _eccodes_lock:
+            gid = eccodes.codes_new_from_message(message)
+            try:
+                name, level, time_str = inventory_entry(gid)
+                if not matched and match is not None and \
+                        not re.search(match, ':{}:{}:{}:'.format(name, level, time_str)):
+                    continue
+                var_name = name + '_' + re.sub('[^A-Za-z0-9]', '', level)
+                if var_name in dataset.variables:
+                    continue
+
+                nx = eccodes.codes_get(gid, 'Ni')
+                ny = eccodes.codes_get(gid, 'Nj')
+                flip = eccodes.codes_get(gid, 'jScansPositively') == 0
+
+                values = eccodes.codes_get_values(gid).reshape(ny, nx)
+                if eccodes.codes_get(gid, 'bitmapPresent'):
+                    values = np.ma.masked_equal(values, eccodes.codes_get(gid, 'missingValue'))
+                else:
+                    values = np.ma.array(values)
+                if flip:
+                    values = values[::-1, :]
+                dataset.variables[var_name] = Grib2Variable(values[np.newaxis, :, :],
+                                                            ('time', 'latitude', 'longitude'))
+
+                if 'latitude' not in dataset.variables:
+                    if eccodes.codes_get(gid, 'gridType') == 'regular_ll':
+                        lats = np.sort(eccodes.codes_get_array(gid, 'distinctLatitudes'))
+                        lons = eccodes.codes_get_array(gid, 'distinctLongitudes')
+                        dataset.variables['latitude'] = Grib2Variable(lats, ('latitude',))
+                        dataset.variables['longitude'] = Grib2Variable(lons, ('longitude',))
+                    else:
+                        lats = eccodes.codes_get_array(gid, 'latitudes').reshape(ny, nx)
+                        lons = eccodes.codes_get_array(gid, 'longitudes').reshape(ny, nx)
+                        if flip:
+                            lats = lats[::-1, :]
+                            lons = lons[::-1, :]
+                        dataset.variables['latitude'] = Grib2Variable(lats, ('latitude', 'longitude'))
+                        dataset.variables['longitude'] = Grib2Variable(lons, ('latitude', 'longitude'))
+            finally:
+                eccodes.codes_release(gid)
+
+    return dataset
@@ -0,0 +1,250 @@
+"""
+Staging of input files to node-local storage. Input files are otherwise read
+straight out of the input directories on the shared file system, one output
+step at a time, each open paying the file system's metadata and cold cache
+latency on the critical path. Each output step, the files that the next
+InputStagingSteps output steps will need are worked out with the products'
+neighbor file routines, and helper threads on rank 0 hard-link or copy them
+into a node-local directory (such as /dev/shm or a local SSD). The I/O
+routines on rank 0 then open the staged copies in place of the originals.
+Staged files are removed once the output steps needing them have passed.
+"""
+import copy
+import datetime
+import hashlib
+import logging
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from core import err_handler
+
+# Number of helper threads staging files on rank 0.
+STAGING_THREADS = 4
+
+# Regridded state grids replaced by placeholders on the neighbor file probes.
+PROBE_PLACEHOLDERS = ['regridded_forcings1', 'regridded_forcings2', 'regridded_precip1', 'regridded_precip2',
+                      'regridded_rqi1', 'regridded_rqi2']
+
+
+class InputStager:
+    """
+    Class holding the node-local staging directory, the helper threads on
+    rank 0 and the files staged so far.
+    """
+    def __init__(self, config_options, mpi_config):
+        self.steps = config_options.input_staging_steps
+        # Keep each job's files apart, as several jobs may share the node-local storage.
+        self.stage_dir = None
+        if mpi_config.rank == 0:
+            self.stage_dir = os.path.join(config_options.input_staging_dir, "STAGED_INPUTS_" + str(os.getpid()))
+        self.stage_dir = mpi_config.comm.bcast(self.stage_dir, root=0)
+
+        # Source path -> (future of the staged path, forecast cycle and output step it is last needed on).
+        self.staged = {}
+        # (Product, forecast cycle) -> last output step whose files have been worked out.
+        self.probed = {}
+        self.executor = None
+
+        if mpi_config.rank == 0:
+            try:
+                os.makedirs(self.stage_dir, exist_ok=True)
+            except OSError:
+                config_options.errMsg = "Unable to create input staging directory: " + self.stage_dir
+                err_handler.log_critical(config_options, mpi_config)
+            self.executor = ThreadPoolExecutor(max_workers=STAGING_THREADS)
+        err_handler.check_program_status(config_options, mpi_config)
+
+    def stage_inputs(self, product, config_options, d_current, mpi_config):
+        """
+        Function to stage the input files a forcing or supplemental precipitation
+        product will need up to InputStagingSteps output steps ahead of the
+        current one. Only the output steps not worked out on an earlier call are
+        probed. This must be called on all processors.
+        :param product:
+        :param config_options:
+        :param d_current: Output date of the current output step.
+        :param mpi_config:
+        :return:
+        """
+        step = config_options.current_output_step
+        last_step = min(config_options.num_output_steps, step + self.steps)
+        key = (product.productName, config_options.current_fcst_cycle)
+        self.probed = {probed_key: probed_step for probed_key, probed_step in self.probed.items()
+                       if probed_key[1] == config_options.current_fcst_cycle}
+        first_step = max(self.probed.get(key, step - 1) + 1, step)
+        self.probed[key] = max(self.probed.get(key, step - 1), last_step)
+        if first_step > last_step:
+            return
+
+        probes = probe_neighbor_files(product, config_options, d_current,
+                                      range(first_step - step, last_step - step + 1), mpi_config)
+
+        if mpi_config.rank == 0:
+            for step_ahead, probe in zip(range(first_step - step, last_step - step + 1), probes):
+                needed_until = (config_options.current_fcst_cycle, step + step_ahead)
+                for path in [probe.file_in1, probe.file_in2, getattr(probe, 'rqi_file_in1', None),
+                             getattr(probe, 'rqi_file_in2', None)]:
+                    self.submit(path, needed_until)
+            self.evict((config_options.current_fcst_cycle, step))
+
+    def submit(self, path, needed_until):
+        """
+        Function to queue the staging of an input file, or extend the time a
+        staged file is kept for.
+        :param path:
+        :param needed_until: Forecast cycle and output step the file is needed until.
+        :return:
+        """
+        if not path or not os.path.isfile(path):
+            return
+        if path in self.staged:
+            future, kept_until = self.staged[path]
+            self.staged[path] = (future, max(kept_until, needed_until))
+            return
+
+        # Keep the file name, as the readers go by its extension.
+        staged_path = os.path.join(self.stage_dir, hashlib.sha1(os.path.abspath(path).encode()).hexdigest()[:16] +
+                                   "." + os.path.basename(path))
+        self.staged[path] = (self.executor.submit(stage_file, path, staged_path), needed_until)
+
+    def resolve(self, path, wait=True):
+        """
+        Function to return the staged copy of an input file to read in place
+        of the original. The original is returned if the file was not staged,
+        failed to stage, or has changed since it was staged.
+        :param path:
+        :param wait: Wait on a file still being staged, rather than reading the original.
+        :return:
+        """
+        entry = self.staged.get(path)
+        if entry is None or (not wait and not entry[0].done()):
+            return path
+        try:
+            staged_path, signature = entry[0].result()
+            stat = os.stat(path)
+        except Exception:
+            return path
+        if (stat.st_size, stat.st_mtime_ns) != signature:
+            return path
+        return staged_path
+
+    def evict(self, current):
+        """
+        Function to remove the staged files no longer needed on or past the
+        current output step.
+        :param current: Current forecast cycle and output step.
+        :return:
+        """
+        for path, (future, needed_until) in list(self.staged.items()):
+            if needed_until < current:
+                del self.staged[path]
+                discard(future)
+
+    def shutdown(self):
+        """
+        Function to stop the helper threads and remove the staging directory.
+        :return:
+        """
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            shutil.rmtree(self.stage_dir, ignore_errors=True)
+        self.staged = {}
+
+
+def stage_file(path, staged_path):
+    """
+    Function run on the helper threads to hard-link (on the same file system)
+    or copy an input file to its staged path, along with its GRIB2 inventory.
+    :param path:
+    :param staged_path:
+    :return: The staged path, and the size and modification time of the file it was staged from.
+    """
+    stat = os.stat(path)
+    for source, target in [(path, staged_path), (path + '.idx', staged_path + '.idx')]:
+        if source != path and not os.path.isfile(source):
+            continue
+        tmp_path = target + ".tmp"
+        try:
+            os.link(source, tmp_path)
+        except OSError:
+            shutil.copyfile(source, tmp_path)
+        os.replace(tmp_path, target)
+    return staged_path, (stat.st_size, stat.st_mtime_ns)
+
+
+def discard(future):
+    """
+    Function to remove a staged file that is no longer needed, once the
+    helper thread is done with it.
+    :param future:
+    :return:
+    """
+    def remove_result(done):
+        if done.cancelled() or done.exception() is not None:
+            return
+        staged_path = done.result()[0]
+        for target in [staged_path, staged_path + '.idx']:
+            if os.path.isfile(target):
+                os.remove(target)
+
+    if not future.cancel():
+        future.add_done_callback(remove_result)
+
+
+def local_path(path, config_options, wait=True):
+    """
+    Function to return the node-local staged copy of an input file when input
+    staging is enabled, otherwise the file itself. Files are only staged on the
+    node of rank 0, so the other processors always get the file itself.
+    :param path:
+    :param config_options:
+    :param wait: Wait on a file still being staged, rather than reading the original.
+    :return:
+    """
+    if config_options.input_stager is None or not path:
+        return path
+    return config_options.input_stager.resolve(path, wait)
+
+
+def probe_neighbor_files(product, config_options, d_current, steps_ahead, mpi_config):
+    """
+    Function to work out the neighbor files of a forcing or supplemental
+    precipitation product on the given output steps ahead of the current one
+    (0 being the current step). The neighbor files are calculated on shallow
+    copies of the product and configuration, so their state is left untouched.
+    This must be called on all processors as the neighbor routines check the
+    program status.
+    :param product:
+    :param config_options:
+    :param d_current: Output date of the current output step.
+    :param steps_ahead: Increasing numbers of output steps past the current one.
+    :param mpi_config:
+    :return: Copies of the product holding the neighbor files of each output step.
+    """
+    probe = copy.copy(product)
+    probe.enforce = 0
+    # Placeholder grids keep the neighbor routines from modifying the real regridded fields.
+    for name in PROBE_PLACEHOLDERS:
+        grid = getattr(product, name, None)
+        if grid is not None:
+            setattr(probe, name, np.empty([1] * grid.ndim, np.float32))
+
+    probe_config = copy.copy(config_options)
+
+    # Keep the probe out of the log file, it would only repeat the output steps' messages.
+    log_obj = logging.getLogger('logForcing')
+    log_obj.disabled = True
+    probes = []
+    try:
+        for step_ahead in steps_ahead:
+            probe_config.current_output_step = config_options.current_output_step + step_ahead
+            probe.calc_neighbor_files(probe_config, d_current + datetime.timedelta(
+                seconds=config_options.output_freq * 60 * step_ahead), mpi_config)
+            probes.append(copy.copy(probe))
+    finally:
+        log_obj.disabled = False
+
+    return probes
@@ -10,11 +10,15 @@ import math
 import os
 import shutil
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 
+import netCDF4
 import numpy as np
 from netCDF4 import Dataset
 
 from core import err_handler
+from core import grib2_reader
+from core import input_staging
 
 
 class OutputObj:
@@ -29,8 +33,10 @@ class OutputObj:
         self.out_ndv = -9999
 
         # Create local "slabs" to hold final output grids. These
-        # will be collected during the output routine below.
-        self.output_local = np.empty([9, GeoMetaWrfHydro.ny_local, GeoMetaWrfHydro.nx_local])
+        # will be collected during the output routine below. The output
+        # files hold single precision (or packed integer) values, so the
+        # slabs are single precision as well.
+        self.output_local = np.empty([9, GeoMetaWrfHydro.ny_local, GeoMetaWrfHydro.nx_local], np.float32)
         #self.output_local[:,:,:] = self.out_ndv
 
     def output_final_ldasin(self,ConfigOptions,geoMetaWrfHydro,MpiConfig):
@@ -65,6 +71,11 @@ class OutputObj:
                        'time: point', 0.1, 0.0, 3]
         }
 
+        # Hand the local slabs off to the output servers, which write the file asynchronously.
+        if MpiConfig.io_servers is not None:
+            MpiConfig.io_servers.hand_off(self, ConfigOptions, MpiConfig)
+            return
+
         # Compose the ESMF remapped string attribute based on the regridding option chosen by the user.
         # We will default to the regridding method chosen for the first input forcing selected.
         if ConfigOptions.regrid_opt[0] == 1:
@@ -77,12 +88,18 @@ class OutputObj:
         # Ensure all processors are synced up before outputting.
         #MpiConfig.comm.barrier()
 
+        # With parallel output, every processor opens the file and defines the same metadata
+        # collectively, then writes its own slab. Otherwise, only output on the master processor.
+        parallel_output = parallel_output_supported(ConfigOptions, MpiConfig)
+
         idOut = None
-        if MpiConfig.rank == 0:
+        if MpiConfig.rank == 0 or parallel_output:
             while (True):
-                # Only output on the master processor.
                 try:
-                    idOut = Dataset(self.outPath,'w')
+                    if parallel_output:
+                        idOut = Dataset(self.outPath, 'w', parallel=True, comm=MpiConfig.comm)
+                    else:
+                        idOut = Dataset(self.outPath,'w')
                 except Exception as e:
                     ConfigOptions.errMsg = "Unable to create output file: " + self.outPath + "\n" + str(e)
                     err_handler.log_critical(ConfigOptions, MpiConfig)
@@ -167,6 +184,9 @@ class OutputObj:
                 # Create variables.
                 try:
                     idOut.createVariable('time','i4',('time'))
+                    # Extending the unlimited dimension is a collective operation.
+                    if parallel_output:
+                        idOut.variables['time'].set_collective(True)
                 except:
                     ConfigOptions.errMsg = "Unable to create time variable in: " + self.outPath
                     err_handler.log_critical(ConfigOptions, MpiConfig)
@@ -248,6 +268,9 @@ class OutputObj:
                             idOut.createVariable('x', 'f8', ('x'), zlib=True, complevel=2)
                         else:
                             idOut.createVariable('x','f8', ('x'))
+                        # Compressed variables can only be written collectively.
+                        if parallel_output:
+                            idOut.variables['x'].set_collective(True)
                     except:
                         ConfigOptions.errMsg = "Unable to create x variable in: " + self.outPath
                         err_handler.log_critical(ConfigOptions, MpiConfig)
@@ -271,6 +294,9 @@ class OutputObj:
                             idOut.createVariable('y','f8',('y'), zlib=True, complevel=2)
                         else:
                             idOut.createVariable('y', 'f8', ('y'))
+                        # Compressed variables can only be written collectively.
+                        if parallel_output:
+                            idOut.variables['y'].set_collective(True)
                     except:
                         ConfigOptions.errMsg = "Unable to create y variable in: " + self.outPath
                         err_handler.log_critical(ConfigOptions, MpiConfig)
@@ -329,6 +355,8 @@ class OutputObj:
                                              zlib=zlib,
                                              complevel=complevel,
                                              least_significant_digit=least_significant_digit)
+                        if parallel_output:
+                            idOut.variables[varTmp].set_collective(True)
 
                     except:
                         ConfigOptions.errMsg = "Unable to create " + varTmp + " variable in: " + self.outPath
@@ -416,43 +444,42 @@ class OutputObj:
 
         err_handler.check_program_status(ConfigOptions, MpiConfig)
 
-        # Now loop through each variable, collect the data (call on each processor), assemble into the final
-        # output grid, and place into the output file (if on processor 0).
-        for varTmp in output_variable_attribute_dict:
-            # First run a check for missing values. There should be none at this point.
-            # err_handler.check_missing_final(self.outPath, ConfigOptions, self.output_local[output_variable_attribute_dict[varTmp][0], :, :],
-            #                                 varTmp, MpiConfig)
-            # if ConfigOptions.errFlag == 1:
-            #     continue
-
-            # Collect data from the various processors, and place into the output file.
+        if parallel_output:
+            # Each processor writes its own slab of every variable into the output file.
+            for varTmp in output_variable_attribute_dict:
+                try:
+                    idOut.variables[varTmp][0, geoMetaWrfHydro.y_lower_bound:geoMetaWrfHydro.y_upper_bound,
+                                            geoMetaWrfHydro.x_lower_bound:geoMetaWrfHydro.x_upper_bound] = \
+                        self.output_local[output_variable_attribute_dict[varTmp][0], :, :]
+                except (ValueError, IOError, RuntimeError):
+                    ConfigOptions.errMsg = "Unable to write final output slab for: " + varTmp
+                    err_handler.log_critical(ConfigOptions, MpiConfig)
+            err_handler.check_program_status(ConfigOptions, MpiConfig)
+        else:
+            # Collect the local slabs of all variables from the various processors in a single
+            # collective, assembling the final output grids on processor 0.
             try:
-                # TODO change communication call from comm.gather() to comm.Gather for efficency
-                # final = MpiConfig.comm.gather(self.output_local[output_variable_attribute_dict[varTmp][0],:,:],root=0)
-
-                # Use gatherv to merge the data slabs
-                dataOutTmp = MpiConfig.merge_slabs_gatherv(self.output_local[output_variable_attribute_dict[varTmp][0],:,:], ConfigOptions)
+                dataOutStack = MpiConfig.gather_stack(self.output_local, ConfigOptions, geoMetaWrfHydro)
             except Exception as e:
                 print(e)
-                ConfigOptions.errMsg = "Unable to gather final grids for: " + varTmp
+                ConfigOptions.errMsg = "Unable to gather final grids for: " + self.outPath
                 err_handler.log_critical(ConfigOptions, MpiConfig)
-                continue
+                dataOutStack = None
+            err_handler.check_program_status(ConfigOptions, MpiConfig)
 
+            # Now loop through each variable and place it into the output file (if on processor 0).
             if MpiConfig.rank == 0:
-                try:
-                    idOut.variables[varTmp][0, :, :] = dataOutTmp
-                except (ValueError, IOError):
-                    ConfigOptions.errMsg = "Unable to place final output grid for: " + varTmp
-                    err_handler.log_critical(ConfigOptions, MpiConfig)
+                for varTmp in output_variable_attribute_dict:
+                    try:
+                        idOut.variables[varTmp][0, :, :] = dataOutStack[output_variable_attribute_dict[varTmp][0], :, :]
+                    except (ValueError, IOError):
+                        ConfigOptions.errMsg = "Unable to place final output grid for: " + varTmp
+                        err_handler.log_critical(ConfigOptions, MpiConfig)
                 # Reset temporary data objects to keep memory usage down.
-                del dataOutTmp
-
-            # Reset temporary data objects to keep memory usage down.
-            final = None
-
+                del dataOutStack
             err_handler.check_program_status(ConfigOptions, MpiConfig)
 
-        if MpiConfig.rank == 0:
+        if MpiConfig.rank == 0 or parallel_output:
             while (True):
                 # Close the NetCDF file
                 try:
@@ -466,15 +493,50 @@ class OutputObj:
         err_handler.check_program_status(ConfigOptions, MpiConfig)
 
 
+def parallel_output_supported(ConfigOptions, MpiConfig):
+    """
+    Function to check whether parallel output was requested, and that the
+    netCDF4 library supports it. If not, the output falls back to gathering
+    the grids onto the master processor for the rest of the run.
+    :param ConfigOptions:
+    :param MpiConfig:
+    :return:
+    """
+    if ConfigOptions.parallel_output != 1:
+        return False
+
+    reason = None
+    if not getattr(netCDF4, '__has_parallel4_support__', False):
+        reason = "the netCDF4 library was not built with parallel HDF5 support"
+    elif ConfigOptions.useCompression == 1:
+        lib_version = tuple(int(v) for v in netCDF4.__netcdf4libversion__.split()[0].split('.')[:3]
+                            if v.isdigit())
+        if lib_version < (4, 7, 4):
+            reason = "compressed parallel output requires netCDF-C 4.7.4 or later"
+
+    if reason is not None:
+        ConfigOptions.parallel_output = 0
+        if MpiConfig.rank == 0:
+            ConfigOptions.statusMsg = "Parallel output is not available (" + reason + \
+                                      "). Writing output files from the master processor."
+            err_handler.log_warning(ConfigOptions, MpiConfig)
+        return False
+    return True
+
+
 def open_grib2(GribFileIn,NetCdfFileOut,Wgrib2Cmd,ConfigOptions,MpiConfig,
-               inputVar):
+               inputVar,match=None,GribBuffer=None):
     """
     Generic function to convert a GRIB2 file into a NetCDF file. Function
     will also open the NetCDF file, and ensure all necessary inputs are
-    in file.
+    in file. With the in-process GRIB2 reader, the messages matching the
+    wgrib2 match expression are decoded directly into memory instead.
     :param GribFileIn:
     :param NetCdfFileOut:
     :param ConfigOptions:
+    :param match: wgrib2 -match expression used by the in-process reader.
+    :param GribBuffer: Uncompressed GRIB2 bytes already in memory (rank 0). These are
+                       decoded directly, or piped into wgrib2, whose command must then read stdin ("-").
     :return:
     """
     # Ensure all processors are synced up before outputting.
@@ -482,67 +544,130 @@ def open_grib2(GribFileIn,NetCdfFileOut,Wgrib2Cmd,ConfigOptions,MpiConfig,
 
     # Run wgrib2 command to convert GRIB2 file to NetCDF.
     if MpiConfig.rank == 0:
-        # Check to see if output file already exists. If so, delete it and
-        # override.
         ConfigOptions.statusMsg = "Reading in GRIB2 file: " + GribFileIn
         err_handler.log_msg(ConfigOptions, MpiConfig)
-        if os.path.isfile(NetCdfFileOut):
-            ConfigOptions.statusMsg = "Overriding temporary NetCDF file: " + NetCdfFileOut
-            err_handler.log_warning(ConfigOptions, MpiConfig)
-        try:
-            # WCOSS fix for WGRIB2 crashing when called on the same file twice in python
-            if not os.environ.get('MFE_SILENT'):
-                print("command: " + Wgrib2Cmd)
-
-            # set up GRIB2TABLE if needed:
-            if not os.environ.get('GRIB2TABLE'):
-                g2path = os.path.join(ConfigOptions.scratch_dir, "grib2.tbl")
-                with open(g2path, 'wt') as g2t:
-                    g2t.write(
-                            "209:1:0:0:161:1:6:30:MultiSensorQPE01H:"
-                            "Multi-sensor estimated precipitation accumulation 1-hour:mm\n"
-                            "209:1:0:0:161:1:6:37:MultiSensorQPE01H:"
-                            "Multi-sensor estimated precipitation accumulation 1-hour:mm\n"
-                    )
-                os.environ['GRIB2TABLE'] = g2path
-
-            exitcode = subprocess.call(Wgrib2Cmd, shell=True)
-
-            #print("exitcode: " + str(exitcode))
-            # Call WGRIB2 with subprocess.Popen
-            #cmdOutput = subprocess.Popen([Wgrib2Cmd], stdout=subprocess.PIPE,
-            #                             stderr=subprocess.PIPE, shell=True)
-            #out, err = cmdOutput.communicate()
-            #exitcode = cmdOutput.returncode
-        except:
-            ConfigOptions.errMsg = "Unable to convert: " + GribFileIn + " to " + \
-                                   NetCdfFileOut
-            err_handler.log_critical(ConfigOptions, MpiConfig)
-            idTmp = None
-            pass
 
-        # Reset temporary subprocess variables.
-        out = None
-        err = None
-        exitcode = None
+        # Pick up the file if it was already converted/decoded in the background.
+        prefetched = None
+        if ConfigOptions.prefetcher is not None and match is not None:
+            try:
+                prefetched = ConfigOptions.prefetcher.take(GribFileIn, match)
+            except Exception as err:
+                ConfigOptions.statusMsg = "Prefetch of GRIB2 file: " + GribFileIn + " failed (" + \
+                                          str(err) + "). Reading it directly."
+                err_handler.log_warning(ConfigOptions, MpiConfig)
 
-        # Ensure file exists.
-        if not os.path.isfile(NetCdfFileOut):
-            ConfigOptions.errMsg = "Expected NetCDF file: " + NetCdfFileOut + \
-                                   " not found. It's possible the GRIB2 variable was not found."
-            err_handler.log_critical(ConfigOptions, MpiConfig)
-            idTmp = None
-            pass
+        if ConfigOptions.grib2_reader == 1 and prefetched is not None:
+            idTmp = prefetched
+        elif ConfigOptions.grib2_reader == 1:
+            # Decode the matching GRIB2 messages in memory, without wgrib2 or a temporary file.
+            try:
+                idTmp = grib2_reader.read_grib2(input_staging.local_path(GribFileIn, ConfigOptions), match,
+                                                GribBuffer)
+            except Exception as err:
+                ConfigOptions.errMsg = "Unable to decode GRIB2 file: " + GribFileIn + " (" + str(err) + ")"
+                err_handler.log_critical(ConfigOptions, MpiConfig)
+                idTmp = None
+        elif prefetched is not None:
+            # Hand the NetCDF file converted by the prefetcher over to the caller's path.
+            try:
+                os.replace(prefetched, NetCdfFileOut)
+                idTmp = Dataset(NetCdfFileOut, 'r')
+            except OSError as err:
+                ConfigOptions.errMsg = "Unable to open prefetched NetCDF file for: " + GribFileIn + \
+                                       " (" + str(err) + ")"
+                err_handler.log_critical(ConfigOptions, MpiConfig)
+                idTmp = None
+        else:
+            # Check to see if output file already exists. If so, delete it and
+            # override.
+            if os.path.isfile(NetCdfFileOut):
+                ConfigOptions.statusMsg = "Overriding temporary NetCDF file: " + NetCdfFileOut
+                err_handler.log_warning(ConfigOptions, MpiConfig)
 
-        # Open the NetCDF file.
-        try:
-            idTmp = Dataset(NetCdfFileOut,'r')
-        except:
-            ConfigOptions.errMsg = "Unable to open input NetCDF file: " + \
-                                   NetCdfFileOut
-            err_handler.log_critical(ConfigOptions, MpiConfig)
-            idTmp = None
-            pass
+            # Convert the node-local copy of the file if it has been staged.
+            GribFileLocal = input_staging.local_path(GribFileIn, ConfigOptions)
+            if GribFileLocal != GribFileIn:
+                Wgrib2Cmd = Wgrib2Cmd.replace(GribFileIn, GribFileLocal)
+
+            # Cut the matching messages out of the GRIB2 file by their byte ranges, using
+            # its inventory, so wgrib2 only has to read those.
+            subsetFile = None
+            if match is not None and GribBuffer is None:
+                subsetFile = NetCdfFileOut + ".grib2"
+                try:
+                    if grib2_reader.extract_grib2(GribFileLocal, match, subsetFile):
+                        Wgrib2Cmd = Wgrib2Cmd.replace(GribFileLocal, subsetFile)
+                    else:
+                        subsetFile = None
+                except Exception as err:
+                    ConfigOptions.statusMsg = "Unable to extract the matching messages of: " + GribFileIn + \
+                                              " (" + str(err) + "). Converting the whole file."
+                    err_handler.log_warning(ConfigOptions, MpiConfig)
+                    if os.path.isfile(subsetFile):
+                        os.remove(subsetFile)
+                    subsetFile = None
+
+            try:
+                # WCOSS fix for WGRIB2 crashing when called on the same file twice in python
+                if not os.environ.get('MFE_SILENT'):
+                    print("command: " + Wgrib2Cmd)
+
+                # set up GRIB2TABLE if needed:
+                if not os.environ.get('GRIB2TABLE'):
+                    g2path = os.path.join(ConfigOptions.scratch_dir, "grib2.tbl")
+                    with open(g2path, 'wt') as g2t:
+                        g2t.write(
+                                "209:1:0:0:161:1:6:30:MultiSensorQPE01H:"
+                                "Multi-sensor estimated precipitation accumulation 1-hour:mm\n"
+                                "209:1:0:0:161:1:6:37:MultiSensorQPE01H:"
+                                "Multi-sensor estimated precipitation accumulation 1-hour:mm\n"
+                        )
+                    os.environ['GRIB2TABLE'] = g2path
+
+                if GribBuffer is not None:
+                    exitcode = subprocess.run(Wgrib2Cmd, shell=True, input=GribBuffer).returncode
+                else:
+                    exitcode = subprocess.call(Wgrib2Cmd, shell=True)
+
+                #print("exitcode: " + str(exitcode))
+                # Call WGRIB2 with subprocess.Popen
+                #cmdOutput = subprocess.Popen([Wgrib2Cmd], stdout=subprocess.PIPE,
+                #                             stderr=subprocess.PIPE, shell=True)
+                #out, err = cmdOutput.communicate()
+                #exitcode = cmdOutput.returncode
+            except:
+                ConfigOptions.errMsg = "Unable to convert: " + GribFileIn + " to " + \
+                                       NetCdfFileOut
+                err_handler.log_critical(ConfigOptions, MpiConfig)
+                idTmp = None
+                pass
+
+            if subsetFile is not None and os.path.isfile(subsetFile):
+                os.remove(subsetFile)
+
+            # Reset temporary subprocess variables.
+            out = None
+            err = None
+            exitcode = None
+
+            # Ensure file exists.
+            if not os.path.isfile(NetCdfFileOut):
+                ConfigOptions.errMsg = "Expected NetCDF file: " + NetCdfFileOut + \
+                                       " not found. It's possible the GRIB2 variable was not found."
+                err_handler.log_critical(ConfigOptions, MpiConfig)
+                idTmp = None
+                pass
+
+            # Open the NetCDF file.
+            try:
+                idTmp = Dataset(NetCdfFileOut,'r')
+            except:
+                ConfigOptions.errMsg = "Unable to open input NetCDF file: " + \
+                                       NetCdfFileOut
+                err_handler.log_critical(ConfigOptions, MpiConfig)
+                idTmp = None
+                pass
 
         if idTmp is not None:
             # Check for expected lat/lon variables.
@@ -571,9 +696,7 @@ def open_grib2(GribFileIn,NetCdfFileOut,Wgrib2Cmd,ConfigOptions,MpiConfig,
     else:
         idTmp = None
 
-    # Ensure all processors are synced up before outputting.
-    # MpiConfig.comm.barrier()  ## THIS HAPPENS IN check_program_status
-
+    # No barrier is needed here, only rank 0 reads the file and the other processors get no handle.
     err_handler.check_program_status(ConfigOptions, MpiConfig)
 
     # Return the NetCDF file handle back to the user.
@@ -601,9 +724,9 @@ def open_netcdf_forcing(NetCdfFileIn, ConfigOptions, MpiConfig, open_on_all_proc
             err_handler.log_critical(ConfigOptions, MpiConfig)
             idTmp = None
 
-        # Open the NetCDF file.
+        # Open the NetCDF file, or its node-local copy if it has been staged.
         try:
-            idTmp = Dataset(NetCdfFileIn, 'r')
+            idTmp = Dataset(input_staging.local_path(NetCdfFileIn, ConfigOptions), 'r')
         except:
             ConfigOptions.errMsg = "Unable to open input NetCDF file: " + \
                                     NetCdfFileIn
@@ -631,6 +754,85 @@ def open_netcdf_forcing(NetCdfFileIn, ConfigOptions, MpiConfig, open_on_all_proc
     return idTmp
 
 
+def open_netcdf_all_procs(NetCdfFileIn, idTmp, ConfigOptions, MpiConfig):
+    """
+    Generic function to open a NetCDF file on the non-root processors for parallel
+    hyperslab reads. Rank 0 re-uses the handle it already has open.
+    :param NetCdfFileIn:
+    :param idTmp:
+    :param ConfigOptions:
+    :param MpiConfig:
+    :return:
+    """
+    # Ensure rank 0 has finished writing the file before the other processors open it.
+    MpiConfig.comm.barrier()
+
+    if MpiConfig.rank != 0:
+        try:
+            idTmp = Dataset(NetCdfFileIn, 'r')
+        except (IOError, OSError) as err:
+            ConfigOptions.errMsg = "Unable to open input NetCDF file: " + NetCdfFileIn + \
+                                   " on RANK: " + str(MpiConfig.rank) + " (" + str(err) + ")"
+            err_handler.log_critical(ConfigOptions, MpiConfig)
+            idTmp = None
+    err_handler.check_program_status(ConfigOptions, MpiConfig)
+
+    return idTmp
+
+
+def close_netcdf_all_procs(idTmp, ConfigOptions, MpiConfig):
+    """
+    Generic function to close NetCDF handles opened on the non-root processors
+    by open_netcdf_all_procs. Rank 0 closes its own handle as before.
+    :param idTmp:
+    :param ConfigOptions:
+    :param MpiConfig:
+    :return:
+    """
+    if MpiConfig.rank != 0 and idTmp is not None:
+        try:
+            idTmp.close()
+        except (IOError, OSError, RuntimeError):
+            ConfigOptions.statusMsg = "Unable to close NetCDF file on RANK: " + str(MpiConfig.rank)
+            err_handler.log_warning(ConfigOptions, MpiConfig)
+
+
+def read_local_slab(idTmp, varName, GeoObj, ConfigOptions, MpiConfig, fill=None):
+    """
+    Generic function to read only this processor's [y_lower:y_upper, x_lower:x_upper]
+    hyperslab of a 2D variable (or the first time step of a 3D variable), as an
+    alternative to rank 0 reading the global field and scattering it.
+    :param idTmp:
+    :param varName:
+    :param GeoObj: Any object carrying the local x/y bounds (geo meta, input forcings, etc.)
+    :param ConfigOptions:
+    :param MpiConfig:
+    :param fill: Optional value to replace masked values with.
+    :return:
+    """
+    ySlice = slice(GeoObj.y_lower_bound, GeoObj.y_upper_bound)
+    xSlice = slice(GeoObj.x_lower_bound, GeoObj.x_upper_bound)
+    # The bounds of a cropped source grid are relative to its window.
+    srcWindow = getattr(GeoObj, 'src_window', None)
+    try:
+        ncVar = idTmp.variables[varName]
+        if srcWindow is not None:
+            varSlab = srcWindow.read(ncVar, ySlice, xSlice, time_index=0 if ncVar.ndim == 3 else None)
+        elif ncVar.ndim == 3:
+            varSlab = ncVar[0, ySlice, xSlice]
+        else:
+            varSlab = ncVar[ySlice, xSlice]
+    except (ValueError, KeyError, AttributeError, IndexError) as err:
+        ConfigOptions.errMsg = "Unable to read local hyperslab of: " + varName + " on RANK: " + \
+                               str(MpiConfig.rank) + " (" + str(err) + ")"
+        err_handler.log_critical(ConfigOptions, MpiConfig)
+        return None
+
+    if fill is not None:
+        return np.ma.filled(varSlab, fill)
+    return np.ma.getdata(varSlab)
+
+
 def unzip_file(GzFileIn,FileOut,ConfigOptions,MpiConfig):
     """
     Generic I/O function to unzip a .gz file to a new location.
@@ -664,6 +866,36 @@ def unzip_file(GzFileIn,FileOut,ConfigOptions,MpiConfig):
     else:
         return
 
+def gunzip_files(GzFilesIn,ConfigOptions,MpiConfig):
+    """
+    Generic I/O function to decompress a set of .gz files into memory on
+    rank 0, one thread per file, so no uncompressed copies are written to
+    the scratch directory.
+    :param GzFilesIn:
+    :param ConfigOptions:
+    :param MpiConfig:
+    :return: List of the uncompressed bytes of each file on rank 0, None on the other processors.
+    """
+    if MpiConfig.rank != 0:
+        return None
+
+    ConfigOptions.statusMsg = "Decompressing in memory: {}".format(", ".join(GzFilesIn))
+    err_handler.log_msg(ConfigOptions, MpiConfig)
+    with ThreadPoolExecutor(max_workers=len(GzFilesIn)) as executor:
+        futures = [executor.submit(grib2_reader.decompress, input_staging.local_path(GzFileIn, ConfigOptions))
+                   for GzFileIn in GzFilesIn]
+
+    buffers = []
+    for GzFileIn, future in zip(GzFilesIn, futures):
+        try:
+            buffers.append(future.result())
+        except Exception as err:
+            ConfigOptions.errMsg = "Unable to unzip: " + GzFileIn + " (" + str(err) + ")"
+            err_handler.log_critical(ConfigOptions, MpiConfig)
+            buffers.append(None)
+    return buffers
+
+
 def read_rqi_monthly_climo(ConfigOptions, MpiConfig, supplemental_precip, GeoMetaWrfHydro):
     """
     Function to read in monthly RQI grids on the NWM grid. This is an NWM ONLY
@@ -721,10 +953,14 @@ def read_rqi_monthly_climo(ConfigOptions, MpiConfig, supplemental_precip, GeoMet
         err_handler.check_program_status(ConfigOptions, MpiConfig)
 
         # Scatter the array out to the local processors
-        varSubTmp = MpiConfig.scatter_array(GeoMetaWrfHydro, varTmp, ConfigOptions)
+        varSubTmp = MpiConfig.share_array(GeoMetaWrfHydro, varTmp, ConfigOptions,
+                                          'RQI_CLIMO_' + str(supplemental_precip.keyValue))
         err_handler.check_program_status(ConfigOptions, MpiConfig)
 
-        supplemental_precip.regridded_rqi2[:, :] = varSubTmp
+        if MpiConfig.node_comm is not None:
+            supplemental_precip.regridded_rqi2 = varSubTmp
+        else:
+            supplemental_precip.regridded_rqi2[:, :] = varSubTmp
 
         # Reset variables for memory purposes
         varSubTmp = None
@@ -781,10 +1017,14 @@ def read_rqi_monthly_climo(ConfigOptions, MpiConfig, supplemental_precip, GeoMet
         err_handler.check_program_status(ConfigOptions, MpiConfig)
 
         # Scatter the array out to the local processors
-        varSubTmp = MpiConfig.scatter_array(GeoMetaWrfHydro, varTmp, ConfigOptions)
+        varSubTmp = MpiConfig.share_array(GeoMetaWrfHydro, varTmp, ConfigOptions,
+                                          'RQI_CLIMO_' + str(supplemental_precip.keyValue))
         err_handler.check_program_status(ConfigOptions, MpiConfig)
 
-        supplemental_precip.regridded_rqi2[:, :] = varSubTmp
+        if MpiConfig.node_comm is not None:
+            supplemental_precip.regridded_rqi2 = varSubTmp
+        else:
+            supplemental_precip.regridded_rqi2[:, :] = varSubTmp
 
         # Reset variables for memory purposes
         varSubTmp = None
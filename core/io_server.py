@@ -0,0 +1,234 @@
+"""
+Asynchronous output servers. The compute processors hand their local slabs
+of the final output grids off to a set of server processes with non-blocking
+sends, and move on to the next output step. The servers assemble the slabs
+into the full grids, write (and compress) the LDASIN files, and touch the
+forecast cycle completion flags once all of a cycle's files are written.
+"""
+import collections
+import os
+import sys
+
+from core import config
+from core import err_handler
+from core import ioMod
+from core import parallel
+from core.parallel import MPI
+
+TAG_SETUP = 1
+TAG_HEADER = 2
+TAG_SLAB = 3
+TAG_MARKER = 4
+TAG_STOP = 5
+
+# Configuration options used by the output routine, copied to the servers once.
+OUTPUT_OPTIONS = ['regrid_opt', 'useCompression', 'useFloats', 'spatial_meta', 'globalNdv', 'ana_flag',
+                  'nwmVersion', 'nwmConfig', 'num_output_steps']
+
+# Configuration options that change during the run, sent along with each output file.
+HEADER_OPTIONS = ['logFile', 'current_fcst_cycle', 'e_date_proc']
+
+
+class OutputGeoMeta:
+    """
+    Abstract class holding the output grid metadata needed by the servers
+    to write the LDASIN files, with the full grid as the local "slab".
+    """
+    def __init__(self, geo_meta):
+        self.ny_global = geo_meta.ny_global
+        self.nx_global = geo_meta.nx_global
+        self.ny_local = geo_meta.ny_global
+        self.nx_local = geo_meta.nx_global
+        self.y_lower_bound = 0
+        self.y_upper_bound = geo_meta.ny_global
+        self.x_lower_bound = 0
+        self.x_upper_bound = geo_meta.nx_global
+        self.x_coords = geo_meta.x_coords
+        self.y_coords = geo_meta.y_coords
+        self.x_coord_atts = geo_meta.x_coord_atts
+        self.y_coord_atts = geo_meta.y_coord_atts
+        self.crs_atts = geo_meta.crs_atts
+        self.spatial_global_atts = geo_meta.spatial_global_atts
+
+
+class OutputServers:
+    """
+    Class held by the compute processors to spawn the output servers and
+    hand output files off to them, round-robin.
+    """
+    def __init__(self, config_options, geo_meta, mpi_config):
+        self.n_servers = config_options.output_servers
+        self.next_server = 0
+        # Requests and send buffers of the hand-offs that may still be in flight, up to
+        # pipeline_depth per server.
+        self.pending = collections.deque()
+        self.max_pending = self.n_servers * config_options.pipeline_depth
+
+        root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        server_cmd = "import sys; sys.path.insert(0, {!r}); from core import io_server; " \
+                     "io_server.serve()".format(root_dir)
+        try:
+            self.intercomm = mpi_config.comm.Spawn(sys.executable, args=['-c', server_cmd],
+                                                   maxprocs=self.n_servers, root=0)
+        except MPI.Exception as mpi_exception:
+            config_options.errMsg = "Unable to spawn " + str(self.n_servers) + " output servers."
+            raise mpi_exception
+
+        decomp = mpi_config.get_decomposition(geo_meta, config_options)
+        if mpi_config.rank == 0:
+            setup = {
+                'config_path': config_options.config_path,
+                'options': {opt: getattr(config_options, opt) for opt in OUTPUT_OPTIONS},
+                'geo_meta': OutputGeoMeta(geo_meta),
+                'bounds': [(int(decomp.y_lower[rank]), int(decomp.y_upper[rank]),
+                            int(decomp.x_lower[rank]), int(decomp.x_upper[rank]))
+                           for rank in range(mpi_config.size)]
+            }
+            for server in range(self.n_servers):
+                self.intercomm.send(setup, dest=server, tag=TAG_SETUP)
+
+    def hand_off(self, output_obj, config_options, mpi_config):
+        """
+        Function to send the local slabs of an output file to the next output
+        server without waiting for it. Up to PipelineDepth hand-offs per server
+        are kept in flight, so the oldest is completed first once all are in use.
+        :param output_obj:
+        :param config_options:
+        :param mpi_config:
+        :return:
+        """
+        server = self.next_server
+        self.next_server = (server + 1) % self.n_servers
+
+        while len(self.pending) >= self.max_pending:
+            MPI.Request.Waitall(self.pending.popleft()[0])
+
+        requests = []
+        if mpi_config.rank == 0:
+            config_options.statusMsg = "Handing output file: " + output_obj.outPath + \
+                                       " off to output server " + str(server)
+            err_handler.log_msg(config_options, mpi_config)
+            header = {opt: getattr(config_options, opt) for opt in HEADER_OPTIONS}
+            header['outPath'] = output_obj.outPath
+            header['outDate'] = output_obj.outDate
+            requests.append(self.intercomm.isend(header, dest=server, tag=TAG_HEADER))
+
+        # The output grids are reset for the next output step, so send a copy.
+        slab = output_obj.output_local.copy()
+        requests.append(self.intercomm.Isend(slab, dest=server, tag=TAG_SLAB))
+        self.pending.append((requests, slab))
+
+    def mark_complete(self, complete_flag, mpi_config):
+        """
+        Function to have the output servers touch the completion flag of a
+        forecast cycle, once they have written all of its output files.
+        :param complete_flag:
+        :param mpi_config:
+        :return:
+        """
+        if mpi_config.rank == 0:
+            for server in range(self.n_servers):
+                self.intercomm.send(complete_flag, dest=server, tag=TAG_MARKER)
+
+    def shutdown(self, mpi_config):
+        """
+        Function to complete any outstanding hand-offs, stop the output
+        servers and disconnect from them.
+        :param mpi_config:
+        :return:
+        """
+        while self.pending:
+            MPI.Request.Waitall(self.pending.popleft()[0])
+        if mpi_config.rank == 0:
+            for server in range(self.n_servers):
+                self.intercomm.send(None, dest=server, tag=TAG_STOP)
+        self.intercomm.Disconnect()
+
+
+def switch_log(config_options, log_file, mpi_config):
+    """
+    Function to point the server's logger at the log file of the forecast
+    cycle the compute processors are working on.
+    :param config_options:
+    :param log_file:
+    :param mpi_config:
+    :return:
+    """
+    if log_file == config_options.logFile and config_options.logHandle is not None:
+        return
+    if config_options.logHandle is not None:
+        err_handler.close_log(config_options, mpi_config)
+    config_options.logFile = log_file
+    if log_file is not None:
+        err_handler.init_log(config_options, mpi_config)
+
+
+def serve():
+    """
+    Main loop of an output server. Receives the output files handed off by
+    the compute processors, writes them with the regular output routine on a
+    single-processor communicator, and touches the completion flags.
+    :return:
+    """
+    parent = MPI.Comm.Get_parent()
+    server_comm = MPI.COMM_WORLD
+
+    setup = parent.recv(source=0, tag=TAG_SETUP)
+    config_options = config.ConfigOptions(setup['config_path'])
+    for opt, value in setup['options'].items():
+        setattr(config_options, opt, value)
+    geo_meta = setup['geo_meta']
+
+    mpi_config = parallel.MpiConfig()
+    mpi_config.comm = MPI.COMM_SELF
+    mpi_config.rank = 0
+    mpi_config.size = 1
+
+    # Slabs are received straight into their place in the full output grids.
+    output_obj = ioMod.OutputObj(geo_meta)
+    n_vars = output_obj.output_local.shape[0]
+    slab_types = []
+    for y_lower, y_upper, x_lower, x_upper in setup['bounds']:
+        slab_type = parallel.mpi_type(output_obj.output_local.dtype).Create_subarray(
+            output_obj.output_local.shape, [n_vars, y_upper - y_lower, x_upper - x_lower], [0, y_lower, x_lower])
+        slab_types.append(slab_type.Commit())
+
+    status = MPI.Status()
+    while True:
+        parent.Probe(source=0, tag=MPI.ANY_TAG, status=status)
+        tag = status.Get_tag()
+        message = parent.recv(source=0, tag=tag)
+
+        if tag == TAG_HEADER:
+            switch_log(config_options, message['logFile'], mpi_config)
+            for opt in HEADER_OPTIONS:
+                setattr(config_options, opt, message[opt])
+            output_obj.outPath = message['outPath']
+            output_obj.outDate = message['outDate']
+
+            for rank, slab_type in enumerate(slab_types):
+                parent.Recv([output_obj.output_local, 1, slab_type], source=rank, tag=TAG_SLAB)
+
+            output_obj.output_final_ldasin(config_options, geo_meta, mpi_config)
+            config_options.statusMsg = "Output server " + str(server_comm.rank) + " wrote: " + output_obj.outPath
+            err_handler.log_msg(config_options, mpi_config)
+
+        elif tag == TAG_MARKER:
+            # Every server has written its share of the cycle's files once all have reached the flag.
+            server_comm.Barrier()
+            if server_comm.rank == 0:
+                try:
+                    open(message, 'a').close()
+                except OSError:
+                    config_options.errMsg = "Unable to create completion file: " + message
+                    err_handler.log_critical(config_options, mpi_config)
+                    parent.Abort()
+
+        else:
+            break
+
+    for slab_type in slab_types:
+        slab_type.Free()
+    if config_options.logHandle is not None:
+        err_handler.close_log(config_options, mpi_config)
+    parent.Disconnect()
@@ -2,7 +2,7 @@
 Layering module for implementing various layering schemes in the WRF-Hydro forcing engine.
 Future functionality may include blenidng, etc.
 """
-import numpy as np
+from core import ndv_mask
 
 def layer_final_forcings(OutputObj,input_forcings,ConfigOptions,MpiConfig):
     """
@@ -30,14 +30,8 @@ def layer_final_forcings(OutputObj,input_forcings,ConfigOptions,MpiConfig):
 
     for force_idx in range(0,8):
         if force_idx in input_forcings.input_map_output:
-            outLayerCurrent = OutputObj.output_local[force_idx,:,:]
-            layerIn = input_forcings.final_forcings[force_idx,:,:]
-            indSet = np.where(layerIn != ConfigOptions.globalNdv)
-            outLayerCurrent[indSet] = layerIn[indSet]
-            OutputObj.output_local[force_idx, :, :] = outLayerCurrent
-
-            # Reset for next iteration and memory efficiency.
-            indSet = None
+            ndv_mask.copy_valid(OutputObj.output_local[force_idx, :, :],
+                                input_forcings.final_forcings[force_idx, :, :], ConfigOptions.globalNdv)
     # MpiConfig.comm.barrier()
 
 
@@ -52,16 +46,7 @@ def layer_supplemental_forcing(OutputObj, supplemental_precip, ConfigOptions, Mp
     :param MpiConfig:
     :return:
     """
-    indSet = np.where(supplemental_precip.final_supp_precip != ConfigOptions.globalNdv)
-    layerIn = supplemental_precip.final_supp_precip
-    layerOut = OutputObj.output_local[supplemental_precip.output_var_idx, :, :]
-
-    if len(indSet[0]) != 0:
-        layerOut[indSet] = layerIn[indSet]
-    else:
-        # We have all missing data for the supplemental precip for this step.
-        layerOut = layerOut
-
-    # TODO: test that even does anything...?s
-    OutputObj.output_local[supplemental_precip.output_var_idx, :, :] = layerOut
+    # Cells with all missing data for the supplemental precip keep the background forcings.
+    ndv_mask.copy_valid(OutputObj.output_local[supplemental_precip.output_var_idx, :, :],
+                        supplemental_precip.final_supp_precip, ConfigOptions.globalNdv)
 
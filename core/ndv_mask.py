@@ -0,0 +1,55 @@
+"""
+Missing-value masks shared by the regridding, temporal interpolation,
+downscaling and layering stages. Masks are boolean grids held in reusable
+buffers on the forcing objects and applied with np.copyto(where=...), rather
+than building np.where() index tuples (one int64 array per dimension) over
+the full local slab at every stage. Masks are computed and applied over row
+blocks of the slab in parallel when threads are enabled.
+"""
+import numpy as np
+
+from core import row_threads
+
+
+def missing_mask(grid, ndv, out=None):
+    """
+    Function to flag the cells of a grid equal to the missing value.
+    :param grid:
+    :param ndv:
+    :param out: Optional boolean buffer of the same shape as grid to write into.
+    :return:
+    """
+    if out is None or out.shape != grid.shape:
+        out = np.empty(grid.shape, dtype=bool)
+
+    def kernel(rows):
+        np.equal(grid[..., rows, :], ndv, out=out[..., rows, :])
+    row_threads.map_grid(kernel, grid)
+    return out
+
+
+def set_missing(grid, mask, ndv):
+    """
+    Function to set the masked cells of a grid to the missing value, in place.
+    A [ny, nx] mask is broadcast over the leading dimension of a stacked grid.
+    :param grid:
+    :param mask:
+    :param ndv:
+    :return:
+    """
+    def kernel(rows):
+        np.copyto(grid[..., rows, :], ndv, where=mask[..., rows, :])
+    row_threads.map_grid(kernel, grid)
+
+
+def copy_valid(grid_out, grid_in, ndv):
+    """
+    Function to copy the non-missing cells of one grid onto another, in place.
+    :param grid_out:
+    :param grid_in:
+    :param ndv:
+    :return:
+    """
+    def kernel(rows):
+        np.copyto(grid_out[..., rows, :], grid_in[..., rows, :], where=np.not_equal(grid_in[..., rows, :], ndv))
+    row_threads.map_grid(kernel, grid_out)
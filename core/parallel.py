@@ -1,10 +1,17 @@
 import numpy as np
-import mpi4py
-mpi4py.rc.threaded = False
-from mpi4py import MPI
+try:
+    import mpi4py
+    mpi4py.rc.threaded = False
+    from mpi4py import MPI
+except ImportError:
+    # Serial runs on a single processor (LocalConfig) do not need mpi4py.
+    MPI = None
 
 from core import err_handler
 
+# Number of values read at once by each node leader when filling a shared memory window.
+SHARED_READ_BLOCK = 4194304
+
 
 class MpiConfig:
     """
@@ -19,15 +26,26 @@ class MpiConfig:
         """
         self.comm = None
         self.rank = None
-        self.size = None 
+        self.size = None
+        self.decompositions = {}
+        self.io_servers = None
+        self.node_comm = None
+        self.leader_comm = None
+        self.shared_windows = {}
+        self.serial = False
 
     def initialize_comm(self, config_options):
         """
         Initial function to initialize MPI.
         :return:
         """
+        if MPI is None:
+            config_options.errMsg = "Unable to import mpi4py. Install it, or run on a single processor " \
+                                    "with the --serial option."
+            raise ImportError(config_options.errMsg)
+
         try:
-            self.comm = MPI.COMM_WORLD
+            self.comm = CountingComm(MPI.COMM_WORLD)
             self.comm.Set_errhandler(MPI.ERRORS_ARE_FATAL)
         except AttributeError as ae:
             config_options.errMsg = "Unable to initialize the MPI Communicator object"
@@ -45,6 +63,30 @@ class MpiConfig:
             config_options.errMsg = "Unable to retrieve the MPI processor rank."
             raise mpi_exception
 
+        if config_options.shared_static_fields == 1:
+            self.initialize_node_comm(config_options)
+
+    def initialize_node_comm(self, config_options):
+        """
+        Function to split the processors into node-level communicators for the
+        MPI-3 shared-memory windows holding static fields, along with a
+        communicator of the first processor on each node (the node leaders).
+        :param config_options:
+        :return:
+        """
+        if MPI.Get_version()[0] < 3:
+            config_options.errMsg = "SharedStaticFields requires an MPI-3 library, found MPI " + \
+                                    ".".join(str(v) for v in MPI.Get_version())
+            raise RuntimeError(config_options.errMsg)
+
+        try:
+            self.node_comm = MPI.COMM_WORLD.Split_type(MPI.COMM_TYPE_SHARED, key=self.rank)
+            color = 0 if self.node_comm.Get_rank() == 0 else MPI.UNDEFINED
+            self.leader_comm = MPI.COMM_WORLD.Split(color, key=self.rank)
+        except MPI.Exception as mpi_exception:
+            config_options.errMsg = "Unable to create the node-level shared memory communicators."
+            raise mpi_exception
+
     def broadcast_parameter(self, value_broadcast, config_options, param_type=int):
         """
         Generic function for sending a parameter value out to the processors.
@@ -121,6 +163,79 @@ class MpiConfig:
                    geoMeta.x_lower_bound:geoMeta.x_upper_bound]
         return arraySub
 
+    def get_decomposition(self, geoMeta, ConfigOptions):
+        """
+        Function to return the cached decomposition descriptor of a global grid,
+        building it on first use. ESMF decomposes a grid the same way for a given
+        global shape, so descriptors are keyed on it and built collectively.
+        :param geoMeta:
+        :param ConfigOptions:
+        :return:
+        """
+        key = (int(geoMeta.ny_global), int(geoMeta.nx_global))
+        decomp = self.decompositions.get(key)
+        if decomp is None:
+            decomp = Decomposition(geoMeta, self)
+            self.decompositions[key] = decomp
+        elif not decomp.matches(geoMeta, self.rank):
+            ConfigOptions.errMsg = "Local bounds on rank " + str(self.rank) + " do not match the cached " \
+                                   "decomposition of the " + str(key) + " grid."
+            err_handler.log_critical(ConfigOptions, self)
+            self.comm.Abort()
+        return decomp
+
+    def scatter_array_scatterv(self, geoMeta, src_array, ConfigOptions):
+        """
+        Function to scatter a global array on rank 0 to the local slabs of each
+        processor with a single Scatterv, using the cached decomposition of the
+        grid. Only the array datatype is broadcast on each call.
+        :param geoMeta:
+        :param src_array:
+        :param ConfigOptions:
+        :return:
+        """
+        decomp = self.get_decomposition(geoMeta, ConfigOptions)
+
+        # Determine which type of input array we have based on the
+        # type of numpy array.
+        data_type_flag = -1
+        if self.rank == 0:
+            if src_array.dtype == np.float32:
+                data_type_flag = 1
+            if src_array.dtype == np.float64:
+                data_type_flag = 2
+
+        # Broadcast the data_type_flag to other processors
+        if self.rank == 0:
+            data_type_buffer = np.array([data_type_flag],np.int32)
+        else:
+            data_type_buffer = np.empty(1,np.int32)
+
+        try:
+            self.comm.Bcast(data_type_buffer, root=0)
+        except:
+            ConfigOptions.errMsg = "Unable to broadcast numpy datatype value from rank 0"
+            err_handler.err_out(ConfigOptions)
+            return None
+
+        dtype = np.float32 if data_type_buffer[0] == 1 else np.float64
+
+        if self.rank == 0:
+            sendbuf = [decomp.pack(np.asarray(src_array, dtype=dtype)), decomp.counts, decomp.offsets,
+                       mpi_type(dtype)]
+        else:
+            sendbuf = None
+        recvbuf = np.empty([decomp.ny_local, decomp.nx_local], dtype)
+
+        try:
+            self.comm.Scatterv(sendbuf, recvbuf, root=0)
+        except:
+            ConfigOptions.errMsg = "Failed Scatterv from rank 0"
+            err_handler.err_out(ConfigOptions)
+            return None
+
+        return recvbuf
+
     def scatter_array_scatterv_no_cache(self,geoMeta,src_array,ConfigOptions):
         """
             Generic function for calling scatter functons based on
@@ -218,9 +333,119 @@ class MpiConfig:
         return subarray
 
     # use scatterv based scatter_array
-    scatter_array = scatter_array_scatterv_no_cache
+    scatter_array = scatter_array_scatterv
 
-    def merge_slabs_gatherv(self, local_slab, options):
+    def share_array(self, geoMeta, src_array, ConfigOptions, key, read_rows=None):
+        """
+        Function to place a static global array in a node-level shared memory
+        window and return a view of this processor's slab of it, so each node
+        holds a single copy of the field instead of one per processor. Rank 0
+        fills its node's window and broadcasts it to the other node leaders.
+        Alternatively, every node leader reads the rows of the field itself with
+        read_rows, in blocks, without a global temporary. A field shared again
+        under the same key replaces the previous one, whose views must no longer
+        be used. Without shared static fields, this is a plain scatter.
+        :param geoMeta:
+        :param src_array: Global array on rank 0, or None when read_rows is given.
+        :param ConfigOptions:
+        :param key: Name of the shared field.
+        :param read_rows: Optional function returning rows y_lower:y_upper of the global array.
+        :return:
+        """
+        if self.node_comm is None:
+            if read_rows is not None and self.rank == 0:
+                src_array = read_rows(0, geoMeta.ny_global)
+            return self.scatter_array(geoMeta, src_array, ConfigOptions)
+
+        # Broadcast the datatype of the array, as done for scatters.
+        if self.rank == 0:
+            if read_rows is not None:
+                src_dtype = read_rows(0, 1).dtype
+            else:
+                src_dtype = src_array.dtype
+            data_type_buffer = np.array([1 if src_dtype == np.float32 else 2], np.int32)
+        else:
+            data_type_buffer = np.empty(1, np.int32)
+        try:
+            self.comm.Bcast(data_type_buffer, root=0)
+        except:
+            ConfigOptions.errMsg = "Unable to broadcast numpy datatype value from rank 0"
+            err_handler.err_out(ConfigOptions)
+            return None
+        dtype = np.dtype(np.float32 if data_type_buffer[0] == 1 else np.float64)
+
+        self.free_shared(key)
+
+        # Only the node leader allocates memory, the other processors map its segment.
+        shape = (geoMeta.ny_global, geoMeta.nx_global)
+        leader = self.node_comm.Get_rank() == 0
+        n_bytes = shape[0] * shape[1] * dtype.itemsize if leader else 0
+        try:
+            win = MPI.Win.Allocate_shared(n_bytes, dtype.itemsize, comm=self.node_comm)
+            buf, _ = win.Shared_query(0)
+            global_array = np.ndarray(buffer=buf, dtype=dtype, shape=shape)
+
+            if leader:
+                if read_rows is not None:
+                    block = max(1, SHARED_READ_BLOCK // shape[1])
+                    for y_lower in range(0, shape[0], block):
+                        y_upper = min(y_lower + block, shape[0])
+                        global_array[y_lower:y_upper, :] = np.ma.getdata(read_rows(y_lower, y_upper))
+                else:
+                    if self.rank == 0:
+                        global_array[:, :] = np.ma.getdata(src_array)
+                    self.leader_comm.Bcast(global_array, root=0)
+            self.node_comm.Barrier()
+        except:
+            ConfigOptions.errMsg = "Unable to place " + key + " in node-level shared memory"
+            err_handler.err_out(ConfigOptions)
+            return None
+        self.shared_windows[key] = win
+
+        return global_array[geoMeta.y_lower_bound:geoMeta.y_upper_bound,
+                            geoMeta.x_lower_bound:geoMeta.x_upper_bound]
+
+    def free_shared(self, key):
+        """
+        Function to release the shared memory window of a static field.
+        Collective over the processors of each node.
+        :param key:
+        :return:
+        """
+        win = self.shared_windows.pop(key, None)
+        if win is not None:
+            win.Free()
+
+    def merge_slabs_gatherv(self, local_slab, options, geoMeta=None):
+        """
+        Function to gather the local slabs of each processor into a global array
+        on rank 0 with a single Gatherv. When the grid metadata is passed, the
+        cached decomposition of the grid is used instead of gathering slab shapes.
+        :param local_slab:
+        :param options:
+        :param geoMeta:
+        :return:
+        """
+        if geoMeta is not None:
+            decomp = self.get_decomposition(geoMeta, options)
+
+            if self.rank == 0:
+                recvbuf = np.empty([decomp.counts.sum()], local_slab.dtype)
+                recv = [recvbuf, decomp.counts, decomp.offsets, mpi_type(local_slab.dtype)]
+            else:
+                recvbuf = None
+                recv = None
+
+            try:
+                self.comm.Gatherv(sendbuf=np.ascontiguousarray(local_slab), recvbuf=recv, root=0)
+            except:
+                options.errMsg = "Failed to Gatherv to rank 0 from rank " + str(self.rank)
+                err_handler.log_critical(options,self)
+                return None
+
+            if self.rank == 0:
+                return decomp.unpack(recvbuf)
+            return None
 
         # gather buffer offsets and bounds to rank 0
         shapes = np.array([np.int32(local_slab.shape[0]), np.int32(local_slab.shape[1])])
@@ -290,3 +515,346 @@ class MpiConfig:
 
         return recvbuf
 
+    def scatter_stack(self, geoMeta, src_stack, n_vars, ConfigOptions, dtype=np.float64):
+        """
+        Function to scatter a global [n_vars, ny, nx] stack on rank 0 to the local
+        [n_vars, ny_local, nx_local] slabs of each processor in one Scatterv. Derived
+        row datatypes spanning all variables let the global stack be sent in place.
+        The datatype is passed in, so no metadata is broadcast.
+        :param geoMeta:
+        :param src_stack:
+        :param n_vars:
+        :param ConfigOptions:
+        :param dtype:
+        :return:
+        """
+        decomp = self.get_decomposition(geoMeta, ConfigOptions)
+        recvbuf = np.empty([n_vars, decomp.ny_local, decomp.nx_local], dtype)
+
+        if not decomp.row_slabs:
+            # General 2-D blocks are not contiguous rows, so scatter each variable.
+            for var_idx in range(n_vars):
+                recvbuf[var_idx, :, :] = self.scatter_array(
+                    geoMeta, src_stack[var_idx, :, :] if self.rank == 0 else None, ConfigOptions)
+            return recvbuf
+
+        global_row, local_row = decomp.stack_types(n_vars, dtype)
+        if self.rank == 0:
+            sendbuf = [np.ascontiguousarray(src_stack, dtype=dtype), decomp.rows, decomp.y_lower, global_row]
+        else:
+            sendbuf = None
+
+        try:
+            self.comm.Scatterv(sendbuf, [recvbuf, decomp.ny_local, local_row], root=0)
+        except:
+            ConfigOptions.errMsg = "Failed stacked Scatterv from rank 0"
+            err_handler.err_out(ConfigOptions)
+            return None
+
+        return recvbuf
+
+    def gather_stack(self, local_stack, options, geoMeta):
+        """
+        Function to gather the local [n_vars, ny_local, nx_local] slabs of each
+        processor into a global [n_vars, ny, nx] stack on rank 0 in one Gatherv.
+        :param local_stack:
+        :param options:
+        :param geoMeta:
+        :return:
+        """
+        # Nothing to gather on a single processor.
+        if self.size == 1:
+            return local_stack
+
+        decomp = self.get_decomposition(geoMeta, options)
+        n_vars = local_stack.shape[0]
+
+        if not decomp.row_slabs:
+            # General 2-D blocks are not contiguous rows, so gather each variable.
+            slabs = [self.merge_slabs_gatherv(local_stack[var_idx, :, :], options, geoMeta=geoMeta)
+                     for var_idx in range(n_vars)]
+            return np.stack(slabs) if self.rank == 0 else None
+
+        global_row, local_row = decomp.stack_types(n_vars, local_stack.dtype)
+        if self.rank == 0:
+            recvbuf = np.empty([n_vars, decomp.ny_global, decomp.nx_global], local_stack.dtype)
+            recv = [recvbuf, decomp.rows, decomp.y_lower, global_row]
+        else:
+            recvbuf = None
+            recv = None
+
+        try:
+            self.comm.Gatherv(sendbuf=[np.ascontiguousarray(local_stack), decomp.ny_local, local_row],
+                              recvbuf=recv, root=0)
+        except:
+            options.errMsg = "Failed stacked Gatherv to rank 0 from rank " + str(self.rank)
+            err_handler.log_critical(options, self)
+            return None
+
+        return recvbuf
+
+
+class LocalConfig(MpiConfig):
+    """
+    Single-processor replacement of the MPI configuration, for small domains
+    and testing, that runs without mpi4py or an MPI launcher. The local slab
+    is the whole grid, so scatters and gathers return views of the arrays
+    without copying, broadcasts return their value, and errors raise an
+    exception instead of aborting MPI.
+    """
+    def initialize_comm(self, config_options):
+        """
+        Initial function to set up the single-processor communicator. Options
+        that rely on other MPI processes are not available.
+        :param config_options:
+        :return:
+        """
+        self.comm = LocalComm()
+        self.rank = 0
+        self.size = 1
+        self.serial = True
+
+        mpi_options = [('SharedStaticFields', config_options.shared_static_fields),
+                       ('ParallelOutput', config_options.parallel_output),
+                       ('OutputServers', config_options.output_servers),
+                       ('CycleGroups', config_options.cycle_groups - 1)]
+        for option, value in mpi_options:
+            if value > 0:
+                config_options.errMsg = option + " requires MPI and cannot be used with the --serial option."
+                raise RuntimeError(config_options.errMsg)
+
+    def broadcast_parameter(self, value_broadcast, config_options, param_type=int):
+        """
+        Function returning the parameter value, cast as it would be broadcast.
+        :param value_broadcast:
+        :param config_options:
+        :param param_type:
+        :return:
+        """
+        return np.asarray(value_broadcast, dtype=np.dtype(param_type)).item(0)
+
+    def scatter_array(self, geoMeta, src_array, ConfigOptions):
+        """
+        Function to return the local slab of a global array as a view of it.
+        Arrays are converted to floating point as done for MPI scatters.
+        :param geoMeta:
+        :param src_array:
+        :param ConfigOptions:
+        :return:
+        """
+        src_array = np.ma.getdata(src_array)
+        if src_array.dtype != np.float32:
+            src_array = np.asarray(src_array, dtype=np.float64)
+        return src_array[geoMeta.y_lower_bound:geoMeta.y_upper_bound,
+                         geoMeta.x_lower_bound:geoMeta.x_upper_bound]
+
+    def scatter_stack(self, geoMeta, src_stack, n_vars, ConfigOptions, dtype=np.float64):
+        """
+        Function to return the local slabs of a global [n_vars, ny, nx] stack
+        as a view of it.
+        :param geoMeta:
+        :param src_stack:
+        :param n_vars:
+        :param ConfigOptions:
+        :param dtype:
+        :return:
+        """
+        src_stack = np.asarray(np.ma.getdata(src_stack), dtype=dtype)
+        return src_stack[:n_vars, geoMeta.y_lower_bound:geoMeta.y_upper_bound,
+                         geoMeta.x_lower_bound:geoMeta.x_upper_bound]
+
+    def merge_slabs_gatherv(self, local_slab, options, geoMeta=None):
+        """
+        Function to return the global array, which is the local slab itself.
+        :param local_slab:
+        :param options:
+        :param geoMeta:
+        :return:
+        """
+        return local_slab
+
+
+class LocalComm:
+    """
+    Stand-in for the MPI communicator of a single processor, providing the
+    communicator calls made outside of the parallel module. Collectives
+    return their input, and aborting raises an exception.
+    """
+    collective_count = 0
+
+    def Get_rank(self):
+        return 0
+
+    def Get_size(self):
+        return 1
+
+    def barrier(self):
+        pass
+
+    def bcast(self, obj, root=0):
+        return obj
+
+    def Bcast(self, buf, root=0):
+        pass
+
+    def gather(self, obj, root=0):
+        return [obj]
+
+    def allgather(self, obj):
+        return [obj]
+
+    def Allgather(self, sendbuf, recvbuf):
+        np.asarray(recvbuf).reshape(-1)[:] = np.asarray(sendbuf).reshape(-1)
+
+    def Abort(self, errorcode=1):
+        raise RuntimeError("Forcing engine aborted with error code " + str(errorcode))
+
+    Barrier = barrier
+    abort = Abort
+
+
+class Decomposition:
+    """
+    Class holding the per-processor bounds of a decomposed global grid, along
+    with the Scatterv/Gatherv counts and offsets, so they are computed once per
+    grid instead of on every call. ESMF decomposes grids into full-width row
+    slabs by default, in which case each slab is a contiguous block of the
+    global array and is sent/received in place without packing.
+    """
+    def __init__(self, geoMeta, MpiConfig):
+        self.ny_global = int(geoMeta.ny_global)
+        self.nx_global = int(geoMeta.nx_global)
+        self.ny_local = int(geoMeta.y_upper_bound - geoMeta.y_lower_bound)
+        self.nx_local = int(geoMeta.x_upper_bound - geoMeta.x_lower_bound)
+
+        bounds = np.array([geoMeta.y_lower_bound, geoMeta.y_upper_bound,
+                           geoMeta.x_lower_bound, geoMeta.x_upper_bound], np.int64)
+        global_bounds = np.empty([MpiConfig.size, 4], np.int64)
+        MpiConfig.comm.Allgather(bounds, global_bounds)
+
+        self.y_lower = global_bounds[:, 0]
+        self.y_upper = global_bounds[:, 1]
+        self.x_lower = global_bounds[:, 2]
+        self.x_upper = global_bounds[:, 3]
+        self.counts = (self.y_upper - self.y_lower) * (self.x_upper - self.x_lower)
+        self.rows = self.y_upper - self.y_lower
+        self.stack_type_cache = {}
+
+        self.row_slabs = bool(np.all(self.x_lower == 0) and np.all(self.x_upper == self.nx_global))
+        if self.row_slabs:
+            self.offsets = self.y_lower * self.nx_global
+        else:
+            self.offsets = np.zeros_like(self.counts)
+            self.offsets[1:] = np.cumsum(self.counts)[:-1]
+
+    def stack_types(self, n_vars, dtype):
+        """
+        Function to return the committed MPI datatypes describing one grid row
+        across all variables of a [n_vars, ny, nx] stack, for the global and the
+        local stack. Both are resized to the extent of a single row, so that row
+        counts and row displacements address the stacks directly.
+        :param n_vars:
+        :param dtype:
+        :return:
+        """
+        key = (n_vars, np.dtype(dtype).str)
+        if key not in self.stack_type_cache:
+            base = mpi_type(dtype)
+            row_extent = self.nx_global * np.dtype(dtype).itemsize
+            row_types = []
+            for ny in (self.ny_global, self.ny_local):
+                vector = base.Create_vector(n_vars, self.nx_global, ny * self.nx_global)
+                row_type = vector.Create_resized(0, row_extent)
+                row_type.Commit()
+                vector.Free()
+                row_types.append(row_type)
+            self.stack_type_cache[key] = tuple(row_types)
+        return self.stack_type_cache[key]
+
+    def matches(self, geoMeta, rank):
+        """
+        Function to check the local bounds of a grid against this decomposition.
+        :param geoMeta:
+        :param rank:
+        :return:
+        """
+        return (self.y_lower[rank] == geoMeta.y_lower_bound and self.y_upper[rank] == geoMeta.y_upper_bound and
+                self.x_lower[rank] == geoMeta.x_lower_bound and self.x_upper[rank] == geoMeta.x_upper_bound)
+
+    def pack(self, global_array):
+        """
+        Function to lay out a global array as the Scatterv send buffer.
+        :param global_array:
+        :return:
+        """
+        if self.row_slabs:
+            return np.ascontiguousarray(global_array).reshape(-1)
+
+        sendbuf = np.empty([self.counts.sum()], global_array.dtype)
+        for i in range(self.counts.size):
+            sendbuf[self.offsets[i]:self.offsets[i] + self.counts[i]] = \
+                global_array[self.y_lower[i]:self.y_upper[i], self.x_lower[i]:self.x_upper[i]].reshape(-1)
+        return sendbuf
+
+    def unpack(self, recvbuf):
+        """
+        Function to lay out a Gatherv receive buffer as the global array.
+        :param recvbuf:
+        :return:
+        """
+        if self.row_slabs:
+            return recvbuf.reshape(self.ny_global, self.nx_global)
+
+        global_array = np.empty([self.ny_global, self.nx_global], recvbuf.dtype)
+        for i in range(self.counts.size):
+            global_array[self.y_lower[i]:self.y_upper[i], self.x_lower[i]:self.x_upper[i]] = \
+                recvbuf[self.offsets[i]:self.offsets[i] + self.counts[i]].reshape(
+                    self.y_upper[i] - self.y_lower[i], self.x_upper[i] - self.x_lower[i])
+        return global_array
+
+
+def mpi_type(dtype):
+    """
+    Function to map a numpy datatype to the matching MPI datatype. Datatypes
+    without one are rejected, as counts and extents would otherwise be wrong.
+    :param dtype:
+    :return:
+    """
+    dtype = np.dtype(dtype)
+    try:
+        return MPI._typedict[dtype.char]
+    except KeyError:
+        raise TypeError("No MPI datatype matches the numpy datatype: " + str(dtype))
+
+
+class CountingComm(MPI.Intracomm if MPI is not None else object):
+    """
+    Intra-communicator counting the collective operations called on it, used
+    to report the number of collectives each output step takes. Collectives
+    run internally by ESMF are not seen here.
+    """
+    collective_count = 0
+
+
+def counted_collective(name):
+    """
+    Function to wrap a collective method of the intra-communicator so that
+    each call increments the collective count of the communicator.
+    :param name:
+    :return:
+    """
+    method = getattr(MPI.Intracomm, name)
+
+    def collective(self, *args, **kwargs):
+        self.collective_count += 1
+        return method(self, *args, **kwargs)
+    collective.__name__ = name
+    collective.__doc__ = method.__doc__
+    return collective
+
+
+if MPI is not None:
+    for collective_name in ['barrier', 'Barrier', 'bcast', 'Bcast', 'reduce', 'Reduce', 'allreduce', 'Allreduce',
+                            'gather', 'Gather', 'Gatherv', 'allgather', 'Allgather', 'Allgatherv',
+                            'scatter', 'Scatter', 'Scatterv', 'alltoall', 'Alltoall', 'Alltoallv']:
+        setattr(CountingComm, collective_name, counted_collective(collective_name))
@@ -0,0 +1,184 @@
+"""
+Background prefetching of input forcing files. While the processors work
+through an output step, helper threads on rank 0 convert (wgrib2) or decode
+(ecCodes) the GRIB2 files that the next output steps (up to the pipeline
+depth) will need, so the regridding routines can pick up the result instead
+of waiting on it. At the start of an output step, the files of every forcing
+product are queued at once, so they are prepared concurrently (one helper
+thread per product) while the products are regridded one after the other.
+The helper threads never touch MPI, ESMF or the configuration object.
+"""
+import collections
+import datetime
+import os
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+from core import err_handler
+from core import grib2_reader
+from core import input_staging
+from core import regrid
+
+# Forcing products whose GRIB2 files are read through open_grib2 with a grib2_match expression.
+PREFETCH_PRODUCTS = [1, 3, 5, 6, 7, 8, 9, 13, 14, 15, 16, 17, 18]
+
+
+class InputPrefetcher:
+    """
+    Class holding the helper threads on rank 0 along with the pending prefetches
+    (at most pipeline_depth per forcing product, oldest first) waiting to be
+    consumed by open_grib2.
+    """
+    def __init__(self, config_options):
+        self.scratch_dir = config_options.scratch_dir
+        self.grib2_reader = config_options.grib2_reader
+        self.depth = config_options.pipeline_depth
+        self.stager = config_options.input_stager
+        # One helper thread per forcing product, so the products' files are prefetched concurrently.
+        self.executor = ThreadPoolExecutor(max_workers=max(1, len(config_options.input_forcings)))
+        self.pending = {}
+
+    def submit(self, product_name, grib_file, match):
+        """
+        Function to queue the conversion/decoding of a GRIB2 file for a product,
+        discarding the oldest prefetch of that product that was never used once
+        the product has pipeline_depth of them pending.
+        :param product_name:
+        :param grib_file:
+        :param match: wgrib2 -match expression of the fields to extract.
+        :return:
+        """
+        key = (grib_file, match)
+        queue = self.pending.setdefault(product_name, collections.OrderedDict())
+        if key in queue:
+            return
+        while len(queue) >= self.depth:
+            discard(queue.popitem(last=False)[1])
+
+        # Read the node-local copy of the file if it has already been staged.
+        source = grib_file if self.stager is None else self.stager.resolve(grib_file, wait=False)
+        if self.grib2_reader == 1:
+            future = self.executor.submit(grib2_reader.read_grib2, source, match)
+        else:
+            nc_file = self.scratch_dir + "/PREFETCH_TMP-{}.nc".format(regrid.mkfilename())
+            future = self.executor.submit(convert_grib2, source, match, nc_file)
+        queue[key] = future
+
+    def take(self, grib_file, match):
+        """
+        Function to hand off a prefetched file, waiting on the helper thread if
+        it is still working on it. Errors from the helper thread are re-raised.
+        :param grib_file:
+        :param match:
+        :return: The decoded dataset or the path to the converted NetCDF file, None if not prefetched.
+        """
+        for queue in self.pending.values():
+            future = queue.pop((grib_file, match), None)
+            if future is not None:
+                return future.result()
+        return None
+
+    def shutdown(self):
+        """
+        Function to stop the helper thread and clean up unused prefetched files.
+        :return:
+        """
+        for queue in self.pending.values():
+            for future in queue.values():
+                discard(future)
+        self.pending = {}
+        self.executor.shutdown(wait=True)
+
+
+def convert_grib2(grib_file, match, nc_file):
+    """
+    Function run on the helper thread to convert the matching fields of a
+    GRIB2 file into a NetCDF file with wgrib2. Only the matching messages are
+    handed to wgrib2, cut out of the file by their byte ranges when the file
+    has an inventory.
+    :param grib_file:
+    :param match:
+    :param nc_file:
+    :return:
+    """
+    subset_file = nc_file + ".grib2"
+    try:
+        wgrib2_input = subset_file if grib2_reader.extract_grib2(grib_file, match, subset_file) else grib_file
+    except Exception:
+        wgrib2_input = grib_file
+    cmd = '$WGRIB2 -match "' + match + '" ' + wgrib2_input + " -netcdf " + nc_file
+    try:
+        exitcode = subprocess.call(cmd, shell=True, stdout=subprocess.DEVNULL)
+    finally:
+        if os.path.isfile(subset_file):
+            os.remove(subset_file)
+    if exitcode != 0 or not os.path.isfile(nc_file):
+        raise IOError("wgrib2 exited with code " + str(exitcode) + " converting: " + grib_file)
+    return nc_file
+
+
+def discard(future):
+    """
+    Function to drop a prefetch that will not be used, removing its temporary
+    NetCDF file once the helper thread is done with it.
+    :param future:
+    :return:
+    """
+    def remove_result(done):
+        if done.cancelled() or done.exception() is not None:
+            return
+        result = done.result()
+        if isinstance(result, str) and os.path.isfile(result):
+            os.remove(result)
+
+    if not future.cancel():
+        future.add_done_callback(remove_result)
+
+
+def prefetch_next_inputs(input_forcings, config_options, d_next, mpi_config):
+    """
+    Function to queue the new GRIB2 files a forcing product will need on the
+    next pipeline_depth output steps. This must be called on all processors.
+    :param input_forcings:
+    :param config_options:
+    :param d_next: Output date of the next output step.
+    :param mpi_config:
+    :return:
+    """
+    n_ahead = min(config_options.pipeline_depth,
+                  config_options.num_output_steps - config_options.current_output_step)
+    prefetch_inputs(input_forcings, config_options, d_next - datetime.timedelta(
+        seconds=config_options.output_freq * 60), range(1, n_ahead + 1), mpi_config)
+
+
+def prefetch_inputs(input_forcings, config_options, d_current, steps_ahead, mpi_config):
+    """
+    Function to work out which input files a forcing product will need on the
+    given output steps ahead of the current one (0 being the current step)
+    and queue the new GRIB2 files on the prefetcher. The neighbor files are
+    calculated on shallow copies of the product and configuration, so their
+    state is left untouched. This must be called on all processors as the
+    neighbor routines check the program status.
+    :param input_forcings:
+    :param config_options:
+    :param d_current: Output date of the current output step.
+    :param steps_ahead: Increasing numbers of output steps past the current one.
+    :param mpi_config:
+    :return:
+    """
+    if input_forcings.fileType != regrid.GRIB2 or input_forcings.keyValue not in PREFETCH_PRODUCTS:
+        return
+
+    next_files = [(probe.file_in2, regrid.grib2_match(probe)) for probe in
+                  input_staging.probe_neighbor_files(input_forcings, config_options, d_current, steps_ahead,
+                                                     mpi_config)]
+
+    if mpi_config.rank == 0:
+        previous_file = input_forcings.file_in2
+        for next_file, match in next_files:
+            if next_file != previous_file and os.path.isfile(next_file):
+                config_options.statusMsg = "Prefetching " + input_forcings.productName + \
+                                           " input file: " + next_file
+                err_handler.log_msg(config_options, mpi_config)
+                config_options.prefetcher.submit(input_forcings.productName, next_file, match)
+            previous_file = next_file
@@ -1,6 +1,7 @@
 """
 Regridding module file for regridding input forcing files.
 """
+import hashlib
 import os
 import sys
 import traceback
@@ -10,8 +11,13 @@ import ESMF
 import numpy as np
 
 from core import err_handler
+from core import input_staging
 from core import ioMod
+from core import ndv_mask
+from core import source_window
+from core import sparse_regrid
 from core import timeInterpMod
+from core import weight_gen
 
 # TODO: import these from forcingInputMod (not working currently ¯\_(ツ)_/¯)
 NETCDF = "NETCDF"
@@ -41,7 +47,11 @@ def create_link(name, input_file, tmpFile, config_options, mpi_config):
             config_options.statusMsg = name + " file being used: " + input_file
             err_handler.log_msg(config_options, mpi_config)
 
-            os.symlink(input_file, tmpFile)
+            # With parallel reads, every processor opens the link, so it cannot point at rank 0's staged copy.
+            if config_options.parallel_reads == 0:
+                os.symlink(input_staging.local_path(input_file, config_options), tmpFile)
+            else:
+                os.symlink(input_file, tmpFile)
         except:
             config_options.errMsg = "Unable to create link: " + input_file + " to: " + tmpFile
             err_handler.log_critical(config_options, mpi_config)
@@ -93,23 +103,18 @@ def regrid_conus_hrrr(input_forcings, config_options, wrf_hydro_geo_meta, mpi_co
                     err_handler.log_critical(config_options, mpi_config)
         err_handler.check_program_status(config_options, mpi_config)
 
-        fields = []
-        for force_count, grib_var in enumerate(input_forcings.grib_vars):
+        for grib_var in input_forcings.grib_vars:
             if mpi_config.rank == 0:
                 config_options.statusMsg = "Converting CONUS HRRR Variable: " + grib_var
                 err_handler.log_msg(config_options, mpi_config)
-            time_str = "{}-{} hour acc fcst".format(input_forcings.fcst_hour1, input_forcings.fcst_hour2) \
-                if grib_var == 'APCP' else str(input_forcings.fcst_hour2) + " hour fcst"
-            fields.append(':' + grib_var + ':' +
-                          input_forcings.grib_levels[force_count] + ':'
-                          + time_str + ":")
-        fields.append(":(HGT):(surface):")
+        match = grib2_match(input_forcings)
 
         # Create a temporary NetCDF file from the GRIB2 file.
-        cmd = '$WGRIB2 -match "(' + '|'.join(fields) + ')" ' + input_forcings.file_in2 + \
+        cmd = '$WGRIB2 -match "' + match + '" ' + input_forcings.file_in2 + \
               " -netcdf " + input_forcings.tmpFile
         id_tmp = ioMod.open_grib2(input_forcings.file_in2, input_forcings.tmpFile, cmd,
-                                  config_options, mpi_config, inputVar=None)
+                                  config_options, mpi_config, inputVar=None,
+                                  match=match)
         err_handler.check_program_status(config_options, mpi_config)
     else:
         create_link("HRRR", input_forcings.file_in2, input_forcings.tmpFile, config_options, mpi_config)
@@ -128,7 +133,8 @@ def regrid_conus_hrrr(input_forcings, config_options, wrf_hydro_geo_meta, mpi_co
             if mpi_config.rank == 0:
                 config_options.statusMsg = "Calculating HRRR regridding weights."
                 err_handler.log_msg(config_options, mpi_config)
-            calculate_weights(id_tmp, force_count, input_forcings, config_options, mpi_config)
+            calculate_weights(id_tmp, force_count, input_forcings, config_options, mpi_config,
+                              wrf_hydro_geo_meta=wrf_hydro_geo_meta)
             err_handler.check_program_status(config_options, mpi_config)
 
             # # Read in the HRRR height field, which is used for downscaling purposes.
@@ -176,8 +182,8 @@ def regrid_conus_hrrr(input_forcings, config_options, wrf_hydro_geo_meta, mpi_co
 
             # Set any pixel cells outside the input domain to the global missing value.
             try:
-                input_forcings.esmf_field_out.data[np.where(input_forcings.regridded_mask == 0)] = \
-                    config_options.globalNdv
+                ndv_mask.set_missing(input_forcings.esmf_field_out.data, input_forcings.outside_mask,
+                                     config_options.globalNdv)
             except (ValueError, ArithmeticError) as npe:
                 config_options.errMsg = "Unable to perform HRRR mask search on elevation data: " + str(npe)
                 err_handler.log_critical(config_options, mpi_config)
@@ -205,6 +211,10 @@ def regrid_conus_hrrr(input_forcings, config_options, wrf_hydro_geo_meta, mpi_co
             #         err_handler.log_critical(config_options, mpi_config)
         err_handler.check_program_status(config_options, mpi_config)
 
+        if config_options.regrid_multi_var == 1:
+            # All variables are regridded together below once the weights are in place.
+            continue
+
         # Regrid the input variables.
         var_tmp = None
         if mpi_config.rank == 0:
@@ -244,8 +254,8 @@ def regrid_conus_hrrr(input_forcings, config_options, wrf_hydro_geo_meta, mpi_co
 
         # Set any pixel cells outside the input domain to the global missing value.
         try:
-            input_forcings.esmf_field_out.data[np.where(input_forcings.regridded_mask == 0)] = \
-                config_options.globalNdv
+            ndv_mask.set_missing(input_forcings.esmf_field_out.data, input_forcings.outside_mask,
+                                 config_options.globalNdv)
         except (ValueError, ArithmeticError) as npe:
             config_options.errMsg = "Unable to perform mask test on regridded HRRR forcings: " + str(npe)
             err_handler.log_critical(config_options, mpi_config)
@@ -266,6 +276,11 @@ def regrid_conus_hrrr(input_forcings, config_options, wrf_hydro_geo_meta, mpi_co
                 input_forcings.regridded_forcings2[input_forcings.input_map_output[force_count], :, :]
         # mpi_config.comm.barrier()
 
+    if config_options.regrid_multi_var == 1:
+        regrid_stacked_inputs(id_tmp, input_forcings, config_options, wrf_hydro_geo_meta, mpi_config,
+                              var_scale={'APCP': 1.0 / 3600.0})
+        err_handler.check_program_status(config_options, mpi_config)
+
     # Close the temporary NetCDF file and remove it.
     if mpi_config.rank == 0:
         try:
@@ -273,11 +288,13 @@ def regrid_conus_hrrr(input_forcings, config_options, wrf_hydro_geo_meta, mpi_co
         except OSError:
             config_options.errMsg = "Unable to close NetCDF file: " + input_forcings.tmpFile
             err_handler.log_critical(config_options, mpi_config)
-        try:
-            os.remove(input_forcings.tmpFile)
-        except OSError:
-            config_options.errMsg = "Unable to remove NetCDF file: " + input_forcings.tmpFile
-            err_handler.log_critical(config_options, mpi_config)
+        # The in-process GRIB2 reader does not write a temporary file.
+        if os.path.isfile(input_forcings.tmpFile):
+            try:
+                os.remove(input_forcings.tmpFile)
+            except OSError:
+                config_options.errMsg = "Unable to remove NetCDF file: " + input_forcings.tmpFile
+                err_handler.log_critical(config_options, mpi_config)
     # mpi_config.comm.barrier()
 
 
@@ -323,23 +340,18 @@ def regrid_conus_rap(input_forcings, config_options, wrf_hydro_geo_meta, mpi_con
                     err_handler.log_critical(config_options, mpi_config)
         err_handler.check_program_status(config_options, mpi_config)
 
-        fields = []
-        for force_count, grib_var in enumerate(input_forcings.grib_vars):
+        for grib_var in input_forcings.grib_vars:
             if mpi_config.rank == 0:
                 config_options.statusMsg = "Converting CONUS RAP Variable: " + grib_var
                 err_handler.log_msg(config_options, mpi_config)
-            time_str = "{}-{} hour acc fcst".format(input_forcings.fcst_hour1, input_forcings.fcst_hour2) \
-                if grib_var == 'APCP' else str(input_forcings.fcst_hour2) + " hour fcst"
-            fields.append(':' + grib_var + ':' +
-                          input_forcings.grib_levels[force_count] + ':'
-                          + time_str + ":")
-        fields.append(":(HGT):(surface):")
+        match = grib2_match(input_forcings)
 
         # Create a temporary NetCDF file from the GRIB2 file.
-        cmd = '$WGRIB2 -match "(' + '|'.join(fields) + ')" ' + input_forcings.file_in2 + \
+        cmd = '$WGRIB2 -match "' + match + '" ' + input_forcings.file_in2 + \
               " -netcdf " + input_forcings.tmpFile
         id_tmp = ioMod.open_grib2(input_forcings.file_in2, input_forcings.tmpFile, cmd,
-                                  config_options, mpi_config, inputVar=None)
+                                  config_options, mpi_config, inputVar=None,
+                                  match=match)
         err_handler.check_program_status(config_options, mpi_config)
     else:
         create_link("RAP", input_forcings.file_in2, input_forcings.tmpFile, config_options, mpi_config)
@@ -358,7 +370,8 @@ def regrid_conus_rap(input_forcings, config_options, wrf_hydro_geo_meta, mpi_con
             if mpi_config.rank == 0:
                 config_options.statusMsg = "Calculating RAP regridding weights."
                 err_handler.log_msg(config_options, mpi_config)
-            calculate_weights(id_tmp, force_count, input_forcings, config_options, mpi_config)
+            calculate_weights(id_tmp, force_count, input_forcings, config_options, mpi_config,
+                              wrf_hydro_geo_meta=wrf_hydro_geo_meta)
             err_handler.check_program_status(config_options, mpi_config)
 
             # Read in the RAP height field, which is used for downscaling purposes.
@@ -406,8 +419,8 @@ def regrid_conus_rap(input_forcings, config_options, wrf_hydro_geo_meta, mpi_con
 
             # Set any pixel cells outside the input domain to the global missing value.
             try:
-                input_forcings.esmf_field_out.data[np.where(input_forcings.regridded_mask == 0)] = \
-                    config_options.globalNdv
+                ndv_mask.set_missing(input_forcings.esmf_field_out.data, input_forcings.outside_mask,
+                                     config_options.globalNdv)
             except (ValueError, ArithmeticError) as npe:
                 config_options.errMsg = "Unable to perform mask search on RAP elevation data: " + str(npe)
                 err_handler.log_critical(config_options, mpi_config)
@@ -435,6 +448,10 @@ def regrid_conus_rap(input_forcings, config_options, wrf_hydro_geo_meta, mpi_con
             #         err_handler.log_critical(config_options, mpi_config)
             # err_handler.check_program_status(config_options, mpi_config)
 
+        if config_options.regrid_multi_var == 1:
+            # All variables are regridded together below once the weights are in place.
+            continue
+
         # Regrid the input variables.
         var_tmp = None
         if mpi_config.rank == 0:
@@ -473,8 +490,8 @@ def regrid_conus_rap(input_forcings, config_options, wrf_hydro_geo_meta, mpi_con
 
         # Set any pixel cells outside the input domain to the global missing value.
         try:
-            input_forcings.esmf_field_out.data[np.where(input_forcings.regridded_mask == 0)] = \
-                config_options.globalNdv
+            ndv_mask.set_missing(input_forcings.esmf_field_out.data, input_forcings.outside_mask,
+                                 config_options.globalNdv)
         except (ValueError, ArithmeticError) as npe:
             config_options.errMsg = "Unable to run mask calculation on RAP variable: " + \
                                     input_forcings.netcdf_var_names[force_count] + " (" + str(npe) + ")"
@@ -503,6 +520,11 @@ def regrid_conus_rap(input_forcings, config_options, wrf_hydro_geo_meta, mpi_con
                 input_forcings.regridded_forcings2[input_forcings.input_map_output[force_count], :, :]
         err_handler.check_program_status(config_options, mpi_config)
 
+    if config_options.regrid_multi_var == 1:
+        regrid_stacked_inputs(id_tmp, input_forcings, config_options, wrf_hydro_geo_meta, mpi_config,
+                              var_scale={'APCP': 1.0 / 3600.0})
+        err_handler.check_program_status(config_options, mpi_config)
+
     # Close the temporary NetCDF file and remove it.
     if mpi_config.rank == 0:
         try:
@@ -510,11 +532,13 @@ def regrid_conus_rap(input_forcings, config_options, wrf_hydro_geo_meta, mpi_con
         except OSError:
             config_options.errMsg = "Unable to close NetCDF file: " + input_forcings.tmpFile
             err_handler.log_critical(config_options, mpi_config)
-        try:
-            os.remove(input_forcings.tmpFile)
-        except OSError:
-            config_options.errMsg = "Unable to remove NetCDF file: " + input_forcings.tmpFile
-            err_handler.log_critical(config_options, mpi_config)
+        # The in-process GRIB2 reader does not write a temporary file.
+        if os.path.isfile(input_forcings.tmpFile):
+            try:
+                os.remove(input_forcings.tmpFile)
+            except OSError:
+                config_options.errMsg = "Unable to remove NetCDF file: " + input_forcings.tmpFile
+                err_handler.log_critical(config_options, mpi_config)
     err_handler.check_program_status(config_options, mpi_config)
 
 
@@ -565,21 +589,18 @@ def regrid_cfsv2(input_forcings, config_options, wrf_hydro_geo_meta, mpi_config)
                     err_handler.log_critical(config_options, mpi_config)
         err_handler.check_program_status(config_options, mpi_config)
 
-        fields = []
-        for force_count, grib_var in enumerate(input_forcings.grib_vars):
+        for grib_var in input_forcings.grib_vars:
             if mpi_config.rank == 0:
                 config_options.statusMsg = "Converting CFSv2 Variable: " + grib_var
                 err_handler.log_msg(config_options, mpi_config)
-            fields.append(':' + grib_var + ':' +
-                          input_forcings.grib_levels[force_count] + ':'
-                          + str(input_forcings.fcst_hour2) + " hour fcst:")
-        fields.append(":(HGT):(surface):")
+        match = grib2_match(input_forcings)
 
         # Create a temporary NetCDF file from the GRIB2 file.
-        cmd = '$WGRIB2 -match "(' + '|'.join(fields) + ')" ' + input_forcings.file_in2 + \
+        cmd = '$WGRIB2 -match "' + match + '" ' + input_forcings.file_in2 + \
               " -netcdf " + input_forcings.tmpFile
         id_tmp = ioMod.open_grib2(input_forcings.file_in2, input_forcings.tmpFile, cmd,
-                                  config_options, mpi_config, inputVar=None)
+                                  config_options, mpi_config, inputVar=None,
+                                  match=match)
         err_handler.check_program_status(config_options, mpi_config)
     else:
         create_link("CFSv2", input_forcings.file_in2, input_forcings.tmpFile, config_options, mpi_config)
@@ -599,7 +620,8 @@ def regrid_cfsv2(input_forcings, config_options, wrf_hydro_geo_meta, mpi_config)
                 config_options.statusMsg = "Calculate CFSv2 regridding weights."
                 err_handler.log_msg(config_options, mpi_config)
 
-            calculate_weights(id_tmp, force_count, input_forcings, config_options, mpi_config)
+            calculate_weights(id_tmp, force_count, input_forcings, config_options, mpi_config,
+                              wrf_hydro_geo_meta=wrf_hydro_geo_meta)
             err_handler.check_program_status(config_options, mpi_config)
 
             # Read in the RAP height field, which is used for downscaling purposes.
@@ -618,7 +640,7 @@ def regrid_cfsv2(input_forcings, config_options, wrf_hydro_geo_meta, mpi_config)
             var_tmp = None
             if mpi_config.rank == 0:
                 try:
-                    var_tmp = id_tmp.variables['HGT_surface'][0, :, :]
+                    var_tmp = source_window.read_field(id_tmp.variables['HGT_surface'], input_forcings.src_window)
                 except (ValueError, KeyError, AttributeError) as err:
                     config_options.errMsg = "Unable to extract HGT_surface from file: " \
                                             + input_forcings.file_in2 + " (" + str(err) + ")"
@@ -649,8 +671,8 @@ def regrid_cfsv2(input_forcings, config_options, wrf_hydro_geo_meta, mpi_config)
 
             # Set any pixel cells outside the input domain to the global missing value.
             try:
-                input_forcings.esmf_field_out.data[np.where(input_forcings.regridded_mask == 0)] = \
-                    config_options.globalNdv
+                ndv_mask.set_missing(input_forcings.esmf_field_out.data, input_forcings.outside_mask,
+                                     config_options.globalNdv)
             except (ValueError, ArithmeticError) as npe:
                 config_options.errMsg = "Unable to run mask calculation on CFSv2 elevation data: " + str(npe)
                 err_handler.log_critical(config_options, mpi_config)
@@ -688,7 +710,8 @@ def regrid_cfsv2(input_forcings, config_options, wrf_hydro_geo_meta, mpi_config)
                                            input_forcings.netcdf_var_names[force_count]
                 err_handler.log_msg(config_options, mpi_config)
             try:
-                var_tmp = id_tmp.variables[input_forcings.netcdf_var_names[force_count]][0, :, :]
+                var_tmp = source_window.read_field(id_tmp.variables[input_forcings.netcdf_var_names[force_count]],
+                                                   input_forcings.src_window)
             except (ValueError, KeyError, AttributeError) as err:
                 config_options.errMsg = "Unable to extract: " + input_forcings.netcdf_var_names[force_count] + \
                                         " from file: " + input_forcings.tmpFile + " (" + str(err) + ")"
@@ -757,8 +780,8 @@ def regrid_cfsv2(input_forcings, config_options, wrf_hydro_geo_meta, mpi_config)
 
             # Set any pixel cells outside the input domain to the global missing value.
             try:
-                input_forcings.esmf_field_out.data[np.where(input_forcings.regridded_mask == 0)] = \
-                    config_options.globalNdv
+                ndv_mask.set_missing(input_forcings.esmf_field_out.data, input_forcings.outside_mask,
+                                     config_options.globalNdv)
             except (ValueError, ArithmeticError) as npe:
                 config_options.errMsg = "Unable to run mask calculation on CFSv2 variable: " + \
                                         input_forcings.netcdf_var_names[force_count] + " (" + str(npe) + ")"
@@ -796,11 +819,13 @@ def regrid_cfsv2(input_forcings, config_options, wrf_hydro_geo_meta, mpi_config)
     err_handler.check_program_status(config_options, mpi_config)
 
     if mpi_config.rank == 0:
-        try:
-            os.remove(input_forcings.tmpFile)
-        except OSError:
-            config_options.errMsg = "Unable to remove NetCDF file: " + input_forcings.tmpFile
-            err_handler.log_critical(config_options, mpi_config)
+        # The in-process GRIB2 reader does not write a temporary file.
+        if os.path.isfile(input_forcings.tmpFile):
+            try:
+                os.remove(input_forcings.tmpFile)
+            except OSError:
+                config_options.errMsg = "Unable to remove NetCDF file: " + input_forcings.tmpFile
+                err_handler.log_critical(config_options, mpi_config)
     err_handler.check_program_status(config_options, mpi_config)
 
 
@@ -841,7 +866,8 @@ def regrid_custom_hourly_netcdf(input_forcings, config_options, wrf_hydro_geo_me
                                                config_options, wrf_hydro_geo_meta, mpi_config)
 
         if calc_regrid_flag:
-            calculate_weights(id_tmp, force_count, input_forcings, config_options, mpi_config)
+            calculate_weights(id_tmp, force_count, input_forcings, config_options, mpi_config,
+                              wrf_hydro_geo_meta=wrf_hydro_geo_meta)
 
             # Read in the RAP height field, which is used for downscaling purposes.
             if 'HGT_surface' in id_tmp.variables.keys():
@@ -877,8 +903,8 @@ def regrid_custom_hourly_netcdf(input_forcings, config_options, wrf_hydro_geo_me
 
                 # Set any pixel cells outside the input domain to the global missing value.
                 try:
-                    input_forcings.esmf_field_out.data[np.where(input_forcings.regridded_mask == 0)] = \
-                        config_options.globalNdv
+                    ndv_mask.set_missing(input_forcings.esmf_field_out.data, input_forcings.outside_mask,
+                                         config_options.globalNdv)
                 except (ValueError, ArithmeticError) as npe:
                     config_options.errMsg = "Unable to compute mask on elevation data: " + str(npe)
                     err_handler.log_critical(config_options, mpi_config)
@@ -898,27 +924,30 @@ def regrid_custom_hourly_netcdf(input_forcings, config_options, wrf_hydro_geo_me
                                                f"Downscaling will not be available."
                     err_handler.log_msg(config_options, mpi_config)
 
-            # close netCDF file on non-root ranks
-            if mpi_config.rank != 0:
-                id_tmp.close()
-
         # Regrid the input variables.
         var_tmp = None
         fill = fill_values.get(input_forcings.grib_vars[force_count], config_options.globalNdv)
         if mpi_config.rank == 0:
             config_options.statusMsg = "Regridding Custom netCDF input variable: " + nc_var
             err_handler.log_msg(config_options, mpi_config)
-            try:
-                config_options.statusMsg = f"Using {fill} to replace missing values in input"
-                err_handler.log_msg(config_options, mpi_config)
-                var_tmp = id_tmp.variables[nc_var][:].filled(fill)[0, :, :]
-            except Exception as err:
-                config_options.errMsg = "Unable to extract " + nc_var + \
-                                        " from: " + input_forcings.file_in2 + " (" + str(err) + ")"
-                err_handler.log_critical(config_options, mpi_config)
-        err_handler.check_program_status(config_options, mpi_config)
+            config_options.statusMsg = f"Using {fill} to replace missing values in input"
+            err_handler.log_msg(config_options, mpi_config)
 
-        var_sub_tmp = mpi_config.scatter_array(input_forcings, var_tmp, config_options)
+        if config_options.parallel_reads == 1:
+            # The file is open on every processor, so read the local hyperslab directly.
+            var_sub_tmp = ioMod.read_local_slab(id_tmp, nc_var, input_forcings, config_options, mpi_config,
+                                                fill=fill)
+        else:
+            if mpi_config.rank == 0:
+                try:
+                    var_tmp = id_tmp.variables[nc_var][:].filled(fill)[0, :, :]
+                except Exception as err:
+                    config_options.errMsg = "Unable to extract " + nc_var + \
+                                            " from: " + input_forcings.file_in2 + " (" + str(err) + ")"
+                    err_handler.log_critical(config_options, mpi_config)
+            err_handler.check_program_status(config_options, mpi_config)
+
+            var_sub_tmp = mpi_config.scatter_array(input_forcings, var_tmp, config_options)
         err_handler.check_program_status(config_options, mpi_config)
 
         try:
@@ -938,7 +967,7 @@ def regrid_custom_hourly_netcdf(input_forcings, config_options, wrf_hydro_geo_me
 
         # Set any pixel cells outside the input domain to the global missing value.
         try:
-            input_forcings.esmf_field_out.data[np.where(input_forcings.regridded_mask == 0)] = fill
+            ndv_mask.set_missing(input_forcings.esmf_field_out.data, input_forcings.outside_mask, fill)
         except (ValueError, ArithmeticError) as npe:
             config_options.errMsg = "Unable to calculate mask from input Custom netCDF regridded forcings: " + str(
                 npe)
@@ -979,6 +1008,8 @@ def regrid_custom_hourly_netcdf(input_forcings, config_options, wrf_hydro_geo_me
         except OSError:
             config_options.errMsg = "Unable to close NetCDF file: " + input_forcings.tmpFile
             err_handler.err_out(config_options)
+    else:
+        ioMod.close_netcdf_all_procs(id_tmp, config_options, mpi_config)
 
 
 @static_vars(last_file=None)
@@ -1011,7 +1042,9 @@ def regrid_gfs(input_forcings, config_options, wrf_hydro_geo_meta, mpi_config):
     err_handler.check_program_status(config_options, mpi_config)
 
     # check / set previous file to see if we're going to reuse
-    reuse_prev_file = (input_forcings.file_in2 == regrid_gfs.last_file)
+    # The in-process GRIB2 reader keeps no temporary file around to reuse.
+    reuse_prev_file = (input_forcings.file_in2 == regrid_gfs.last_file) and \
+        (input_forcings.fileType == NETCDF or config_options.grib2_reader == 0)
     regrid_gfs.last_file = input_forcings.file_in2
 
     # This file may exist. If it does, and we don't need it again, remove it.....
@@ -1044,38 +1077,16 @@ def regrid_gfs(input_forcings, config_options, wrf_hydro_geo_meta, mpi_config):
         err_handler.check_program_status(config_options, mpi_config)
     else:
         if input_forcings.fileType != NETCDF:
-            fields = []
-            for force_count, grib_var in enumerate(input_forcings.grib_vars):
+            for grib_var in input_forcings.grib_vars:
                 if mpi_config.rank == 0:
                     config_options.statusMsg = "Converting 13km GFS Variable: " + grib_var
                     err_handler.log_msg(config_options, mpi_config)
-                # Create a temporary NetCDF file from the GRIB2 file.
-                if grib_var == "PRATE":
-                    # By far the most complicated of output variables. We need to calculate
-                    # our 'average' PRATE based on our current hour.
-                    if input_forcings.fcst_hour2 <= 240:
-                        tmp_hr_current = input_forcings.fcst_hour2
-
-                        diff_tmp = tmp_hr_current % 6 if tmp_hr_current % 6 > 0 else 6
-                        tmp_hr_previous = tmp_hr_current - diff_tmp
-
-                    else:
-                        tmp_hr_previous = input_forcings.fcst_hour1
-
-                    fields.append(':' + grib_var + ':' +
-                                  input_forcings.grib_levels[force_count] + ':' +
-                                  str(tmp_hr_previous) + '-' + str(input_forcings.fcst_hour2) + " hour ave fcst:")
-                else:
-                    fields.append(':' + grib_var + ':' +
-                                  input_forcings.grib_levels[force_count] + ':'
-                                  + str(input_forcings.fcst_hour2) + " hour fcst:")
-
-            # if calc_regrid_flag:
-            fields.append(":(HGT):(surface):")
-            cmd = '$WGRIB2 -match "(' + '|'.join(fields) + ')" ' + input_forcings.file_in2 + \
+            match = grib2_match(input_forcings)
+            cmd = '$WGRIB2 -match "' + match + '" ' + input_forcings.file_in2 + \
                   " -netcdf " + input_forcings.tmpFile
             id_tmp = ioMod.open_grib2(input_forcings.file_in2, input_forcings.tmpFile, cmd,
-                                      config_options, mpi_config, inputVar=None)
+                                      config_options, mpi_config, inputVar=None,
+                                      match=match)
             err_handler.check_program_status(config_options, mpi_config)
         else:
             create_link("GFS", input_forcings.file_in2, input_forcings.tmpFile, config_options, mpi_config)
@@ -1094,7 +1105,8 @@ def regrid_gfs(input_forcings, config_options, wrf_hydro_geo_meta, mpi_config):
             if mpi_config.rank == 0:
                 config_options.statusMsg = "Calculating 13km GFS regridding weights."
                 err_handler.log_msg(config_options, mpi_config)
-            calculate_weights(id_tmp, force_count, input_forcings, config_options, mpi_config)
+            calculate_weights(id_tmp, force_count, input_forcings, config_options, mpi_config,
+                              wrf_hydro_geo_meta=wrf_hydro_geo_meta)
             err_handler.check_program_status(config_options, mpi_config)
 
             # Read in the GFS height field, which is used for downscaling purposes.
@@ -1113,7 +1125,7 @@ def regrid_gfs(input_forcings, config_options, wrf_hydro_geo_meta, mpi_config):
             var_tmp = None
             if mpi_config.rank == 0:
                 try:
-                    var_tmp = id_tmp.variables['HGT_surface'][0, :, :]
+                    var_tmp = source_window.read_field(id_tmp.variables['HGT_surface'], input_forcings.src_window)
                 except (ValueError, KeyError, AttributeError) as err:
                     config_options.errMsg = "Unable to extract GFS elevation from: " + input_forcings.tmpFile + \
                                             " (" + str(err) + ")"
@@ -1143,8 +1155,8 @@ def regrid_gfs(input_forcings, config_options, wrf_hydro_geo_meta, mpi_config):
 
             # Set any pixel cells outside the input domain to the global missing value.
             try:
-                input_forcings.esmf_field_out.data[np.where(input_forcings.regridded_mask == 0)] = \
-                    config_options.globalNdv
+                ndv_mask.set_missing(input_forcings.esmf_field_out.data, input_forcings.outside_mask,
+                                     config_options.globalNdv)
             except (ValueError, ArithmeticError) as npe:
                 config_options.errMsg = "Unable to perform mask search on GFS elevation data: " + str(npe)
                 err_handler.log_critical(config_options, mpi_config)
@@ -1176,7 +1188,8 @@ def regrid_gfs(input_forcings, config_options, wrf_hydro_geo_meta, mpi_config):
         var_tmp = None
         if mpi_config.rank == 0:
             try:
-                var_tmp = id_tmp.variables[input_forcings.netcdf_var_names[force_count]][0, :, :]
+                var_tmp = source_window.read_field(id_tmp.variables[input_forcings.netcdf_var_names[force_count]],
+                                                   input_forcings.src_window)
             except (ValueError, KeyError, AttributeError) as err:
                 config_options.errMsg = "Unable to extract: " + input_forcings.netcdf_var_names[force_count] + \
                                         " from: " + input_forcings.tmpFile + " (" + str(err) + ")"
@@ -1193,7 +1206,6 @@ def regrid_gfs(input_forcings, config_options, wrf_hydro_geo_meta, mpi_config):
                     var_tmp = timeInterpMod.gfs_pcp_time_interp(input_forcings, config_options, mpi_config)
 
         var_sub_tmp = mpi_config.scatter_array(input_forcings, var_tmp, config_options)
-        mpi_config.comm.barrier()
         err_handler.check_program_status(config_options, mpi_config)
 
         try:
@@ -1223,8 +1235,8 @@ def regrid_gfs(input_forcings, config_options, wrf_hydro_geo_meta, mpi_config):
 
         # Set any pixel cells outside the input domain to the global missing value.
         try:
-            input_forcings.esmf_field_out.data[np.where(input_forcings.regridded_mask == 0)] = \
-                config_options.globalNdv
+            ndv_mask.set_missing(input_forcings.esmf_field_out.data, input_forcings.outside_mask,
+                                 config_options.globalNdv)
         except (ValueError, ArithmeticError) as npe:
             config_options.errMsg = "Unable to run mask search on GFS variable: " + \
                                     input_forcings.netcdf_var_names[force_count] + " (" + str(npe) + ")"
@@ -1304,21 +1316,18 @@ def regrid_nam_nest(input_forcings, config_options, wrf_hydro_geo_meta, mpi_conf
                     err_handler.err_out(config_options)
         err_handler.check_program_status(config_options, mpi_config)
 
-        fields = []
-        for force_count, grib_var in enumerate(input_forcings.grib_vars):
+        for grib_var in input_forcings.grib_vars:
             if mpi_config.rank == 0:
                 config_options.statusMsg = "Converting NAM-Nest Variable: " + grib_var
                 err_handler.log_msg(config_options, mpi_config)
-            fields.append(':' + grib_var + ':' +
-                          input_forcings.grib_levels[force_count] + ':'
-                          + str(input_forcings.fcst_hour2) + " hour fcst:")
-        fields.append(":(HGT):(surface):")
+        match = grib2_match(input_forcings)
 
         # Create a temporary NetCDF file from the GRIB2 file.
-        cmd = '$WGRIB2 -match "(' + '|'.join(fields) + ')" ' + input_forcings.file_in2 + \
+        cmd = '$WGRIB2 -match "' + match + '" ' + input_forcings.file_in2 + \
               " -netcdf " + input_forcings.tmpFile
         id_tmp = ioMod.open_grib2(input_forcings.file_in2, input_forcings.tmpFile, cmd,
-                                  config_options, mpi_config, inputVar=None)
+                                  config_options, mpi_config, inputVar=None,
+                                  match=match)
         err_handler.check_program_status(config_options, mpi_config)
     else:
         create_link("NAM-Nest", input_forcings.file_in2, input_forcings.tmpFile, config_options, mpi_config)
@@ -1340,7 +1349,8 @@ def regrid_nam_nest(input_forcings, config_options, wrf_hydro_geo_meta, mpi_conf
             if mpi_config.rank == 0:
                 config_options.statusMsg = "Calculating NAM nest regridding weights...."
                 err_handler.log_msg(config_options, mpi_config)
-            calculate_weights(id_tmp, force_count, input_forcings, config_options, mpi_config)
+            calculate_weights(id_tmp, force_count, input_forcings, config_options, mpi_config,
+                              wrf_hydro_geo_meta=wrf_hydro_geo_meta)
             err_handler.check_program_status(config_options, mpi_config)
 
             # Read in the RAP height field, which is used for downscaling purposes.
@@ -1356,7 +1366,7 @@ def regrid_nam_nest(input_forcings, config_options, wrf_hydro_geo_meta, mpi_conf
 
             # Regrid the height variable.
             if mpi_config.rank == 0:
-                var_tmp = id_tmp.variables['HGT_surface'][0, :, :]
+                var_tmp = source_window.read_field(id_tmp.variables['HGT_surface'], input_forcings.src_window)
             else:
                 var_tmp = None
             err_handler.check_program_status(config_options, mpi_config)
@@ -1386,8 +1396,8 @@ def regrid_nam_nest(input_forcings, config_options, wrf_hydro_geo_meta, mpi_conf
 
             # Set any pixel cells outside the input domain to the global missing value.
             try:
-                input_forcings.esmf_field_out.data[np.where(input_forcings.regridded_mask == 0)] = \
-                    config_options.globalNdv
+                ndv_mask.set_missing(input_forcings.esmf_field_out.data, input_forcings.outside_mask,
+                                     config_options.globalNdv)
             except (ValueError, ArithmeticError) as npe:
                 config_options.errMsg = "Unable to compute mask on NAM nest elevation data: " + str(npe)
                 err_handler.log_critical(config_options, mpi_config)
@@ -1418,6 +1428,10 @@ def regrid_nam_nest(input_forcings, config_options, wrf_hydro_geo_meta, mpi_conf
 
         err_handler.check_program_status(config_options, mpi_config)
 
+        if config_options.regrid_multi_var == 1:
+            # All variables are regridded together below once the weights are in place.
+            continue
+
         # Regrid the input variables.
         var_tmp = None
         if mpi_config.rank == 0:
@@ -1425,7 +1439,8 @@ def regrid_nam_nest(input_forcings, config_options, wrf_hydro_geo_meta, mpi_conf
                                        input_forcings.netcdf_var_names[force_count]
             err_handler.log_msg(config_options, mpi_config)
             try:
-                var_tmp = id_tmp.variables[input_forcings.netcdf_var_names[force_count]][0, :, :]
+                var_tmp = source_window.read_field(id_tmp.variables[input_forcings.netcdf_var_names[force_count]],
+                                                   input_forcings.src_window)
             except (ValueError, KeyError, AttributeError) as err:
                 config_options.errMsg = "Unable to extract " + input_forcings.netcdf_var_names[force_count] + \
                                         " from: " + input_forcings.tmpFile + " (" + str(err) + ")"
@@ -1452,8 +1467,8 @@ def regrid_nam_nest(input_forcings, config_options, wrf_hydro_geo_meta, mpi_conf
 
         # Set any pixel cells outside the input domain to the global missing value.
         try:
-            input_forcings.esmf_field_out.data[np.where(input_forcings.regridded_mask == 0)] = \
-                config_options.globalNdv
+            ndv_mask.set_missing(input_forcings.esmf_field_out.data, input_forcings.outside_mask,
+                                 config_options.globalNdv)
         except (ValueError, ArithmeticError) as npe:
             config_options.errMsg = "Unable to calculate mask from input NAM nest regridded forcings: " + str(npe)
             err_handler.log_critical(config_options, mpi_config)
@@ -1474,6 +1489,10 @@ def regrid_nam_nest(input_forcings, config_options, wrf_hydro_geo_meta, mpi_conf
                 input_forcings.regridded_forcings2[input_forcings.input_map_output[force_count], :, :]
         err_handler.check_program_status(config_options, mpi_config)
 
+    if config_options.regrid_multi_var == 1:
+        regrid_stacked_inputs(id_tmp, input_forcings, config_options, wrf_hydro_geo_meta, mpi_config)
+        err_handler.check_program_status(config_options, mpi_config)
+
     # Close the temporary NetCDF file and remove it.
     if mpi_config.rank == 0:
         try:
@@ -1481,11 +1500,13 @@ def regrid_nam_nest(input_forcings, config_options, wrf_hydro_geo_meta, mpi_conf
         except OSError:
             config_options.errMsg = "Unable to close NetCDF file: " + input_forcings.tmpFile
             err_handler.log_critical(config_options, mpi_config)
-        try:
-            os.remove(input_forcings.tmpFile)
-        except OSError:
-            config_options.errMsg = "Unable to remove NetCDF file: " + input_forcings.tmpFile
-            err_handler.log_critical(config_options, mpi_config)
+        # The in-process GRIB2 reader does not write a temporary file.
+        if os.path.isfile(input_forcings.tmpFile):
+            try:
+                os.remove(input_forcings.tmpFile)
+            except OSError:
+                config_options.errMsg = "Unable to remove NetCDF file: " + input_forcings.tmpFile
+                err_handler.log_critical(config_options, mpi_config)
     err_handler.check_program_status(config_options, mpi_config)
 
 
@@ -1516,17 +1537,13 @@ def regrid_mrms_hourly(supplemental_precip, config_options, wrf_hydro_geo_meta,
             config_options.statusMsg = "No MRMS regridding required for this timestep."
             err_handler.log_msg(config_options, mpi_config)
         return
-    # MRMS data originally is stored as .gz files. We need to compose a series
-    # of temporary paths.
-    # 1.) The unzipped GRIB2 precipitation file.
-    # 2.) The unzipped GRIB2 RQI file.
-    # 3.) A temporary NetCDF file that stores the precipitation grid.
-    # 4.) A temporary NetCDF file that stores the RQI grid.
+    # MRMS data originally is stored as .gz files, which are decompressed in
+    # memory. We need to compose a series of temporary paths.
+    # 1.) A temporary NetCDF file that stores the precipitation grid.
+    # 2.) A temporary NetCDF file that stores the RQI grid.
     # Create a path for a temporary NetCDF files that will
     # be created through the wgrib2 process.
-    mrms_tmp_grib2 = config_options.scratch_dir + "/MRMS_PCP_TMP-{}.grib2".format(mkfilename())
     mrms_tmp_nc = config_options.scratch_dir + "/MRMS_PCP_TMP-{}.nc".format(mkfilename())
-    mrms_tmp_rqi_grib2 = config_options.scratch_dir + "/MRMS_RQI_TMP-{}.grib2".format(mkfilename())
     mrms_tmp_rqi_nc = config_options.scratch_dir + "/MRMS_RQI_TMP-{}.nc".format(mkfilename())
     # mpi_config.comm.barrier()
 
@@ -1543,15 +1560,6 @@ def regrid_mrms_hourly(supplemental_precip, config_options, wrf_hydro_geo_meta,
 
     # These files shouldn't exist. If they do, remove them.
     if mpi_config.rank == 0:
-        if os.path.isfile(mrms_tmp_grib2):
-            config_options.statusMsg = "Found old temporary file: " + \
-                                       mrms_tmp_grib2 + " - Removing....."
-            err_handler.log_warning(config_options, mpi_config)
-            try:
-                os.remove(mrms_tmp_grib2)
-            except OSError:
-                config_options.errMsg = "Unable to remove file: " + mrms_tmp_grib2
-                err_handler.log_critical(config_options, mpi_config)
         if os.path.isfile(mrms_tmp_nc):
             config_options.statusMsg = "Found old temporary file: " + \
                                        mrms_tmp_nc + " - Removing....."
@@ -1561,15 +1569,6 @@ def regrid_mrms_hourly(supplemental_precip, config_options, wrf_hydro_geo_meta,
             except OSError:
                 config_options.errMsg = "Unable to remove file: " + mrms_tmp_nc
                 err_handler.log_critical(config_options, mpi_config)
-        if os.path.isfile(mrms_tmp_rqi_grib2):
-            config_options.statusMsg = "Found old temporary file: " + \
-                                       mrms_tmp_rqi_grib2 + " - Removing....."
-            err_handler.log_warning(config_options, mpi_config)
-            try:
-                os.remove(mrms_tmp_rqi_grib2)
-            except OSError:
-                config_options.errMsg = "Unable to remove file: " + mrms_tmp_rqi_grib2
-                err_handler.log_critical(config_options, mpi_config)
         if os.path.isfile(mrms_tmp_rqi_nc):
             config_options.statusMsg = "Found old temporary file: " + \
                                        mrms_tmp_rqi_nc + " - Removing....."
@@ -1594,43 +1593,32 @@ def regrid_mrms_hourly(supplemental_precip, config_options, wrf_hydro_geo_meta,
     #    return
 
     if supplemental_precip.fileType != NETCDF:
-        # Unzip MRMS files to temporary locations.
-        ioMod.unzip_file(supplemental_precip.file_in2, mrms_tmp_grib2, config_options, mpi_config)
-        err_handler.check_program_status(config_options, mpi_config)
-
+        # Decompress the MRMS precip and RQI files in memory, concurrently, rather
+        # than unzipping them to temporary GRIB2 files.
+        gz_files = [supplemental_precip.file_in2]
         if config_options.rqiMethod == 1:
-            ioMod.unzip_file(supplemental_precip.rqi_file_in2, mrms_tmp_rqi_grib2, config_options, mpi_config)
-            err_handler.check_program_status(config_options, mpi_config)
+            gz_files.append(supplemental_precip.rqi_file_in2)
+        buffers = ioMod.gunzip_files(gz_files, config_options, mpi_config)
+        err_handler.check_program_status(config_options, mpi_config)
+        if buffers is None:
+            buffers = [None] * len(gz_files)
 
-        # Perform a GRIB dump to NetCDF for the MRMS precip and RQI data.
-        cmd1 = "$WGRIB2 " + mrms_tmp_grib2 + " -netcdf " + mrms_tmp_nc
-        id_mrms = ioMod.open_grib2(mrms_tmp_grib2, mrms_tmp_nc, cmd1, config_options,
-                                   mpi_config, supplemental_precip.netcdf_var_names[0])
+        # Decode the GRIB2 bytes directly, or pipe them into wgrib2 to dump the
+        # MRMS precip and RQI data to NetCDF.
+        cmd1 = None if config_options.grib2_reader == 1 else "$WGRIB2 - -netcdf " + mrms_tmp_nc
+        id_mrms = ioMod.open_grib2(supplemental_precip.file_in2, mrms_tmp_nc, cmd1, config_options,
+                                   mpi_config, supplemental_precip.netcdf_var_names[0], GribBuffer=buffers[0])
         err_handler.check_program_status(config_options, mpi_config)
 
         if config_options.rqiMethod == 1:
-            cmd2 = "$WGRIB2 " + mrms_tmp_rqi_grib2 + " -netcdf " + mrms_tmp_rqi_nc
-            id_mrms_rqi = ioMod.open_grib2(mrms_tmp_rqi_grib2, mrms_tmp_rqi_nc, cmd2, config_options,
-                                           mpi_config, supplemental_precip.rqi_netcdf_var_names[0])
+            cmd2 = None if config_options.grib2_reader == 1 else "$WGRIB2 - -netcdf " + mrms_tmp_rqi_nc
+            id_mrms_rqi = ioMod.open_grib2(supplemental_precip.rqi_file_in2, mrms_tmp_rqi_nc, cmd2,
+                                           config_options, mpi_config,
+                                           supplemental_precip.rqi_netcdf_var_names[0], GribBuffer=buffers[1])
             err_handler.check_program_status(config_options, mpi_config)
         else:
             id_mrms_rqi = None
-
-        # Remove temporary GRIB2 files
-        if mpi_config.rank == 0:
-            try:
-                os.remove(mrms_tmp_grib2)
-            except OSError:
-                config_options.errMsg = "Unable to remove GRIB2 file: " + mrms_tmp_grib2
-                err_handler.log_critical(config_options, mpi_config)
-
-            if config_options.rqiMethod == 1:
-                try:
-                    os.remove(mrms_tmp_rqi_grib2)
-                except OSError:
-                    config_options.errMsg = "Unable to remove GRIB2 file: " + mrms_tmp_rqi_grib2
-                    err_handler.log_critical(config_options, mpi_config)
-        err_handler.check_program_status(config_options, mpi_config)
+        buffers = None
     else:
         create_link("MRMS", supplemental_precip.file_in2, mrms_tmp_nc, config_options, mpi_config)
         id_mrms = ioMod.open_netcdf_forcing(mrms_tmp_nc, config_options, mpi_config)
@@ -1649,7 +1637,8 @@ def regrid_mrms_hourly(supplemental_precip, config_options, wrf_hydro_geo_meta,
         if mpi_config.rank == 0:
             config_options.statusMsg = "Calculating MRMS regridding weights."
             err_handler.log_msg(config_options, mpi_config)
-        calculate_supp_pcp_weights(supplemental_precip, id_mrms, mrms_tmp_nc, config_options, mpi_config)
+        calculate_supp_pcp_weights(supplemental_precip, id_mrms, mrms_tmp_nc, config_options, mpi_config,
+                                   wrf_hydro_geo_meta=wrf_hydro_geo_meta)
         err_handler.check_program_status(config_options, mpi_config)
 
     # Regrid the RQI grid.
@@ -1660,7 +1649,7 @@ def regrid_mrms_hourly(supplemental_precip, config_options, wrf_hydro_geo_meta,
                 var_tmp = id_mrms_rqi.variables[supplemental_precip.rqi_netcdf_var_names[0]][0, :, :]
             except (ValueError, KeyError, AttributeError) as err:
                 config_options.errMsg = "Unable to extract: " + supplemental_precip.rqi_netcdf_var_names[0] + \
-                                        " from: " + mrms_tmp_rqi_grib2 + " (" + str(err) + ")"
+                                        " from: " + supplemental_precip.rqi_file_in2 + " (" + str(err) + ")"
                 err_handler.log_critical(config_options, mpi_config)
         err_handler.check_program_status(config_options, mpi_config)
 
@@ -1687,8 +1676,8 @@ def regrid_mrms_hourly(supplemental_precip, config_options, wrf_hydro_geo_meta,
 
         # Set any pixel cells outside the input domain to the global missing value.
         try:
-            supplemental_precip.esmf_field_out.data[np.where(supplemental_precip.regridded_mask == 0)] = \
-                config_options.globalNdv
+            ndv_mask.set_missing(supplemental_precip.esmf_field_out.data, supplemental_precip.outside_mask,
+                                 config_options.globalNdv)
         except (ValueError, ArithmeticError) as npe:
             config_options.errMsg = "Unable to run mask calculation for MRMS RQI data: " + str(npe)
             err_handler.log_critical(config_options, mpi_config)
@@ -1718,11 +1707,12 @@ def regrid_mrms_hourly(supplemental_precip, config_options, wrf_hydro_geo_meta,
             except OSError:
                 config_options.errMsg = "Unable to close NetCDF file: " + mrms_tmp_rqi_nc
                 err_handler.log_critical(config_options, mpi_config)
-            try:
-                os.remove(mrms_tmp_rqi_nc)
-            except OSError:
-                config_options.errMsg = "Unable to remove NetCDF file: " + mrms_tmp_rqi_nc
-                err_handler.log_critical(config_options, mpi_config)
+            if os.path.isfile(mrms_tmp_rqi_nc):
+                try:
+                    os.remove(mrms_tmp_rqi_nc)
+                except OSError:
+                    config_options.errMsg = "Unable to remove NetCDF file: " + mrms_tmp_rqi_nc
+                    err_handler.log_critical(config_options, mpi_config)
         err_handler.check_program_status(config_options, mpi_config)
 
     # Regrid the input variables.
@@ -1754,8 +1744,8 @@ def regrid_mrms_hourly(supplemental_precip, config_options, wrf_hydro_geo_meta,
 
     # Set any pixel cells outside the input domain to the global missing value.
     try:
-        supplemental_precip.esmf_field_out.data[np.where(supplemental_precip.regridded_mask == 0)] = \
-            config_options.globalNdv
+        ndv_mask.set_missing(supplemental_precip.esmf_field_out.data, supplemental_precip.outside_mask,
+                             config_options.globalNdv)
     except (ValueError, ArithmeticError) as npe:
         config_options.errMsg = "Unable to run mask search on MRMS supplemental precip: " + str(npe)
         err_handler.log_critical(config_options, mpi_config)
@@ -1803,11 +1793,12 @@ def regrid_mrms_hourly(supplemental_precip, config_options, wrf_hydro_geo_meta,
             config_options.errMsg = "Unable to close NetCDF file: " + mrms_tmp_nc
             err_handler.log_critical(config_options, mpi_config)
 
-        try:
-            os.remove(mrms_tmp_nc)
-        except OSError:
-            config_options.errMsg = "Unable to remove NetCDF file: " + mrms_tmp_nc
-            err_handler.log_critical(config_options, mpi_config)
+        if os.path.isfile(mrms_tmp_nc):
+            try:
+                os.remove(mrms_tmp_nc)
+            except OSError:
+                config_options.errMsg = "Unable to remove NetCDF file: " + mrms_tmp_nc
+                err_handler.log_critical(config_options, mpi_config)
     err_handler.check_program_status(config_options, mpi_config)
 
 
@@ -1852,23 +1843,18 @@ def regrid_hourly_wrf_arw(input_forcings, config_options, wrf_hydro_geo_meta, mp
                     err_handler.err_out(config_options)
         err_handler.check_program_status(config_options, mpi_config)
 
-        fields = []
-        for force_count, grib_var in enumerate(input_forcings.grib_vars):
+        for grib_var in input_forcings.grib_vars:
             if mpi_config.rank == 0:
                 config_options.statusMsg = "Converting WRF-ARW Variable: " + grib_var
                 err_handler.log_msg(config_options, mpi_config)
-            time_str = "{}-{} hour acc fcst".format(input_forcings.fcst_hour1, input_forcings.fcst_hour2) \
-                if grib_var == 'APCP' else str(input_forcings.fcst_hour2) + " hour fcst"
-            fields.append(':' + grib_var + ':' +
-                          input_forcings.grib_levels[force_count] + ':'
-                          + time_str + ":")
-        fields.append(":(HGT):(surface):")
+        match = grib2_match(input_forcings)
 
         # Create a temporary NetCDF file from the GRIB2 file.
-        cmd = '$WGRIB2 -match "(' + '|'.join(fields) + ')" ' + input_forcings.file_in2 + \
+        cmd = '$WGRIB2 -match "' + match + '" ' + input_forcings.file_in2 + \
               " -netcdf " + input_forcings.tmpFile
         id_tmp = ioMod.open_grib2(input_forcings.file_in2, input_forcings.tmpFile, cmd,
-                                  config_options, mpi_config, inputVar=None)
+                                  config_options, mpi_config, inputVar=None,
+                                  match=match)
         err_handler.check_program_status(config_options, mpi_config)
     else:
         create_link("WRF-ARW", input_forcings.file_in2, input_forcings.tmpFile, config_options, mpi_config)
@@ -1890,7 +1876,8 @@ def regrid_hourly_wrf_arw(input_forcings, config_options, wrf_hydro_geo_meta, mp
             if mpi_config.rank == 0:
                 config_options.statusMsg = "Calculating WRF-ARW regridding weights...."
                 err_handler.log_msg(config_options, mpi_config)
-            calculate_weights(id_tmp, force_count, input_forcings, config_options, mpi_config)
+            calculate_weights(id_tmp, force_count, input_forcings, config_options, mpi_config,
+                              wrf_hydro_geo_meta=wrf_hydro_geo_meta)
             err_handler.check_program_status(config_options, mpi_config)
 
             # Read in the RAP height field, which is used for downscaling purposes.
@@ -1936,8 +1923,8 @@ def regrid_hourly_wrf_arw(input_forcings, config_options, wrf_hydro_geo_meta, mp
 
             # Set any pixel cells outside the input domain to the global missing value.
             try:
-                input_forcings.esmf_field_out.data[np.where(input_forcings.regridded_mask == 0)] = \
-                    config_options.globalNdv
+                ndv_mask.set_missing(input_forcings.esmf_field_out.data, input_forcings.outside_mask,
+                                     config_options.globalNdv)
             except (ValueError, ArithmeticError) as npe:
                 config_options.errMsg = "Unable to compute mask on WRF-ARW elevation data: " + str(npe)
                 err_handler.log_critical(config_options, mpi_config)
@@ -1968,6 +1955,10 @@ def regrid_hourly_wrf_arw(input_forcings, config_options, wrf_hydro_geo_meta, mp
 
         err_handler.check_program_status(config_options, mpi_config)
 
+        if config_options.regrid_multi_var == 1:
+            # All variables are regridded together below once the weights are in place.
+            continue
+
         # Regrid the input variables.
         var_tmp = None
         if mpi_config.rank == 0:
@@ -2002,8 +1993,8 @@ def regrid_hourly_wrf_arw(input_forcings, config_options, wrf_hydro_geo_meta, mp
 
         # Set any pixel cells outside the input domain to the global missing value.
         try:
-            input_forcings.esmf_field_out.data[np.where(input_forcings.regridded_mask == 0)] = \
-                config_options.globalNdv
+            ndv_mask.set_missing(input_forcings.esmf_field_out.data, input_forcings.outside_mask,
+                                 config_options.globalNdv)
         except (ValueError, ArithmeticError) as npe:
             config_options.errMsg = "Unable to calculate mask from input WRF-ARW regridded forcings: " + str(npe)
             err_handler.log_critical(config_options, mpi_config)
@@ -2035,6 +2026,11 @@ def regrid_hourly_wrf_arw(input_forcings, config_options, wrf_hydro_geo_meta, mp
                 input_forcings.regridded_forcings2[input_forcings.input_map_output[force_count], :, :]
         err_handler.check_program_status(config_options, mpi_config)
 
+    if config_options.regrid_multi_var == 1:
+        regrid_stacked_inputs(id_tmp, input_forcings, config_options, wrf_hydro_geo_meta, mpi_config,
+                              var_scale={'APCP': 1.0 / 3600.0})
+        err_handler.check_program_status(config_options, mpi_config)
+
     # Close the temporary NetCDF file and remove it.
     if mpi_config.rank == 0:
         try:
@@ -2042,11 +2038,13 @@ def regrid_hourly_wrf_arw(input_forcings, config_options, wrf_hydro_geo_meta, mp
         except OSError:
             config_options.errMsg = "Unable to close NetCDF file: " + input_forcings.tmpFile
             err_handler.log_critical(config_options, mpi_config)
-        try:
-            os.remove(input_forcings.tmpFile)
-        except OSError:
-            config_options.errMsg = "Unable to remove NetCDF file: " + input_forcings.tmpFile
-            err_handler.log_critical(config_options, mpi_config)
+        # The in-process GRIB2 reader does not write a temporary file.
+        if os.path.isfile(input_forcings.tmpFile):
+            try:
+                os.remove(input_forcings.tmpFile)
+            except OSError:
+                config_options.errMsg = "Unable to remove NetCDF file: " + input_forcings.tmpFile
+                err_handler.log_critical(config_options, mpi_config)
     err_handler.check_program_status(config_options, mpi_config)
 
 
@@ -2101,13 +2099,13 @@ def regrid_hourly_wrf_arw_hi_res_pcp(supplemental_precip, config_options, wrf_hy
         # errMod.check_program_status(ConfigOptions, MpiConfig)
 
         # Create a temporary NetCDF file from the GRIB2 file.
-        cmd = "$WGRIB2 " + supplemental_precip.file_in1 + " -match \":(" + \
-              "APCP):(surface):(" + str(supplemental_precip.fcst_hour1 - 1) + \
-              "-" + str(supplemental_precip.fcst_hour1) + " hour acc fcst):\"" + \
+        match = ":(APCP):(surface):(" + str(supplemental_precip.fcst_hour1 - 1) + \
+                "-" + str(supplemental_precip.fcst_hour1) + " hour acc fcst):"
+        cmd = "$WGRIB2 " + supplemental_precip.file_in1 + " -match \"" + match + "\"" + \
               " -netcdf " + arw_tmp_nc
 
         id_tmp = ioMod.open_grib2(supplemental_precip.file_in1, arw_tmp_nc, cmd,
-                                  config_options, mpi_config, "APCP_surface")
+                                  config_options, mpi_config, "APCP_surface", match=match)
         err_handler.check_program_status(config_options, mpi_config)
     else:
         create_link("ARW-PCP", supplemental_precip.file_in1, arw_tmp_nc, config_options, mpi_config)
@@ -2122,7 +2120,8 @@ def regrid_hourly_wrf_arw_hi_res_pcp(supplemental_precip, config_options, wrf_hy
         if mpi_config.rank == 0:
             config_options.statusMsg = "Calculating WRF ARW regridding weights."
             err_handler.log_msg(config_options, mpi_config)
-        calculate_supp_pcp_weights(supplemental_precip, id_tmp, arw_tmp_nc, config_options, mpi_config)
+        calculate_supp_pcp_weights(supplemental_precip, id_tmp, arw_tmp_nc, config_options, mpi_config,
+                                   wrf_hydro_geo_meta=wrf_hydro_geo_meta)
         err_handler.check_program_status(config_options, mpi_config)
 
     # Regrid the input variables.
@@ -2159,8 +2158,8 @@ def regrid_hourly_wrf_arw_hi_res_pcp(supplemental_precip, config_options, wrf_hy
 
     # Set any pixel cells outside the input domain to the global missing value.
     try:
-        supplemental_precip.esmf_field_out.data[np.where(supplemental_precip.regridded_mask == 0)] = \
-            config_options.globalNdv
+        ndv_mask.set_missing(supplemental_precip.esmf_field_out.data, supplemental_precip.outside_mask,
+                             config_options.globalNdv)
     except (ValueError, ArithmeticError) as npe:
         config_options.errMsg = "Unable to run mask search on WRF ARW supplemental precipitation: " + str(npe)
         err_handler.log_critical(config_options, mpi_config)
@@ -2193,11 +2192,12 @@ def regrid_hourly_wrf_arw_hi_res_pcp(supplemental_precip, config_options, wrf_hy
         except OSError:
             config_options.errMsg = "Unable to close NetCDF file: " + arw_tmp_nc
             err_handler.log_critical(config_options, mpi_config)
-        try:
-            os.remove(arw_tmp_nc)
-        except OSError:
-            config_options.errMsg = "Unable to remove NetCDF file: " + arw_tmp_nc
-            err_handler.log_critical(config_options, mpi_config)
+        if os.path.isfile(arw_tmp_nc):
+            try:
+                os.remove(arw_tmp_nc)
+            except OSError:
+                config_options.errMsg = "Unable to remove NetCDF file: " + arw_tmp_nc
+                err_handler.log_critical(config_options, mpi_config)
     err_handler.check_program_status(config_options, mpi_config)
 
 
@@ -2233,7 +2233,8 @@ def regrid_sbcv2_liquid_water_fraction(supplemental_forcings, config_options, wr
             config_options.statusMsg = "Calculating SBCv2 Liquid Water Fraction regridding weights."
             err_handler.log_msg(config_options, mpi_config)
         calculate_supp_pcp_weights(supplemental_forcings, id_tmp, supplemental_forcings.file_in1,
-                                   config_options, mpi_config, lat_var="Lat", lon_var="Lon")
+                                   config_options, mpi_config, lat_var="Lat", lon_var="Lon",
+                                   wrf_hydro_geo_meta=wrf_hydro_geo_meta)
         err_handler.check_program_status(config_options, mpi_config)
 
     # Regrid the input variable
@@ -2270,7 +2271,7 @@ def regrid_sbcv2_liquid_water_fraction(supplemental_forcings, config_options, wr
 
     # Set any missing data or pixel cells outside the input domain to a default of 100%
     try:
-        supplemental_forcings.esmf_field_out.data[np.where(supplemental_forcings.regridded_mask == 0)] = 1.0
+        ndv_mask.set_missing(supplemental_forcings.esmf_field_out.data, supplemental_forcings.outside_mask, 1.0)
         supplemental_forcings.esmf_field_out.data[np.where(supplemental_forcings.esmf_field_out.data < 0)] = 1.0
     except (ValueError, ArithmeticError) as npe:
         config_options.errMsg = "Unable to run mask search on SBCv2 Liquid Water Fraction: " + str(npe)
@@ -2297,6 +2298,276 @@ def regrid_sbcv2_liquid_water_fraction(supplemental_forcings, config_options, wr
     err_handler.check_program_status(config_options, mpi_config)
 
 
+def regrid_stacked_inputs(id_tmp, input_forcings, config_options, wrf_hydro_geo_meta, mpi_config,
+                          var_scale=None):
+    """
+    Function to regrid all input variables of a product with a single call.
+    The variables are stacked along an ungridded dimension, so the sparse matrix
+    multiply and the mask pass are only applied once per file.
+    :param id_tmp:
+    :param input_forcings:
+    :param config_options:
+    :param wrf_hydro_geo_meta:
+    :param mpi_config:
+    :param var_scale: Optional dictionary of GRIB variable names to scale factors applied prior to regridding.
+    :return:
+    """
+    if config_options.regrid_engine == sparse_regrid.SPARSE_ENGINE or \
+            isinstance(input_forcings.regridObj, sparse_regrid.SparseRegridObj):
+        data_out = _regrid_stacked_sparse(id_tmp, input_forcings, config_options, wrf_hydro_geo_meta,
+                                          mpi_config, var_scale)
+    else:
+        data_out = _regrid_stacked_esmf(id_tmp, input_forcings, config_options, wrf_hydro_geo_meta,
+                                        mpi_config, var_scale)
+    err_handler.check_program_status(config_options, mpi_config)
+
+    # Set any pixel cells outside the input domain to the global missing value.
+    try:
+        ndv_mask.set_missing(data_out, input_forcings.outside_mask, config_options.globalNdv)
+    except (ValueError, ArithmeticError) as npe:
+        config_options.errMsg = "Unable to perform mask test on stacked " + input_forcings.productName + \
+                                " forcings: " + str(npe)
+        err_handler.log_critical(config_options, mpi_config)
+    err_handler.check_program_status(config_options, mpi_config)
+
+    try:
+        input_forcings.regridded_forcings2[input_forcings.input_map_output, :, :] = data_out
+    except (ValueError, KeyError, AttributeError, IndexError) as err:
+        config_options.errMsg = "Unable to extract stacked " + input_forcings.productName + \
+                                " forcing data from the regridded stack: " + str(err)
+        err_handler.log_critical(config_options, mpi_config)
+    err_handler.check_program_status(config_options, mpi_config)
+
+    # If we are on the first timestep, set the previous regridded field to be
+    # the latest as there are no states for time 0.
+    if config_options.current_output_step == 1:
+        input_forcings.regridded_forcings1[input_forcings.input_map_output, :, :] = \
+            input_forcings.regridded_forcings2[input_forcings.input_map_output, :, :]
+
+
+def _place_stacked_input(data_in, index, var_sub_tmp, input_forcings, config_options, mpi_config):
+    """
+    Function to place local input data into the stacked ESMF source field.
+    :param data_in:
+    :param index: Variable index (or slice) of the stack to fill.
+    :param var_sub_tmp:
+    :param input_forcings:
+    :param config_options:
+    :param mpi_config:
+    :return:
+    """
+    try:
+        data_in[index, :, :] = var_sub_tmp
+    except (ValueError, KeyError, AttributeError, TypeError) as err:
+        config_options.errMsg = "Unable to place input " + input_forcings.productName + \
+                                " data into stacked ESMF field: " + str(err)
+        err_handler.log_critical(config_options, mpi_config)
+    err_handler.check_program_status(config_options, mpi_config)
+
+
+def _regrid_stacked_esmf(id_tmp, input_forcings, config_options, wrf_hydro_geo_meta, mpi_config, var_scale):
+    """
+    Function to regrid stacked input variables through an ESMF field with an
+    ungridded dimension, re-using the existing ESMF regridding object.
+    :param id_tmp:
+    :param input_forcings:
+    :param config_options:
+    :param wrf_hydro_geo_meta:
+    :param mpi_config:
+    :param var_scale:
+    :return:
+    """
+    n_vars = len(input_forcings.grib_vars)
+
+    # Create the stacked ESMF fields if they don't exist yet, or the input grid has changed.
+    if input_forcings.esmf_field_in_stack is None or input_forcings.esmf_field_out_stack is None:
+        try:
+            input_forcings.esmf_field_in_stack = ESMF.Field(input_forcings.esmf_grid_in,
+                                                            name=input_forcings.productName + "_NATIVE_STACK",
+                                                            ndbounds=[n_vars])
+            input_forcings.esmf_field_out_stack = ESMF.Field(wrf_hydro_geo_meta.esmf_grid,
+                                                             name=input_forcings.productName +
+                                                             "FORCING_REGRIDDED_STACK",
+                                                             ndbounds=[n_vars])
+        except ESMF.ESMPyException as esmf_error:
+            config_options.errMsg = "Unable to create stacked " + input_forcings.productName + \
+                                    " ESMF field objects: " + str(esmf_error)
+            err_handler.log_critical(config_options, mpi_config)
+    err_handler.check_program_status(config_options, mpi_config)
+
+    data_in = _stacked_view(input_forcings.esmf_field_in_stack.data, input_forcings.esmf_field_in.data.shape)
+
+    # With parallel reads, every processor reads its own hyperslab of the source grid. GRIB2
+    # fields decoded in-process only live in memory on rank 0, so they are always scattered.
+    parallel_reads = config_options.parallel_reads == 1 and \
+        (input_forcings.fileType == NETCDF or config_options.grib2_reader == 0)
+    if parallel_reads:
+        id_tmp = ioMod.open_netcdf_all_procs(input_forcings.tmpFile, id_tmp, config_options, mpi_config)
+
+    if parallel_reads:
+        for force_count, grib_var in enumerate(input_forcings.grib_vars):
+            var_sub_tmp = ioMod.read_local_slab(id_tmp, input_forcings.netcdf_var_names[force_count],
+                                                input_forcings, config_options, mpi_config)
+            if var_sub_tmp is not None and var_scale is not None and grib_var in var_scale:
+                var_sub_tmp = var_sub_tmp * var_scale[grib_var]
+            err_handler.check_program_status(config_options, mpi_config)
+            _place_stacked_input(data_in, force_count, var_sub_tmp, input_forcings, config_options, mpi_config)
+    else:
+        # Read all the variables on rank 0, and scatter the whole stack in a single collective.
+        var_global = None
+        if mpi_config.rank == 0:
+            var_global = np.empty([n_vars, input_forcings.ny_global, input_forcings.nx_global], np.float64)
+        for force_count, grib_var in enumerate(input_forcings.grib_vars):
+            var_tmp = _read_stacked_input(id_tmp, force_count, grib_var, input_forcings, config_options,
+                                          mpi_config, var_scale)
+            if mpi_config.rank == 0:
+                var_global[force_count, :, :] = np.ma.getdata(var_tmp)
+        var_sub_tmp = mpi_config.scatter_stack(input_forcings, var_global, n_vars, config_options)
+        err_handler.check_program_status(config_options, mpi_config)
+        _place_stacked_input(data_in, slice(None), var_sub_tmp, input_forcings, config_options, mpi_config)
+        del var_global
+
+    if parallel_reads:
+        ioMod.close_netcdf_all_procs(id_tmp, config_options, mpi_config)
+
+    if mpi_config.rank == 0:
+        config_options.statusMsg = "Regridding {} stacked {} input fields.".format(n_vars,
+                                                                                    input_forcings.productName)
+        err_handler.log_msg(config_options, mpi_config)
+    try:
+        input_forcings.esmf_field_out_stack = input_forcings.regridObj(input_forcings.esmf_field_in_stack,
+                                                                       input_forcings.esmf_field_out_stack)
+    except ValueError as ve:
+        config_options.errMsg = "Unable to regrid stacked " + input_forcings.productName + \
+                                " forcing data: " + str(ve)
+        err_handler.log_critical(config_options, mpi_config)
+    err_handler.check_program_status(config_options, mpi_config)
+
+    data_out = _stacked_view(input_forcings.esmf_field_out_stack.data, input_forcings.regridded_mask.shape)
+
+    return data_out
+
+
+def _regrid_stacked_sparse(id_tmp, input_forcings, config_options, wrf_hydro_geo_meta, mpi_config, var_scale):
+    """
+    Function to regrid stacked input variables with the sparse-matrix engine,
+    applying the cached ESMF weight file without going through ESMF fields.
+    :param id_tmp:
+    :param input_forcings:
+    :param config_options:
+    :param wrf_hydro_geo_meta:
+    :param mpi_config:
+    :param var_scale:
+    :return:
+    """
+    n_vars = len(input_forcings.grib_vars)
+
+    # Build the local weight matrix if the weights have been (re)calculated.
+    if input_forcings.sparse_regridder is None:
+        if mpi_config.rank == 0:
+            config_options.statusMsg = "Loading sparse regridding weights for " + input_forcings.productName + \
+                                       " from " + str(input_forcings.weight_file)
+            err_handler.log_msg(config_options, mpi_config)
+        input_forcings.sparse_regridder = sparse_regrid.SparseRegridder()
+        input_forcings.sparse_regridder.initialize(input_forcings.weight_file, wrf_hydro_geo_meta,
+                                                   config_options, mpi_config)
+        err_handler.check_program_status(config_options, mpi_config)
+
+    var_global = None
+    if mpi_config.rank == 0:
+        var_global = np.empty([n_vars, input_forcings.ny_global, input_forcings.nx_global], np.float64)
+    for force_count, grib_var in enumerate(input_forcings.grib_vars):
+        var_tmp = _read_stacked_input(id_tmp, force_count, grib_var, input_forcings, config_options, mpi_config,
+                                      var_scale)
+        if mpi_config.rank == 0:
+            var_global[force_count, :, :] = np.ma.getdata(var_tmp)
+
+    if mpi_config.rank == 0:
+        config_options.statusMsg = "Regridding {} stacked {} input fields with the sparse engine.".format(
+            n_vars, input_forcings.productName)
+        err_handler.log_msg(config_options, mpi_config)
+
+    return input_forcings.sparse_regridder.regrid(var_global, n_vars, mpi_config)
+
+
+def _read_stacked_input(id_tmp, force_count, grib_var, input_forcings, config_options, mpi_config, var_scale):
+    """
+    Function to read one global input variable on rank 0 for stacked regridding.
+    :param id_tmp:
+    :param force_count:
+    :param grib_var:
+    :param input_forcings:
+    :param config_options:
+    :param mpi_config:
+    :param var_scale:
+    :return:
+    """
+    var_tmp = None
+    if mpi_config.rank == 0:
+        config_options.statusMsg = "Processing input " + input_forcings.productName + " variable: " + \
+                                   input_forcings.netcdf_var_names[force_count]
+        err_handler.log_msg(config_options, mpi_config)
+        try:
+            var_tmp = source_window.read_field(id_tmp.variables[input_forcings.netcdf_var_names[force_count]],
+                                               input_forcings.src_window)
+            if var_scale is not None and grib_var in var_scale:
+                var_tmp *= var_scale[grib_var]
+        except (ValueError, KeyError, AttributeError) as err:
+            config_options.errMsg = "Unable to extract: " + input_forcings.netcdf_var_names[force_count] + \
+                                    " from: " + input_forcings.tmpFile + " (" + str(err) + ")"
+            err_handler.log_critical(config_options, mpi_config)
+    err_handler.check_program_status(config_options, mpi_config)
+
+    return var_tmp
+
+
+def _stacked_view(data, grid_shape):
+    """
+    Return a view of stacked ESMF field data with the ungridded (variable)
+    dimension first, regardless of where ESMPy places it.
+    :param data:
+    :param grid_shape:
+    :return:
+    """
+    if tuple(data.shape[1:]) == tuple(grid_shape):
+        return data
+    return np.moveaxis(data, -1, 0)
+
+
+def grib2_match(input_forcings):
+    """
+    Function to compose the wgrib2 -match expression selecting the GRIB2 fields
+    needed from the next input file (file_in2) of a forcing product. This is
+    shared by the regridding routines and the input prefetcher so both agree
+    on what gets decoded.
+    :param input_forcings:
+    :return:
+    """
+    fields = []
+    for force_count, grib_var in enumerate(input_forcings.grib_vars):
+        if input_forcings.keyValue in [3, 9] and grib_var == "PRATE":
+            # By far the most complicated of output variables. We need to calculate
+            # our 'average' PRATE based on our current hour.
+            if input_forcings.fcst_hour2 <= 240:
+                tmp_hr_current = input_forcings.fcst_hour2
+
+                diff_tmp = tmp_hr_current % 6 if tmp_hr_current % 6 > 0 else 6
+                tmp_hr_previous = tmp_hr_current - diff_tmp
+            else:
+                tmp_hr_previous = input_forcings.fcst_hour1
+            time_str = str(tmp_hr_previous) + '-' + str(input_forcings.fcst_hour2) + " hour ave fcst"
+        elif input_forcings.keyValue in [1, 5, 6, 8, 18] and grib_var == 'APCP':
+            time_str = "{}-{} hour acc fcst".format(input_forcings.fcst_hour1, input_forcings.fcst_hour2)
+        else:
+            time_str = str(input_forcings.fcst_hour2) + " hour fcst"
+        fields.append(':' + grib_var + ':' +
+                      input_forcings.grib_levels[force_count] + ':'
+                      + time_str + ":")
+    fields.append(":(HGT):(surface):")
+
+    return '(' + '|'.join(fields) + ')'
+
+
 def check_regrid_status(id_tmp, force_count, input_forcings, config_options, wrf_hydro_geo_meta, mpi_config):
     """
     Function for checking to see if regridding weights need to be
@@ -2327,9 +2598,9 @@ def check_regrid_status(id_tmp, force_count, input_forcings, config_options, wrf
     calc_regrid_flag = False
     # mpi_config.comm.barrier()
 
-    if input_forcings.nx_global is None or input_forcings.ny_global is None:
-        # This is the first timestep.
-        # Create out regridded numpy arrays to hold the regridded data.
+    if input_forcings.regridded_forcings1 is None or input_forcings.regridded_forcings2 is None:
+        # This is the first timestep (or the first regridded one, the earlier ones coming from the
+        # regridded field cache). Create out regridded numpy arrays to hold the regridded data.
         input_forcings.regridded_forcings1 = np.empty([8, wrf_hydro_geo_meta.ny_local, wrf_hydro_geo_meta.nx_local],
                                                       np.float32)
         input_forcings.regridded_forcings2 = np.empty([8, wrf_hydro_geo_meta.ny_local, wrf_hydro_geo_meta.nx_local],
@@ -2341,10 +2612,15 @@ def check_regrid_status(id_tmp, force_count, input_forcings, config_options, wrf
             calc_regrid_flag = True
         else:
             if mpi_config.rank == 0:
+                # A cropped source grid is compared by the shape of the full grid it was cropped from.
+                if input_forcings.src_window is None:
+                    ny_source, nx_source = input_forcings.ny_global, input_forcings.nx_global
+                else:
+                    ny_source, nx_source = input_forcings.src_window.ny_full, input_forcings.src_window.nx_full
                 if id_tmp.variables[input_forcings.netcdf_var_names[force_count]].shape[1] \
-                        != input_forcings.ny_global and \
+                        != ny_source and \
                         id_tmp.variables[input_forcings.netcdf_var_names[force_count]].shape[2] \
-                        != input_forcings.nx_global:
+                        != nx_source:
                     calc_regrid_flag = True
     # mpi_config.comm.barrier()
 
@@ -2384,9 +2660,9 @@ def check_supp_pcp_regrid_status(id_tmp, supplemental_precip, config_options, wr
 
     # mpi_config.comm.barrier()
 
-    if supplemental_precip.nx_global is None or supplemental_precip.ny_global is None:
-        # This is the first timestep.
-        # Create out regridded numpy arrays to hold the regridded data.
+    if supplemental_precip.regridded_precip1 is None or supplemental_precip.regridded_precip2 is None:
+        # This is the first timestep (or the first regridded one, the earlier ones coming from the
+        # regridded field cache). Create out regridded numpy arrays to hold the regridded data.
         supplemental_precip.regridded_precip1 = np.empty([wrf_hydro_geo_meta.ny_local, wrf_hydro_geo_meta.nx_local],
                                                          np.float32)
         supplemental_precip.regridded_precip2 = np.empty([wrf_hydro_geo_meta.ny_local, wrf_hydro_geo_meta.nx_local],
@@ -2430,12 +2706,290 @@ def check_supp_pcp_regrid_status(id_tmp, supplemental_precip, config_options, wr
     # Broadcast the flag to the other processors.
     calc_regrid_flag = mpi_config.broadcast_parameter(calc_regrid_flag, config_options, param_type=bool)
 
-    mpi_config.comm.barrier()
     return calc_regrid_flag
 
 
+def regrid_weight_digest(src_lat, src_lon, src_mask, dest_digest, border, regrid_method):
+    """
+    Function to compute a content hash that identifies a regridding problem. The
+    hash covers the global source coordinates and mask, the destination grid, the
+    border trimming and the regridding method, so cached weights are only reused
+    for an identical configuration. Only called on rank 0 where global arrays are held.
+    :param src_lat:
+    :param src_lon:
+    :param src_mask:
+    :param dest_digest:
+    :param border:
+    :param regrid_method:
+    :return:
+    """
+    key_hash = hashlib.sha1()
+    for array in (src_lat, src_lon, src_mask):
+        array = np.ascontiguousarray(np.ma.getdata(array))
+        key_hash.update("{}{}".format(array.dtype.str, array.shape).encode())
+        key_hash.update(array.data)
+    key_hash.update("{}|{}|{}".format(dest_digest, border, regrid_method).encode())
+
+    return key_hash.hexdigest()
+
+
+def locate_weight_file(product_name, weight_digest, config_options, mpi_config):
+    """
+    Function to locate an ESMF weight file in the weight cache directory. Rank 0
+    decides the file names and whether a cached file exists, and broadcasts the
+    result so all processors make the same decision.
+    :param product_name:
+    :param weight_digest:
+    :param config_options:
+    :param mpi_config:
+    :return: Tuple of the cached weight file, the temporary file to write new weights to,
+             and a flag indicating whether the cached weight file exists.
+    """
+    weight_info = (None, None, False)
+    if mpi_config.rank == 0 and config_options.weightsDir is not None and weight_digest is not None:
+        weight_file = os.path.join(config_options.weightsDir,
+                                   "ESMF_weight_{}_{}.nc4".format(product_name, weight_digest))
+        # New weights are written to a process-unique file and renamed into
+        # place, so concurrent jobs never see a partially written weight file.
+        tmp_weight_file = weight_file + ".{}.tmp".format(os.getpid())
+        weight_info = (weight_file, tmp_weight_file, os.path.isfile(weight_file))
+
+    return mpi_config.comm.bcast(weight_info, root=0)
+
+
+def publish_weight_file(tmp_weight_file, weight_file, config_options, mpi_config):
+    """
+    Function to atomically move a newly generated ESMF weight file into the weight cache.
+    Failing to populate the cache is not fatal, so only a warning is issued.
+    :param tmp_weight_file:
+    :param weight_file:
+    :param config_options:
+    :param mpi_config:
+    :return:
+    """
+    if weight_file is None:
+        return
+
+    # Make sure all processors are done writing the weights before the file is moved.
+    mpi_config.comm.barrier()
+    if mpi_config.rank == 0:
+        try:
+            os.replace(tmp_weight_file, weight_file)
+        except OSError as err:
+            config_options.statusMsg = "Unable to place ESMF weight file: " + tmp_weight_file + \
+                                       " into the weight cache: " + str(err)
+            err_handler.log_warning(config_options, mpi_config)
+
+
+def source_ranks(ny_global, mpi_config):
+    """
+    Function to return the number of processors a source grid can be split over.
+    Grids are decomposed in full-width row slabs, and ESMF needs at least two rows
+    on each processor.
+    :param ny_global:
+    :param mpi_config:
+    :return:
+    """
+    return min(mpi_config.size, ny_global // 2)
+
+
+def read_source_coords(id_tmp, lat_var, lon_var, forcing_obj, mpi_config):
+    """
+    Function to read the global 2D latitude and longitude grids of a source
+    product on rank 0, expanding 1D coordinates where necessary. Cropped
+    source grids are returned cropped to their window.
+    :param id_tmp:
+    :param lat_var:
+    :param lon_var:
+    :param forcing_obj:
+    :param mpi_config:
+    :return:
+    """
+    lat_tmp = None
+    lon_tmp = None
+    if mpi_config.rank == 0:
+        # Process lat/lon values from the GFS grid.
+        if len(id_tmp.variables[lat_var].shape) == 3:
+            # We have 2D grids already in place.
+            lat_tmp = id_tmp.variables[lat_var][0, :, :]
+            lon_tmp = id_tmp.variables[lon_var][0, :, :]
+        elif len(id_tmp.variables[lon_var].shape) == 2:
+            # We have 2D grids already in place.
+            lat_tmp = id_tmp.variables[lat_var][:, :]
+            lon_tmp = id_tmp.variables[lon_var][:, :]
+        elif len(id_tmp.variables[lat_var].shape) == 1:
+            # We have 1D lat/lons we need to translate into
+            # 2D grids.
+            lat_1d = id_tmp.variables[lat_var][:]
+            lon_1d = id_tmp.variables[lon_var][:]
+            lat_tmp = np.repeat(lat_1d[:, np.newaxis], lon_1d.shape[0], axis=1)
+            lon_tmp = np.tile(lon_1d, (lat_1d.shape[0], 1))
+        if forcing_obj.src_window is not None:
+            lat_tmp = forcing_obj.src_window.read(lat_tmp)
+            lon_tmp = forcing_obj.src_window.read(lon_tmp)
+    return lat_tmp, lon_tmp
+
+
+def set_source_window(id_tmp, lat_var, lon_var, input_forcings, config_options, mpi_config, wrf_hydro_geo_meta):
+    """
+    Function to crop the source grid of global and large-area products to the
+    window covering the WRF-Hydro domain, so only that window is read, scattered
+    and regridded. The source grid size is replaced by the window size.
+    :param id_tmp:
+    :param lat_var:
+    :param lon_var:
+    :param input_forcings:
+    :param config_options:
+    :param mpi_config:
+    :param wrf_hydro_geo_meta:
+    :return:
+    """
+    input_forcings.src_window = None
+    if input_forcings.keyValue not in source_window.CROPPED_FORCINGS or wrf_hydro_geo_meta is None:
+        return
+
+    bounds = source_window.domain_bounds(wrf_hydro_geo_meta, mpi_config)
+    window = None
+    if mpi_config.rank == 0:
+        lat_tmp, lon_tmp = read_source_coords(id_tmp, lat_var, lon_var, input_forcings, mpi_config)
+        window = source_window.compute_window(np.ma.getdata(lat_tmp), np.ma.getdata(lon_tmp), bounds)
+        del lat_tmp
+        del lon_tmp
+        if window is not None:
+            config_options.statusMsg = "Cropping the {} source grid ({} x {}) to the {} x {} window covering " \
+                                       "the WRF-Hydro domain.".format(input_forcings.productName,
+                                                                      window.ny_full, window.nx_full,
+                                                                      window.ny, window.nx)
+            err_handler.log_msg(config_options, mpi_config)
+    input_forcings.src_window = mpi_config.comm.bcast(window, root=0)
+
+    if input_forcings.src_window is not None:
+        input_forcings.ny_global = input_forcings.src_window.ny
+        input_forcings.nx_global = input_forcings.src_window.nx
+
+
+def border_mask(forcing_obj, border):
+    """
+    Function to build the source grid mask trimming a border of cells from each
+    edge of the source grid. The border is trimmed from the full source grid, so
+    the mask of a cropped grid only trims the edges the window shares with it.
+    :param forcing_obj:
+    :param border:
+    :return:
+    """
+    if forcing_obj.src_window is None:
+        grid_mask = np.ones([forcing_obj.ny_global, forcing_obj.nx_global])
+    else:
+        grid_mask = np.ones([forcing_obj.src_window.ny_full, forcing_obj.src_window.nx_full])
+    grid_mask[:+border, :] = 0.  # top edge
+    grid_mask[-border:, :] = 0.  # bottom edge
+    grid_mask[:, :+border] = 0.  # left edge
+    grid_mask[:, -border:] = 0.  # right edge
+    return source_window.read_field(grid_mask, forcing_obj.src_window, time_index=None)
+
+
+def calculate_subset_weights(forcing_obj, id_tmp, lat_var, lon_var, mask_tmp, border, src_mask_values,
+                             weight_tag, config_options, mpi_config, wrf_hydro_geo_meta):
+    """
+    Function to set up the regridding of a source grid that is too small to be
+    split over every processor. The source grid is held in row slabs by the first
+    processors only, its ESMF weights are generated by a sub-job sized to the grid,
+    and the weights are applied with the sparse engine on all processors. The
+    source ESMF field and regridding object are replaced by stand-ins, so the
+    regridding routines use the product as they would any other. The regridded
+    source mask is left in the destination field.
+    :param forcing_obj: Input forcing or supplemental precipitation object.
+    :param id_tmp:
+    :param lat_var:
+    :param lon_var:
+    :param mask_tmp: Global source mask of valid (1) and missing (0) values on rank 0.
+    :param border: Number of source grid cells to trim from each edge.
+    :param src_mask_values:
+    :param weight_tag: Regridding method description used in the weight cache hash.
+    :param config_options:
+    :param mpi_config:
+    :param wrf_hydro_geo_meta:
+    :return: The weight file.
+    """
+    n_ranks = source_ranks(forcing_obj.ny_global, mpi_config)
+    if n_ranks < 1 or forcing_obj.nx_global < 2:
+        config_options.errMsg = "Your input forcing grid for: " + forcing_obj.productName + " is too small " \
+                                "to process. The grid must have x/y dimension size of 2."
+        err_handler.log_critical(config_options, mpi_config)
+    err_handler.check_program_status(config_options, mpi_config)
+
+    if mpi_config.rank == 0:
+        config_options.statusMsg = "The {} source grid ({} x {}) is too small to be split over {} processors, " \
+                                   "holding it on {} processors.".format(forcing_obj.productName,
+                                                                         forcing_obj.ny_global,
+                                                                         forcing_obj.nx_global,
+                                                                         mpi_config.size, n_ranks)
+        err_handler.log_msg(config_options, mpi_config)
+
+    # Full-width row slabs on the first processors, the others hold no source data.
+    rows, extra = divmod(forcing_obj.ny_global, n_ranks)
+    if mpi_config.rank < n_ranks:
+        forcing_obj.y_lower_bound = mpi_config.rank * rows + min(mpi_config.rank, extra)
+        forcing_obj.y_upper_bound = forcing_obj.y_lower_bound + rows + (1 if mpi_config.rank < extra else 0)
+    else:
+        forcing_obj.y_lower_bound = forcing_obj.ny_global
+        forcing_obj.y_upper_bound = forcing_obj.ny_global
+    forcing_obj.x_lower_bound = 0
+    forcing_obj.x_upper_bound = forcing_obj.nx_global
+    forcing_obj.ny_local = forcing_obj.y_upper_bound - forcing_obj.y_lower_bound
+    forcing_obj.nx_local = forcing_obj.nx_global
+
+    lat_tmp, lon_tmp = read_source_coords(id_tmp, lat_var, lon_var, forcing_obj, mpi_config)
+
+    grid_mask = None
+    if mpi_config.rank == 0 and border > 0:
+        grid_mask = border_mask(forcing_obj, border)
+
+    weight_digest = None
+    if mpi_config.rank == 0 and config_options.weightsDir is not None and wrf_hydro_geo_meta is not None:
+        weight_digest = regrid_weight_digest(lat_tmp, lon_tmp, mask_tmp, wrf_hydro_geo_meta.grid_digest,
+                                             border, weight_tag)
+    weight_file, tmp_weight_file, weight_file_found = locate_weight_file(forcing_obj.productName,
+                                                                         weight_digest, config_options,
+                                                                         mpi_config)
+    if weight_file is None:
+        # Without a weight cache, the weights are kept in the scratch directory for this run.
+        weight_file = os.path.join(config_options.scratch_dir,
+                                   "ESMF_weight_{}_SUBSET.nc4".format(forcing_obj.productName))
+        tmp_weight_file = weight_file
+
+    if not weight_file_found:
+        weight_gen.generate_weights(forcing_obj.productName, lat_tmp, lon_tmp, grid_mask, src_mask_values,
+                                    tmp_weight_file, n_ranks, config_options, mpi_config)
+        err_handler.check_program_status(config_options, mpi_config)
+        if tmp_weight_file != weight_file:
+            publish_weight_file(tmp_weight_file, weight_file, config_options, mpi_config)
+    del lat_tmp
+    del lon_tmp
+
+    forcing_obj.esmf_grid_in = None
+    forcing_obj.esmf_lats = None
+    forcing_obj.esmf_lons = None
+    forcing_obj.esmf_field_in_stack = None
+    forcing_obj.esmf_field_out_stack = None
+    forcing_obj.esmf_field_in = sparse_regrid.SourceField(forcing_obj.ny_local, forcing_obj.nx_local)
+
+    forcing_obj.sparse_regridder = sparse_regrid.SparseRegridder()
+    forcing_obj.sparse_regridder.initialize(weight_file, wrf_hydro_geo_meta, config_options, mpi_config)
+    err_handler.check_program_status(config_options, mpi_config)
+    forcing_obj.sparse_regridder.initialize_exchange(forcing_obj, mpi_config)
+    forcing_obj.regridObj = sparse_regrid.SparseRegridObj(forcing_obj.sparse_regridder, mpi_config)
+
+    # Regrid the source mask, used later on in downscaling, layering, etc.
+    forcing_obj.esmf_field_in.data[:, :] = mpi_config.scatter_array(forcing_obj, mask_tmp, config_options)
+    err_handler.check_program_status(config_options, mpi_config)
+    forcing_obj.esmf_field_out = forcing_obj.regridObj(forcing_obj.esmf_field_in, forcing_obj.esmf_field_out)
+
+    return weight_file
+
+
 def calculate_weights(id_tmp, force_count, input_forcings, config_options, mpi_config,
-                      lat_var="latitude", lon_var="longitude"):
+                      lat_var="latitude", lon_var="longitude", wrf_hydro_geo_meta=None):
     """
     Function to calculate ESMF weights based on the output ESMF
     field previously calculated, along with input lat/lon grids,
@@ -2445,6 +2999,7 @@ def calculate_weights(id_tmp, force_count, input_forcings, config_options, mpi_c
     :param mpi_config:
     :param config_options:
     :param force_count:
+    :param wrf_hydro_geo_meta:
     :return:
     """
 
@@ -2473,6 +3028,27 @@ def calculate_weights(id_tmp, force_count, input_forcings, config_options, mpi_c
                                                               config_options, param_type=int)
     err_handler.check_program_status(config_options, mpi_config)
 
+    # Crop global and large-area source grids to the window covering the WRF-Hydro domain.
+    set_source_window(id_tmp, lat_var, lon_var, input_forcings, config_options, mpi_config, wrf_hydro_geo_meta)
+    err_handler.check_program_status(config_options, mpi_config)
+
+    # Source grids too small to be split over every processor are held by a subset of them.
+    if source_ranks(input_forcings.ny_global, mpi_config) < mpi_config.size:
+        mask_tmp = None
+        if mpi_config.rank == 0:
+            mask_tmp = source_window.read_field(id_tmp[input_forcings.netcdf_var_names[force_count]],
+                                                input_forcings.src_window)
+            mask_tmp.fill(1)
+            mask_tmp = mask_tmp.filled(0)
+        input_forcings.weight_file = calculate_subset_weights(input_forcings, id_tmp, lat_var, lon_var, mask_tmp,
+                                                              input_forcings.border,
+                                                              [0, config_options.globalNdv],
+                                                              "BILINEAR_MASK_0_NDV", config_options,
+                                                              mpi_config, wrf_hydro_geo_meta)
+        input_forcings.regridded_mask[:, :] = input_forcings.esmf_field_out.data[:, :]
+        ndv_mask.missing_mask(input_forcings.regridded_mask, 0, out=input_forcings.outside_mask)
+        return
+
     try:
         # noinspection PyTypeChecker
         input_forcings.esmf_grid_in = ESMF.Grid(np.array([input_forcings.ny_global, input_forcings.nx_global]),
@@ -2517,34 +3093,14 @@ def calculate_weights(id_tmp, force_count, input_forcings, config_options, mpi_c
                         border)
                 err_handler.log_msg(config_options, mpi_config)
 
-            gmask = np.ones([input_forcings.ny_global, input_forcings.nx_global])
-            gmask[:+border, :] = 0.  # top edge
-            gmask[-border:, :] = 0.  # bottom edge
-            gmask[:, :+border] = 0.  # left edge
-            gmask[:, -border:] = 0.  # right edge
+            gmask = border_mask(input_forcings, border)
 
             mask[:, :] = mpi_config.scatter_array(input_forcings, gmask, config_options)
             err_handler.check_program_status(config_options, mpi_config)
         except Exception as e:
             print(e, flush=True)
 
-    lat_tmp = None
-    lon_tmp = None
-    if mpi_config.rank == 0:
-        # Process lat/lon values from the GFS grid.
-        if len(id_tmp.variables[lat_var].shape) == 3:
-            # We have 2D grids already in place.
-            lat_tmp = id_tmp.variables[lat_var][0, :, :]
-            lon_tmp = id_tmp.variables[lon_var][0, :, :]
-        elif len(id_tmp.variables[lon_var].shape) == 2:
-            # We have 2D grids already in place.
-            lat_tmp = id_tmp.variables[lat_var][:, :]
-            lon_tmp = id_tmp.variables[lon_var][:, :]
-        elif len(id_tmp.variables[lat_var].shape) == 1:
-            # We have 1D lat/lons we need to translate into
-            # 2D grids.
-            lat_tmp = np.repeat(id_tmp.variables[lat_var][:][:, np.newaxis], input_forcings.nx_global, axis=1)
-            lon_tmp = np.tile(id_tmp.variables[lon_var][:], (input_forcings.ny_global, 1))
+    lat_tmp, lon_tmp = read_source_coords(id_tmp, lat_var, lon_var, input_forcings, mpi_config)
     err_handler.check_program_status(config_options, mpi_config)
 
     # Scatter global GFS latitude grid to processors..
@@ -2580,8 +3136,6 @@ def calculate_weights(id_tmp, force_count, input_forcings, config_options, mpi_c
     input_forcings.esmf_lons[:, :] = var_sub_lon_tmp
     del var_sub_lat_tmp
     del var_sub_lon_tmp
-    del lat_tmp
-    del lon_tmp
 
     # Create a ESMF field to hold the incoming data.
     try:
@@ -2592,15 +3146,30 @@ def calculate_weights(id_tmp, force_count, input_forcings, config_options, mpi_c
         err_handler.log_critical(config_options, mpi_config)
     err_handler.check_program_status(config_options, mpi_config)
 
+    # Any stacked fields or sparse weights were built on the previous input grid and must be re-created.
+    input_forcings.esmf_field_in_stack = None
+    input_forcings.esmf_field_out_stack = None
+    input_forcings.sparse_regridder = None
+
     # Scatter global grid to processors..
     if mpi_config.rank == 0:
-        var_tmp = id_tmp[input_forcings.netcdf_var_names[force_count]][0, :, :]
+        var_tmp = source_window.read_field(id_tmp[input_forcings.netcdf_var_names[force_count]],
+                                           input_forcings.src_window)
         # Set all valid values to 1, and all missing values to 0. This will
         # be used to generate an output mask that is used later on in downscaling, layering, etc.
         var_tmp.fill(1)
         var_tmp = var_tmp.filled(0)
     else:
         var_tmp = None
+
+    # Compute the content hash identifying this regridding problem for the weight cache.
+    weight_digest = None
+    if mpi_config.rank == 0 and config_options.weightsDir is not None and wrf_hydro_geo_meta is not None:
+        weight_digest = regrid_weight_digest(lat_tmp, lon_tmp, var_tmp, wrf_hydro_geo_meta.grid_digest,
+                                             border, "BILINEAR_MASK_0_NDV")
+    del lat_tmp
+    del lon_tmp
+
     var_sub_tmp = mpi_config.scatter_array(input_forcings, var_tmp, config_options)
     err_handler.check_program_status(config_options, mpi_config)
 
@@ -2610,35 +3179,34 @@ def calculate_weights(id_tmp, force_count, input_forcings, config_options, mpi_c
 
     # ## CALCULATE WEIGHT ## #
     # Try to find a pre-existing weight file, if available
+    input_forcings.regridObj = None
+    weight_file, tmp_weight_file, weight_file_found = locate_weight_file(input_forcings.productName,
+                                                                         weight_digest, config_options,
+                                                                         mpi_config)
+    if weight_file_found:
+        # read the data
+        try:
+            if mpi_config.rank == 0:
+                config_options.statusMsg = "Loading cached ESMF weight object for " + input_forcings.productName + \
+                                           " from " + weight_file
+                err_handler.log_msg(config_options, mpi_config)
+            err_handler.check_program_status(config_options, mpi_config)
 
-    weight_file = None
-    if config_options.weightsDir is not None:
-        grid_key = input_forcings.productName
-        weight_file = os.path.join(config_options.weightsDir, "ESMF_weight_{}_b{}.nc4".format(grid_key, border))
-        # check if file exists:
-        if os.path.exists(weight_file):
-            # read the data
-            try:
-                if mpi_config.rank == 0:
-                    config_options.statusMsg = "Loading cached ESMF weight object for " + input_forcings.productName + \
-                                               " from " + weight_file
-                    err_handler.log_msg(config_options, mpi_config)
-                err_handler.check_program_status(config_options, mpi_config)
-
-                begin = time.monotonic()
-                input_forcings.regridObj = ESMF.RegridFromFile(input_forcings.esmf_field_in,
-                                                               input_forcings.esmf_field_out,
-                                                               weight_file)
-                end = time.monotonic()
+            begin = time.monotonic()
+            input_forcings.regridObj = ESMF.RegridFromFile(input_forcings.esmf_field_in,
+                                                           input_forcings.esmf_field_out,
+                                                           weight_file)
+            end = time.monotonic()
 
-                if mpi_config.rank == 0:
-                    config_options.statusMsg = "Finished loading weight object with ESMF, took {} seconds".format(
-                        end - begin)
-                    err_handler.log_msg(config_options, mpi_config)
+            if mpi_config.rank == 0:
+                config_options.statusMsg = "Finished loading weight object with ESMF, took {} seconds".format(
+                    end - begin)
+                err_handler.log_msg(config_options, mpi_config)
 
-            except (IOError, ValueError, ESMF.ESMPyException) as esmf_error:
-                config_options.errMsg = "Unable to load cached ESMF weight file: " + str(esmf_error)
-                err_handler.log_warning(config_options, mpi_config)
+        except (IOError, ValueError, ESMF.ESMPyException) as esmf_error:
+            config_options.statusMsg = "Unable to load cached ESMF weight file: " + str(esmf_error)
+            err_handler.log_warning(config_options, mpi_config)
+            input_forcings.regridObj = None
 
     if input_forcings.regridObj is None:
         if mpi_config.rank == 0:
@@ -2652,7 +3220,7 @@ def calculate_weights(id_tmp, force_count, input_forcings, config_options, mpi_c
                                                    src_mask_values=np.array([0, config_options.globalNdv]),
                                                    regrid_method=ESMF.RegridMethod.BILINEAR,
                                                    unmapped_action=ESMF.UnmappedAction.IGNORE,
-                                                   filename=weight_file)
+                                                   filename=tmp_weight_file)
             end = time.monotonic()
 
             if mpi_config.rank == 0:
@@ -2670,25 +3238,30 @@ def calculate_weights(id_tmp, force_count, input_forcings, config_options, mpi_c
 
         err_handler.check_program_status(config_options, mpi_config)
 
-        # Run the regridding object on this test dataset. Check the output grid for
-        # any 0 values.
-        try:
-            input_forcings.esmf_field_out = input_forcings.regridObj(input_forcings.esmf_field_in,
-                                                                     input_forcings.esmf_field_out)
-        except ValueError as ve:
-            config_options.errMsg = "Unable to extract regridded data from ESMF regridded field: " + str(ve)
-            err_handler.log_critical(config_options, mpi_config)
-            # delete bad cached file if it exists
-            if weight_file is not None:
-                if os.path.exists(weight_file):
-                    os.remove(weight_file)
-        err_handler.check_program_status(config_options, mpi_config)
+        # Move the freshly written weight file into the shared cache.
+        publish_weight_file(tmp_weight_file, weight_file, config_options, mpi_config)
+
+    # Run the regridding object on this test dataset. Check the output grid for
+    # any 0 values.
+    try:
+        input_forcings.esmf_field_out = input_forcings.regridObj(input_forcings.esmf_field_in,
+                                                                 input_forcings.esmf_field_out)
+    except ValueError as ve:
+        config_options.errMsg = "Unable to extract regridded data from ESMF regridded field: " + str(ve)
+        err_handler.log_critical(config_options, mpi_config)
+        # delete bad cached file if it exists
+        if mpi_config.rank == 0 and weight_file is not None:
+            if os.path.exists(weight_file):
+                os.remove(weight_file)
+    err_handler.check_program_status(config_options, mpi_config)
 
     input_forcings.regridded_mask[:, :] = input_forcings.esmf_field_out.data[:, :]
+    ndv_mask.missing_mask(input_forcings.regridded_mask, 0, out=input_forcings.outside_mask)
+    input_forcings.weight_file = weight_file
 
 
 def calculate_supp_pcp_weights(supplemental_precip, id_tmp, tmp_file, config_options, mpi_config,
-                               lat_var="latitude", lon_var="longitude"):
+                               lat_var="latitude", lon_var="longitude", wrf_hydro_geo_meta=None):
     """
     Function to calculate ESMF weights based on the output ESMF
     field previously calculated, along with input lat/lon grids,
@@ -2698,6 +3271,7 @@ def calculate_supp_pcp_weights(supplemental_precip, id_tmp, tmp_file, config_opt
     :param supplemental_precip:
     :param mpi_config:
     :param config_options:
+    :param wrf_hydro_geo_meta:
     :return:
     """
     ndims = 0
@@ -2739,6 +3313,17 @@ def calculate_supp_pcp_weights(supplemental_precip, id_tmp, tmp_file, config_opt
                                                                    config_options, param_type=int)
     # mpi_config.comm.barrier()
 
+    # Source grids too small to be split over every processor are held by a subset of them.
+    if source_ranks(supplemental_precip.ny_global, mpi_config) < mpi_config.size:
+        mask_tmp = None
+        if mpi_config.rank == 0:
+            mask_tmp = np.ones([supplemental_precip.ny_global, supplemental_precip.nx_global])
+        calculate_subset_weights(supplemental_precip, id_tmp, lat_var, lon_var, mask_tmp, 0, [0],
+                                 "BILINEAR_MASK_0", config_options, mpi_config, wrf_hydro_geo_meta)
+        supplemental_precip.regridded_mask[:] = supplemental_precip.esmf_field_out.data[:]
+        ndv_mask.missing_mask(supplemental_precip.regridded_mask, 0, out=supplemental_precip.outside_mask)
+        return
+
     try:
         # noinspection PyTypeChecker
         supplemental_precip.esmf_grid_in = ESMF.Grid(np.array([supplemental_precip.ny_global,
@@ -2773,22 +3358,7 @@ def calculate_supp_pcp_weights(supplemental_precip, id_tmp, tmp_file, config_opt
         err_handler.log_critical(config_options, mpi_config)
     err_handler.check_program_status(config_options, mpi_config)
 
-    lat_tmp = lon_tmp = None
-    if mpi_config.rank == 0:
-        # Process lat/lon values from the GFS grid.
-        if len(id_tmp.variables[lat_var].shape) == 3:
-            # We have 2D grids already in place.
-            lat_tmp = id_tmp.variables[lat_var][0, :]
-            lon_tmp = id_tmp.variables[lon_var][0, :]
-        elif len(id_tmp.variables[lon_var].shape) == 2:
-            # We have 2D grids already in place.
-            lat_tmp = id_tmp.variables[lat_var][:]
-            lon_tmp = id_tmp.variables[lon_var][:]
-        elif len(id_tmp.variables[lat_var].shape) == 1:
-            # We have 1D lat/lons we need to translate into
-            # 2D grids.
-            lat_tmp = np.repeat(id_tmp.variables[lat_var][:][:, np.newaxis], supplemental_precip.nx_global, axis=1)
-            lon_tmp = np.tile(id_tmp.variables[lon_var][:], (supplemental_precip.ny_global, 1))
+    lat_tmp, lon_tmp = read_source_coords(id_tmp, lat_var, lon_var, supplemental_precip, mpi_config)
     # mpi_config.comm.barrier()
 
     # Scatter global GFS latitude grid to processors..
@@ -2826,8 +3396,6 @@ def calculate_supp_pcp_weights(supplemental_precip, id_tmp, tmp_file, config_opt
     supplemental_precip.esmf_lons[:, :] = var_sub_lon_tmp
     del var_sub_lat_tmp
     del var_sub_lon_tmp
-    del lat_tmp
-    del lon_tmp
 
     # Create a ESMF field to hold the incoming data.
     supplemental_precip.esmf_field_in = ESMF.Field(supplemental_precip.esmf_grid_in,
@@ -2849,21 +3417,60 @@ def calculate_supp_pcp_weights(supplemental_precip, id_tmp, tmp_file, config_opt
         var_tmp[:] = 1.0
     else:
         var_tmp = None
+
+    # Compute the content hash identifying this regridding problem for the weight cache.
+    weight_digest = None
+    if mpi_config.rank == 0 and config_options.weightsDir is not None and wrf_hydro_geo_meta is not None:
+        weight_digest = regrid_weight_digest(lat_tmp, lon_tmp, var_tmp, wrf_hydro_geo_meta.grid_digest,
+                                             0, "BILINEAR_MASK_0")
+    del lat_tmp
+    del lon_tmp
+
     var_sub_tmp = mpi_config.scatter_array(supplemental_precip, var_tmp, config_options)
-    mpi_config.comm.barrier()
 
     # Place temporary data into the field array for generating the regridding object.
     supplemental_precip.esmf_field_in.data[:] = var_sub_tmp
     # mpi_config.comm.barrier()
 
-    supplemental_precip.regridObj = ESMF.Regrid(supplemental_precip.esmf_field_in,
-                                                supplemental_precip.esmf_field_out,
-                                                src_mask_values=np.array([0]),
-                                                regrid_method=ESMF.RegridMethod.BILINEAR,
-                                                unmapped_action=ESMF.UnmappedAction.IGNORE)
+    # Try to find a pre-existing weight file, if available
+    supplemental_precip.regridObj = None
+    weight_file, tmp_weight_file, weight_file_found = locate_weight_file(supplemental_precip.productName,
+                                                                         weight_digest, config_options,
+                                                                         mpi_config)
+    if weight_file_found:
+        try:
+            if mpi_config.rank == 0:
+                config_options.statusMsg = "Loading cached ESMF weight object for " + \
+                                           supplemental_precip.productName + " from " + weight_file
+                err_handler.log_msg(config_options, mpi_config)
+            supplemental_precip.regridObj = ESMF.RegridFromFile(supplemental_precip.esmf_field_in,
+                                                                supplemental_precip.esmf_field_out,
+                                                                weight_file)
+        except (IOError, ValueError, ESMF.ESMPyException) as esmf_error:
+            config_options.statusMsg = "Unable to load cached ESMF weight file: " + str(esmf_error)
+            err_handler.log_warning(config_options, mpi_config)
+            supplemental_precip.regridObj = None
+
+    if supplemental_precip.regridObj is None:
+        try:
+            supplemental_precip.regridObj = ESMF.Regrid(supplemental_precip.esmf_field_in,
+                                                        supplemental_precip.esmf_field_out,
+                                                        src_mask_values=np.array([0]),
+                                                        regrid_method=ESMF.RegridMethod.BILINEAR,
+                                                        unmapped_action=ESMF.UnmappedAction.IGNORE,
+                                                        filename=tmp_weight_file)
+        except (RuntimeError, ImportError, ESMF.ESMPyException) as esmf_error:
+            config_options.errMsg = "Unable to generate ESMF weights for " + supplemental_precip.productName + \
+                                    ": " + str(esmf_error)
+            err_handler.log_critical(config_options, mpi_config)
+        err_handler.check_program_status(config_options, mpi_config)
+
+        # Move the freshly written weight file into the shared cache.
+        publish_weight_file(tmp_weight_file, weight_file, config_options, mpi_config)
 
     # Run the regridding object on this test dataset. Check the output grid for
     # any 0 values.
     supplemental_precip.esmf_field_out = supplemental_precip.regridObj(supplemental_precip.esmf_field_in,
                                                                        supplemental_precip.esmf_field_out)
     supplemental_precip.regridded_mask[:] = supplemental_precip.esmf_field_out.data[:]
+    ndv_mask.missing_mask(supplemental_precip.regridded_mask, 0, out=supplemental_precip.outside_mask)
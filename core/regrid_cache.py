@@ -0,0 +1,294 @@
+"""
+Persistent cache of regridded input fields. The same input files are regridded
+again by overlapping forecast cycles, AnA cycles and restarted windows, so the
+regridded fields of a product (along with its regridded height and mask) are
+kept in the scratch directory, keyed by the input file (path, size and
+modification time), the product, its regridding options, the WRF-Hydro domain
+and the number of processors. Each processor stores its own float32 slabs as
+a NumPy .npy file, memory-mapped when read back. The least recently used
+entries are evicted once the cache grows past its size limit.
+"""
+import hashlib
+import os
+
+import numpy as np
+
+from core import err_handler
+from core import ndv_mask
+
+# Input forcing products whose regridding leaves no state besides the cached fields.
+CACHED_FORCINGS = [1, 5, 6, 8, 10, 11, 12, 13, 14, 15, 16, 17, 18]
+
+# Supplemental precipitation products (MRMS) cached along with their RQI grids.
+CACHED_SUPP_PCP = [1, 2, 5, 6]
+
+# Version of the cache entries, changed whenever their layout changes.
+CACHE_VERSION = 1
+
+
+class RegridCache:
+    """
+    Class holding the location and size limit of the regridded field cache,
+    with the routines wrapping the regridding of the forcing products.
+    """
+    def __init__(self, config_options, mpi_config):
+        self.cache_dir = config_options.regrid_cache_dir
+        self.max_bytes = config_options.regrid_cache_size * 1024 * 1024
+
+        if mpi_config.rank == 0:
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+            except OSError:
+                config_options.errMsg = "Unable to create regridded field cache directory: " + self.cache_dir
+                err_handler.log_critical(config_options, mpi_config)
+        err_handler.check_program_status(config_options, mpi_config)
+        mpi_config.comm.barrier()
+
+    def regrid_forcings(self, input_forcings, regrid_func, config_options, geo_meta, mpi_config):
+        """
+        Function to regrid an input forcing product for the current output step,
+        taking the regridded fields from the cache when its input file has been
+        regridded before, and storing them in the cache otherwise.
+        :param input_forcings:
+        :param regrid_func: Regridding routine of the product.
+        :param config_options:
+        :param geo_meta:
+        :param mpi_config:
+        :return:
+        """
+        if input_forcings.keyValue not in CACHED_FORCINGS or input_forcings.regridComplete or \
+                not os.path.isfile(input_forcings.file_in2):
+            regrid_func(input_forcings, config_options, geo_meta, mpi_config)
+            return
+
+        digest = None
+        if mpi_config.rank == 0:
+            digest = entry_digest([input_forcings.productName, input_forcings.keyValue,
+                                   file_signature(input_forcings.file_in2), input_forcings.regridOpt,
+                                   input_forcings.border, input_forcings.grib_vars,
+                                   input_forcings.netcdf_var_names, input_forcings.input_map_output,
+                                   config_options.regrid_multi_var, config_options.regrid_engine,
+                                   config_options.grib2_reader, config_options.globalNdv],
+                                  geo_meta, mpi_config)
+        digest = mpi_config.comm.bcast(digest, root=0)
+
+        slab = self.load(digest, mpi_config)
+        if slab is None:
+            regrid_func(input_forcings, config_options, geo_meta, mpi_config)
+            err_handler.check_program_status(config_options, mpi_config)
+            # The regridded height trails the stack, as it is unavailable when the file has no elevation.
+            layers = [input_forcings.regridded_forcings2[input_forcings.input_map_output, :, :],
+                      input_forcings.regridded_mask[np.newaxis]]
+            if input_forcings.height is not None:
+                layers.append(input_forcings.height[np.newaxis])
+            self.store(digest, np.concatenate(layers), config_options, mpi_config)
+            return
+
+        if mpi_config.rank == 0:
+            config_options.statusMsg = "Using cached regridded " + input_forcings.productName + \
+                                       " fields for: " + input_forcings.file_in2
+            err_handler.log_msg(config_options, mpi_config)
+
+        if input_forcings.regridded_forcings1 is None or input_forcings.regridded_forcings2 is None:
+            input_forcings.regridded_forcings1 = np.empty([8, geo_meta.ny_local, geo_meta.nx_local], np.float32)
+            input_forcings.regridded_forcings2 = np.empty([8, geo_meta.ny_local, geo_meta.nx_local], np.float32)
+
+        n_fields = len(input_forcings.input_map_output)
+        input_forcings.regridded_forcings2[input_forcings.input_map_output, :, :] = slab[:n_fields]
+        input_forcings.regridded_mask[:, :] = slab[n_fields]
+        if slab.shape[0] > n_fields + 1:
+            if input_forcings.height is None:
+                input_forcings.height = np.empty([geo_meta.ny_local, geo_meta.nx_local], np.float32)
+            input_forcings.height[:, :] = slab[n_fields + 1]
+        else:
+            input_forcings.height = None
+        ndv_mask.missing_mask(input_forcings.regridded_mask, 0, out=input_forcings.outside_mask)
+
+        # If we are on the first timestep, set the previous regridded field to be
+        # the latest as there are no states for time 0.
+        if config_options.current_output_step == 1:
+            input_forcings.regridded_forcings1[input_forcings.input_map_output, :, :] = \
+                input_forcings.regridded_forcings2[input_forcings.input_map_output, :, :]
+
+    def regrid_supp_pcp(self, supplemental_precip, regrid_func, config_options, geo_meta, mpi_config):
+        """
+        Function to regrid a supplemental precipitation product for the current
+        output step, taking the regridded precipitation and RQI grids from the
+        cache when its input files have been regridded before.
+        :param supplemental_precip:
+        :param regrid_func: Regridding routine of the product.
+        :param config_options:
+        :param geo_meta:
+        :param mpi_config:
+        :return:
+        """
+        if supplemental_precip.keyValue not in CACHED_SUPP_PCP or supplemental_precip.regridComplete or \
+                not supplemental_precip.file_in1 or not supplemental_precip.file_in2 or \
+                not os.path.isfile(supplemental_precip.file_in2):
+            regrid_func(supplemental_precip, config_options, geo_meta, mpi_config)
+            return
+
+        digest = None
+        if mpi_config.rank == 0:
+            if config_options.rqiMethod == 1:
+                rqi_source = file_signature(supplemental_precip.rqi_file_in2)
+            elif config_options.rqiMethod == 2:
+                rqi_source = supplemental_precip.pcp_date2.strftime('%m')
+            else:
+                rqi_source = None
+            digest = entry_digest([supplemental_precip.productName, supplemental_precip.keyValue,
+                                   file_signature(supplemental_precip.file_in2), supplemental_precip.regridOpt,
+                                   config_options.rqiMethod, config_options.rqiThresh, rqi_source,
+                                   config_options.globalNdv],
+                                  geo_meta, mpi_config)
+        digest = mpi_config.comm.bcast(digest, root=0)
+
+        slab = self.load(digest, mpi_config)
+        if slab is None:
+            regrid_func(supplemental_precip, config_options, geo_meta, mpi_config)
+            err_handler.check_program_status(config_options, mpi_config)
+            self.store(digest, np.stack([supplemental_precip.regridded_precip2, supplemental_precip.regridded_rqi2,
+                                         supplemental_precip.regridded_mask]), config_options, mpi_config)
+            return
+
+        if mpi_config.rank == 0:
+            config_options.statusMsg = "Using cached regridded " + supplemental_precip.productName + \
+                                       " precipitation for: " + supplemental_precip.file_in2
+            err_handler.log_msg(config_options, mpi_config)
+
+        if supplemental_precip.regridded_precip1 is None or supplemental_precip.regridded_precip2 is None:
+            supplemental_precip.regridded_precip1 = np.empty([geo_meta.ny_local, geo_meta.nx_local], np.float32)
+            supplemental_precip.regridded_precip2 = np.empty([geo_meta.ny_local, geo_meta.nx_local], np.float32)
+        if supplemental_precip.regridded_rqi1 is None:
+            supplemental_precip.regridded_rqi1 = np.empty([geo_meta.ny_local, geo_meta.nx_local], np.float32)
+            supplemental_precip.regridded_rqi1[:, :] = config_options.globalNdv
+
+        supplemental_precip.regridded_precip2[:, :] = slab[0]
+        # The RQI grid may be a view of the shared monthly climatology, so it is replaced rather than filled.
+        supplemental_precip.regridded_rqi2 = np.array(slab[1], dtype=np.float32)
+        supplemental_precip.regridded_mask[:, :] = slab[2]
+        ndv_mask.missing_mask(supplemental_precip.regridded_mask, 0, out=supplemental_precip.outside_mask)
+
+        if config_options.current_output_step == 1:
+            supplemental_precip.regridded_precip1[:, :] = supplemental_precip.regridded_precip2[:, :]
+            supplemental_precip.regridded_rqi1[:, :] = supplemental_precip.regridded_rqi2[:, :]
+
+    def entry_path(self, digest, rank):
+        """
+        Function to return the path of a processor's slabs of a cache entry.
+        :param digest:
+        :param rank:
+        :return:
+        """
+        return os.path.join(self.cache_dir, digest + "." + str(rank) + ".npy")
+
+    def load(self, digest, mpi_config):
+        """
+        Function to memory-map this processor's slabs of a cache entry. An entry
+        is only used if every processor has its slabs, so all processors either
+        take the cached fields or regrid together.
+        :param digest:
+        :param mpi_config:
+        :return: The [n_fields, ny_local, nx_local] slabs, None if not cached.
+        """
+        path = self.entry_path(digest, mpi_config.rank)
+        try:
+            slab = np.load(path, mmap_mode='r')
+            # Mark the entry as recently used.
+            os.utime(path)
+        except (OSError, ValueError):
+            slab = None
+
+        if not all(mpi_config.comm.allgather(slab is not None)):
+            return None
+        return slab
+
+    def store(self, digest, slab, config_options, mpi_config):
+        """
+        Function to write this processor's slabs of a cache entry, then have
+        rank 0 evict the least recently used entries past the size limit.
+        Failing to write to the cache is not fatal.
+        :param digest:
+        :param slab:
+        :param config_options:
+        :param mpi_config:
+        :return:
+        """
+        path = self.entry_path(digest, mpi_config.rank)
+        # Processes of several cycle groups may store the same entry at once, so each writes its own file.
+        tmp_path = "{}.{}.tmp".format(path, os.getpid())
+        try:
+            with open(tmp_path, 'wb') as tmp_file:
+                np.save(tmp_file, np.asarray(slab, dtype=np.float32))
+            os.replace(tmp_path, path)
+        except OSError as err:
+            config_options.statusMsg = "Unable to write regridded field cache entry: " + path + " (" + str(err) + ")"
+            err_handler.log_warning(config_options, mpi_config)
+            if os.path.isfile(tmp_path):
+                os.remove(tmp_path)
+
+        mpi_config.comm.barrier()
+        if mpi_config.rank == 0:
+            self.evict(digest)
+
+    def evict(self, keep):
+        """
+        Function to remove the least recently used cache entries until the
+        cache fits within its size limit, never removing the entry just stored.
+        :param keep: Digest of the entry just stored.
+        :return:
+        """
+        entries = {}
+        total_bytes = 0
+        for file_name in os.listdir(self.cache_dir):
+            if not file_name.endswith(".npy"):
+                continue
+            path = os.path.join(self.cache_dir, file_name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            digest = file_name.split(".")[0]
+            last_used, paths = entries.get(digest, (0, []))
+            entries[digest] = (max(last_used, stat.st_mtime), paths + [path])
+            total_bytes += stat.st_size
+
+        for digest, (last_used, paths) in sorted(entries.items(), key=lambda entry: entry[1][0]):
+            if total_bytes <= self.max_bytes:
+                break
+            if digest == keep:
+                continue
+            for path in paths:
+                try:
+                    total_bytes -= os.path.getsize(path)
+                    os.remove(path)
+                except OSError:
+                    pass
+
+
+def file_signature(path):
+    """
+    Function to identify the contents of an input file by its path, size and
+    modification time.
+    :param path:
+    :return:
+    """
+    try:
+        stat = os.stat(path)
+    except (OSError, TypeError):
+        return [path, None, None]
+    return [os.path.abspath(path), stat.st_size, stat.st_mtime_ns]
+
+
+def entry_digest(parts, geo_meta, mpi_config):
+    """
+    Function to compute the cache key of a set of regridded fields from the
+    parts identifying the input, the WRF-Hydro domain and its decomposition.
+    :param parts:
+    :param geo_meta:
+    :param mpi_config:
+    :return:
+    """
+    key = repr([CACHE_VERSION, geo_meta.grid_digest, geo_meta.ny_global, geo_meta.nx_global, mpi_config.size] +
+               list(parts))
+    return hashlib.sha1(key.encode()).hexdigest()
@@ -0,0 +1,80 @@
+"""
+Intra-processor thread parallelism for the NumPy work on the local slabs
+(downscaling, bias correction, temporal interpolation and layering). NumPy
+releases the GIL inside its array loops, so kernels written over a block of
+rows of the local slab run concurrently when the row blocks are handed to a
+pool of threads. The threads never touch MPI, ESMF or the configuration object,
+and kernels only write to the rows they are given.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+# Minimum number of grid cells in a row block worth handing to a thread.
+MIN_BLOCK_CELLS = 16384
+
+_executor = None
+_n_threads = 1
+
+
+def initialize(n_threads):
+    """
+    Function to start the thread pool used for the row blocks. With a single
+    thread, kernels are run directly on the calling thread.
+    :param n_threads:
+    :return:
+    """
+    global _executor, _n_threads
+    shutdown()
+    _n_threads = max(1, int(n_threads))
+    if _n_threads > 1:
+        _executor = ThreadPoolExecutor(max_workers=_n_threads)
+
+
+def shutdown():
+    """
+    Function to stop the thread pool.
+    :return:
+    """
+    global _executor, _n_threads
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+    _executor = None
+    _n_threads = 1
+
+
+def map_rows(kernel, n_rows, n_cols=1):
+    """
+    Function to run a kernel over the rows of a local slab, split into one
+    block of rows per thread. The kernel is called with a slice of rows, and
+    any exception it raises is re-raised on the calling thread.
+    :param kernel: Function taking a slice of rows.
+    :param n_rows:
+    :param n_cols: Number of cells per row, used to skip threading small slabs.
+    :return:
+    """
+    n_blocks = min(_n_threads, n_rows, max(1, (n_rows * n_cols) // MIN_BLOCK_CELLS))
+    if _executor is None or n_blocks < 2:
+        kernel(slice(0, n_rows))
+        return
+
+    rows, extra = divmod(n_rows, n_blocks)
+    blocks = []
+    y_lower = 0
+    for block in range(n_blocks):
+        y_upper = y_lower + rows + (1 if block < extra else 0)
+        blocks.append(slice(y_lower, y_upper))
+        y_lower = y_upper
+
+    futures = [_executor.submit(kernel, block) for block in blocks]
+    for future in futures:
+        future.result()
+
+
+def map_grid(kernel, grid):
+    """
+    Function to run a kernel over the row blocks of a [ny, nx] or stacked
+    [..., ny, nx] grid.
+    :param kernel: Function taking a slice of rows.
+    :param grid:
+    :return:
+    """
+    map_rows(kernel, grid.shape[-2], grid.size // grid.shape[-2] if grid.shape[-2] > 0 else 1)
@@ -0,0 +1,178 @@
+"""
+Cropping of global and large-area input grids to the window covering the
+WRF-Hydro domain. A Hawaii or Puerto Rico domain covers a tiny fraction of
+the GFS or CFSv2 globe, yet the full source grid would be read, scattered and
+regridded for every field. The window is the bounding box of the source cells
+falling within the domain (plus a halo for the regridding stencil), computed
+once when the regridding weights are calculated. On periodic global grids,
+a window crossing the longitude seam wraps around it, its columns running
+from the east edge of the source grid on to the west edge.
+"""
+import numpy as np
+
+# Input forcing products whose source grids are cropped to the WRF-Hydro domain.
+CROPPED_FORCINGS = [3, 7, 9, 13, 14, 15, 16, 17]
+
+# Number of source grid cells kept around the domain for the regridding stencil.
+HALO_CELLS = 3
+
+
+class SourceWindow:
+    """
+    Class holding the window of a source grid to read, as the source rows
+    y_lower:y_upper and columns x_lower:x_upper. The upper column bound may
+    run past the source grid width, in which case the window wraps around to
+    the first columns of the grid.
+    """
+    def __init__(self, ny_full, nx_full, y_lower, y_upper, x_lower, x_upper):
+        self.ny_full = ny_full
+        self.nx_full = nx_full
+        self.y_lower = y_lower
+        self.y_upper = y_upper
+        self.x_lower = x_lower
+        self.x_upper = x_upper
+
+    @property
+    def ny(self):
+        return self.y_upper - self.y_lower
+
+    @property
+    def nx(self):
+        return self.x_upper - self.x_lower
+
+    def read(self, source, rows=slice(None), cols=slice(None), time_index=None):
+        """
+        Function to read a block of rows and columns of the window from a full
+        source grid, which may be a NetCDF variable or an array.
+        :param source:
+        :param rows: Rows of the window to read.
+        :param cols: Columns of the window to read.
+        :param time_index: Optional leading (time) index of the source variable.
+        :return:
+        """
+        index = () if time_index is None else (time_index,)
+        row_lower, row_upper, _ = rows.indices(self.ny)
+        col_lower, col_upper, _ = cols.indices(self.nx)
+        y_slice = slice(self.y_lower + row_lower, self.y_lower + row_upper)
+
+        # Read the columns in contiguous pieces, split at the longitude seam.
+        parts = []
+        col = self.x_lower + col_lower
+        col_end = self.x_lower + col_upper
+        while col < col_end:
+            x_start = col % self.nx_full
+            x_stop = min(x_start + col_end - col, self.nx_full)
+            parts.append(source[index + (y_slice, slice(x_start, x_stop))])
+            col += x_stop - x_start
+
+        if not parts:
+            return source[index + (y_slice, slice(0, 0))]
+        if len(parts) == 1:
+            return parts[0]
+        # Keep the masks of NetCDF reads.
+        return np.ma.concatenate(parts, axis=1)
+
+
+def read_field(source, window, time_index=0):
+    """
+    Function to read the 2D field of a source variable, cropped to the window
+    when one is set.
+    :param source:
+    :param window: Source window, or None to read the full grid.
+    :param time_index: Leading (time) index of the source variable, None for 2D variables or arrays.
+    :return:
+    """
+    if window is None:
+        if time_index is None:
+            return source[:, :]
+        return source[time_index, :, :]
+    return window.read(source, time_index=time_index)
+
+
+def domain_bounds(geo_meta, mpi_config):
+    """
+    Function to compute the latitude/longitude bounding box of the WRF-Hydro
+    domain from the local slabs of all processors. The longitude range is
+    described by its center and half-width, taken from whichever of the
+    [-180, 180) or [0, 360) conventions gives the narrower range, so domains
+    crossing the dateline are handled.
+    :param geo_meta:
+    :param mpi_config:
+    :return: Tuple of the minimum and maximum latitude, and the center and half-width of the longitudes.
+    """
+    lats = np.ma.getdata(geo_meta.latitude_grid)
+    lons_east = np.mod(np.ma.getdata(geo_meta.longitude_grid) + 180.0, 360.0) - 180.0
+    lons_west = np.mod(lons_east, 360.0)
+    local_bounds = [float(np.nanmin(lats)), float(np.nanmax(lats)),
+                    float(np.nanmin(lons_east)), float(np.nanmax(lons_east)),
+                    float(np.nanmin(lons_west)), float(np.nanmax(lons_west))]
+    bounds = np.array(mpi_config.comm.allgather(local_bounds))
+
+    lat_min = bounds[:, 0].min()
+    lat_max = bounds[:, 1].max()
+    lon_ranges = [(bounds[:, 2].min(), bounds[:, 3].max()), (bounds[:, 4].min(), bounds[:, 5].max())]
+    lon_min, lon_max = min(lon_ranges, key=lambda lon_range: lon_range[1] - lon_range[0])
+
+    return lat_min, lat_max, (lon_min + lon_max) / 2.0, (lon_max - lon_min) / 2.0
+
+
+def compute_window(src_lat, src_lon, bounds):
+    """
+    Function to compute the window of a source grid covering the WRF-Hydro
+    domain bounding box. The box is widened by a few source grid spacings
+    before selecting the source cells within it, and the window is padded by
+    a halo of cells.
+    :param src_lat: Global 2D source latitude grid.
+    :param src_lon: Global 2D source longitude grid.
+    :param bounds: Domain bounding box from domain_bounds.
+    :return: The source window, or None if the window would span the whole grid.
+    """
+    lat_min, lat_max, lon_center, lon_half_width = bounds
+    ny_full, nx_full = src_lat.shape
+
+    # Typical source grid spacings, in degrees.
+    dlat = float(np.nanmedian(np.abs(np.diff(src_lat, axis=0)))) if ny_full > 1 else 0.0
+    dlon = float(np.nanmedian(np.abs(wrap_longitude(np.diff(src_lon, axis=1))))) if nx_full > 1 else 0.0
+    margin = HALO_CELLS * max(dlat, dlon)
+
+    inside = (src_lat >= lat_min - margin) & (src_lat <= lat_max + margin) & \
+             (np.abs(wrap_longitude(src_lon - lon_center)) <= lon_half_width + margin)
+    rows = np.flatnonzero(inside.any(axis=1))
+    cols = np.flatnonzero(inside.any(axis=0))
+    if rows.size == 0:
+        # The domain is not within the source grid, leave the grid whole.
+        return None
+
+    y_lower = max(0, rows[0] - HALO_CELLS)
+    y_upper = min(ny_full, rows[-1] + 1 + HALO_CELLS)
+
+    # Global grids whose columns go all the way around the globe are periodic in longitude.
+    periodic = dlon > 0.0 and nx_full * dlon >= 360.0 - 0.5 * dlon
+    if periodic:
+        # Take the shortest run of columns (possibly wrapping around the seam) holding all
+        # the selected ones, which leaves out the largest gap between them.
+        gaps = np.diff(np.append(cols, cols[0] + nx_full))
+        largest = int(np.argmax(gaps))
+        x_lower = cols[(largest + 1) % cols.size]
+        n_cols = (cols[largest] - x_lower) % nx_full + 1 + 2 * HALO_CELLS
+        x_lower -= HALO_CELLS
+        if n_cols >= nx_full:
+            x_lower, n_cols = 0, nx_full
+        x_lower %= nx_full
+        x_upper = x_lower + n_cols
+    else:
+        x_lower = max(0, cols[0] - HALO_CELLS)
+        x_upper = min(nx_full, cols[-1] + 1 + HALO_CELLS)
+
+    if y_upper - y_lower == ny_full and x_upper - x_lower == nx_full:
+        return None
+    return SourceWindow(ny_full, nx_full, int(y_lower), int(y_upper), int(x_lower), int(x_upper))
+
+
+def wrap_longitude(lon):
+    """
+    Function to wrap longitudes (or longitude differences) into [-180, 180).
+    :param lon:
+    :return:
+    """
+    return np.mod(lon + 180.0, 360.0) - 180.0
@@ -0,0 +1,222 @@
+"""
+Sparse-matrix regridding engine. Applies cached ESMF weight files (factor
+lists of row, col, S) with NumPy/SciPy, keeping ESMF field objects out of
+the per-timestep regridding path.
+"""
+import numpy as np
+from netCDF4 import Dataset
+
+try:
+    from scipy import sparse
+except ImportError:
+    sparse = None
+
+from core import err_handler
+from core.parallel import MPI
+
+# Available regridding engines.
+ESMF_ENGINE = 0
+SPARSE_ENGINE = 1
+
+
+class SparseRegridder:
+    """
+    Class holding the rows of an ESMF weight matrix that belong to the local
+    WRF-Hydro slab of this processor, along with the source grid points each
+    processor needs to compute its destination slab.
+    """
+    def __init__(self):
+        self.weights = None
+        self.src_index = None
+        self.send_index = None
+        self.send_counts = None
+        self.send_offsets = None
+        self.nx_local = None
+        self.ny_local = None
+        self.exchange_order = None
+        self.exchange_recv_counts = None
+        self.exchange_send_index = None
+        self.exchange_send_counts = None
+
+    def initialize(self, weight_file, wrf_hydro_geo_meta, config_options, mpi_config):
+        """
+        Function to read an ESMF weight file and build the local CSR weight matrix.
+        ESMF sequence indices follow the Fortran ordering of the [ny, nx] grids,
+        I.E. index = y + x * ny.
+        :param weight_file:
+        :param wrf_hydro_geo_meta:
+        :param config_options:
+        :param mpi_config:
+        :return:
+        """
+        if sparse is None:
+            config_options.errMsg = "Unable to import scipy.sparse, which is required for RegridEngine = 1."
+            err_handler.log_critical(config_options, mpi_config)
+            return
+
+        try:
+            id_wgt = Dataset(weight_file, 'r')
+            rows = np.asarray(id_wgt.variables['row'][:], dtype=np.int64) - 1
+            cols = np.asarray(id_wgt.variables['col'][:], dtype=np.int64) - 1
+            factors = np.asarray(id_wgt.variables['S'][:], dtype=np.float64)
+            id_wgt.close()
+        except (IOError, OSError, KeyError, ValueError) as err:
+            config_options.errMsg = "Unable to read ESMF weight file: " + str(weight_file) + " (" + str(err) + ")"
+            err_handler.log_critical(config_options, mpi_config)
+            return
+
+        self.nx_local = wrf_hydro_geo_meta.nx_local
+        self.ny_local = wrf_hydro_geo_meta.ny_local
+
+        # Keep only the weights for destination cells owned by this processor.
+        y_dest = rows % wrf_hydro_geo_meta.ny_global
+        x_dest = rows // wrf_hydro_geo_meta.ny_global
+        ind_local = np.where((y_dest >= wrf_hydro_geo_meta.y_lower_bound) &
+                             (y_dest < wrf_hydro_geo_meta.y_upper_bound) &
+                             (x_dest >= wrf_hydro_geo_meta.x_lower_bound) &
+                             (x_dest < wrf_hydro_geo_meta.x_upper_bound))
+        local_rows = (y_dest[ind_local] - wrf_hydro_geo_meta.y_lower_bound) + \
+            (x_dest[ind_local] - wrf_hydro_geo_meta.x_lower_bound) * self.ny_local
+
+        # Compress the columns down to the source points actually referenced locally.
+        self.src_index, local_cols = np.unique(cols[ind_local], return_inverse=True)
+        self.weights = sparse.csr_matrix((factors[ind_local], (local_rows, local_cols)),
+                                         shape=(self.ny_local * self.nx_local, self.src_index.size))
+        del rows, cols, factors, y_dest, x_dest
+
+        # Rank 0 needs the source points of every processor to pack its send buffer.
+        all_index = mpi_config.comm.gather(self.src_index, root=0)
+        if mpi_config.rank == 0:
+            self.send_counts = np.array([index.size for index in all_index], dtype=np.int64)
+            self.send_offsets = np.zeros_like(self.send_counts)
+            self.send_offsets[1:] = np.cumsum(self.send_counts)[:-1]
+            self.send_index = np.concatenate(all_index)
+
+    def regrid(self, src_global, n_vars, mpi_config):
+        """
+        Function to regrid a stack of global source fields. Rank 0 sends each
+        processor only the source points it needs in a single Scatterv, after
+        which each processor applies its local weights to all variables at once.
+        :param src_global: Global source array of shape [n_vars, ny, nx] on rank 0, None elsewhere.
+        :param n_vars:
+        :param mpi_config:
+        :return: Local destination array of shape [n_vars, ny_local, nx_local].
+        """
+        if mpi_config.size == 1:
+            # A single processor needs no exchange, which is unavailable with the --serial option.
+            src_flat = np.ma.getdata(src_global).transpose(0, 2, 1).reshape(n_vars, -1)
+            recv = np.asarray(src_flat[:, self.src_index].T, dtype=np.float64)
+            dest = self.weights.dot(recv)
+            return dest.T.reshape(n_vars, self.nx_local, self.ny_local).transpose(0, 2, 1)
+
+        if mpi_config.rank == 0:
+            src_flat = np.ma.getdata(src_global).transpose(0, 2, 1).reshape(n_vars, -1)
+            send = np.ascontiguousarray(src_flat[:, self.send_index].T, dtype=np.float64)
+            sendbuf = [send, self.send_counts * n_vars, self.send_offsets * n_vars, MPI.DOUBLE]
+        else:
+            sendbuf = None
+
+        recv = np.empty([self.src_index.size, n_vars], np.float64)
+        mpi_config.comm.Scatterv(sendbuf, recv, root=0)
+
+        dest = self.weights.dot(recv)
+        return dest.T.reshape(n_vars, self.nx_local, self.ny_local).transpose(0, 2, 1)
+
+    def initialize_exchange(self, source_meta, mpi_config):
+        """
+        Function to set up the exchange of source points for source grids that are
+        distributed in full-width row slabs over a subset of the processors. Each
+        processor asks the owners of the source points it references for them, so
+        the owners know which of their local points to send to whom.
+        :param source_meta: Any object carrying the global source grid size and local bounds.
+        :param mpi_config:
+        :return:
+        """
+        bounds = np.array([source_meta.y_lower_bound, source_meta.y_upper_bound], dtype=np.int64)
+        all_bounds = np.empty([mpi_config.size, 2], dtype=np.int64)
+        mpi_config.comm.Allgather(bounds, all_bounds)
+
+        # ESMF sequence indices of the source grid are y + x * ny.
+        y_src = self.src_index % source_meta.ny_global
+        x_src = self.src_index // source_meta.ny_global
+        owners = np.searchsorted(all_bounds[:, 1], y_src, side='right')
+        local_index = (y_src - all_bounds[owners, 0]) * source_meta.nx_global + x_src
+
+        # Requests are grouped by owner, and put back in source index order once received.
+        self.exchange_order = np.argsort(owners, kind='stable')
+        self.exchange_recv_counts = np.bincount(owners, minlength=mpi_config.size).astype(np.int64)
+        if mpi_config.size == 1:
+            # A single processor owns every source point and sends them to itself.
+            self.exchange_send_counts = self.exchange_recv_counts
+            self.exchange_send_index = local_index[self.exchange_order]
+            return
+        self.exchange_send_counts = np.empty(mpi_config.size, dtype=np.int64)
+        mpi_config.comm.Alltoall(self.exchange_recv_counts, self.exchange_send_counts)
+
+        self.exchange_send_index = np.empty(self.exchange_send_counts.sum(), dtype=np.int64)
+        mpi_config.comm.Alltoallv([np.ascontiguousarray(local_index[self.exchange_order]),
+                                   self.exchange_recv_counts, offsets(self.exchange_recv_counts), MPI.INT64_T],
+                                  [self.exchange_send_index,
+                                   self.exchange_send_counts, offsets(self.exchange_send_counts), MPI.INT64_T])
+
+    def regrid_local(self, src_local, n_vars, mpi_config):
+        """
+        Function to regrid a stack of source fields distributed over the processors
+        as set up by initialize_exchange. The owners send every processor the source
+        points it needs in a single Alltoallv, after which each processor applies its
+        local weights to all variables at once.
+        :param src_local: Local source array of shape [n_vars, ny_local, nx_local].
+        :param n_vars:
+        :param mpi_config:
+        :return: Local destination array of shape [n_vars, ny_local, nx_local].
+        """
+        src_flat = np.ma.getdata(src_local).reshape(n_vars, -1)
+        send = np.ascontiguousarray(src_flat[:, self.exchange_send_index].T, dtype=np.float64)
+        if mpi_config.size == 1:
+            recv = send
+        else:
+            recv = np.empty([self.src_index.size, n_vars], np.float64)
+            mpi_config.comm.Alltoallv([send, self.exchange_send_counts * n_vars,
+                                       offsets(self.exchange_send_counts) * n_vars, MPI.DOUBLE],
+                                      [recv, self.exchange_recv_counts * n_vars,
+                                       offsets(self.exchange_recv_counts) * n_vars, MPI.DOUBLE])
+
+        values = np.empty_like(recv)
+        values[self.exchange_order] = recv
+        dest = self.weights.dot(values)
+        return dest.T.reshape(n_vars, self.nx_local, self.ny_local).transpose(0, 2, 1)
+
+
+class SourceField:
+    """
+    Minimal stand-in for the source ESMF field of a source grid that is not
+    distributed through ESMF, holding the local slab of source data.
+    """
+    def __init__(self, ny_local, nx_local):
+        self.data = np.empty([ny_local, nx_local], np.float64)
+
+
+class SparseRegridObj:
+    """
+    Callable stand-in for an ESMF regridding object, applying the weights of a
+    SparseRegridder to a SourceField and placing the result in the destination
+    ESMF field, as ESMF.Regrid does.
+    """
+    def __init__(self, regridder, mpi_config):
+        self.regridder = regridder
+        self.mpi_config = mpi_config
+
+    def __call__(self, field_in, field_out):
+        field_out.data[:, :] = self.regridder.regrid_local(field_in.data[np.newaxis, :, :], 1, self.mpi_config)[0]
+        return field_out
+
+
+def offsets(counts):
+    """
+    Function to compute the buffer offsets of a list of counts.
+    :param counts:
+    :return:
+    """
+    displs = np.zeros_like(counts)
+    displs[1:] = np.cumsum(counts)[:-1]
+    return displs
@@ -39,13 +39,17 @@ class supplemental_precip:
         self.regridComplete = False
         self.regridObj = None
         self.esmf_field_in = None
+        self.sparse_regridder = None
         self.esmf_field_out = None
         self.regridded_precip1 = None
         self.regridded_precip2 = None
         self.regridded_rqi1 = None
         self.regridded_rqi2 = None
         self.regridded_mask = None
+        self.outside_mask = None
+        self.src_window = None
         self.final_supp_precip = None
+        self.ndv_mask = None
         self.file_in1 = None
         self.file_in2 = None
         self.rqi_file_in1 = None
@@ -210,7 +214,11 @@ class supplemental_precip:
             6: regrid.regrid_mrms_hourly,
             7: regrid.regrid_sbcv2_liquid_water_fraction
         }
-        regrid_inputs[self.keyValue](self,ConfigOptions,wrfHyroGeoMeta,MpiConfig)
+        if ConfigOptions.regrid_cache is not None:
+            ConfigOptions.regrid_cache.regrid_supp_pcp(self, regrid_inputs[self.keyValue], ConfigOptions,
+                                                       wrfHyroGeoMeta, MpiConfig)
+        else:
+            regrid_inputs[self.keyValue](self,ConfigOptions,wrfHyroGeoMeta,MpiConfig)
         #try:
         #    regrid_inputs[self.keyValue](self,ConfigOptions,MpiConfig)
         #except:
@@ -269,9 +277,13 @@ def initDict(ConfigOptions,GeoMetaWrfHydro):
         # Initialize the local final grid of values
         InputDict[supp_pcp_key].final_supp_precip = np.empty([GeoMetaWrfHydro.ny_local,
                                                               GeoMetaWrfHydro.nx_local],
-                                                             np.float64)
+                                                             np.float32)
         InputDict[supp_pcp_key].regridded_mask = np.empty([GeoMetaWrfHydro.ny_local,
                                                            GeoMetaWrfHydro.nx_local], np.float32)
+        InputDict[supp_pcp_key].outside_mask = np.zeros([GeoMetaWrfHydro.ny_local,
+                                                         GeoMetaWrfHydro.nx_local], bool)
+        InputDict[supp_pcp_key].ndv_mask = np.zeros([GeoMetaWrfHydro.ny_local,
+                                                     GeoMetaWrfHydro.nx_local], bool)
 
         InputDict[supp_pcp_key].userCycleOffset = ConfigOptions.supp_input_offsets[supp_pcp_tmp]
 
@@ -4,6 +4,8 @@ Temporal interpolation input forcings to the current output timestep.
 import numpy as np
 
 from core import err_handler
+from core import ndv_mask
+from core import row_threads
 
 
 def no_interpolation(input_forcings,ConfigOptions,MpiConfig):
@@ -143,19 +145,19 @@ def weighted_average(input_forcings,ConfigOptions,MpiConfig):
     weight2 = 1-(abs(dtFromNext.total_seconds())/(input_forcings.outFreq*60.0))
 
     # Calculate where we have missing data in either the previous or next forcing dataset.
-    ind1Ndv = np.where(input_forcings.regridded_forcings1 == ConfigOptions.globalNdv)
-    ind2Ndv = np.where(input_forcings.regridded_forcings2 == ConfigOptions.globalNdv)
+    input_forcings.ndv_mask = ndv_mask.missing_mask(input_forcings.regridded_forcings1, ConfigOptions.globalNdv,
+                                                    out=input_forcings.ndv_mask)
 
-    input_forcings.final_forcings[:,:,:] = input_forcings.regridded_forcings1[:,:,:]*weight1 + \
-        input_forcings.regridded_forcings2[:,:,:]*weight2
+    def kernel(rows):
+        input_forcings.ndv_mask[:, rows, :] |= input_forcings.regridded_forcings2[:, rows, :] == \
+            ConfigOptions.globalNdv
+        final = input_forcings.final_forcings[:, rows, :]
+        np.multiply(input_forcings.regridded_forcings1[:, rows, :], weight1, out=final)
+        final += input_forcings.regridded_forcings2[:, rows, :] * weight2
+    row_threads.map_grid(kernel, input_forcings.final_forcings)
 
     # Set any pixel cells that were missing for either window to missing value.
-    input_forcings.final_forcings[ind1Ndv] = ConfigOptions.globalNdv
-    input_forcings.final_forcings[ind2Ndv] = ConfigOptions.globalNdv
-
-    # Reset for memory efficiency.
-    ind1Ndv = None
-    ind2Ndv = None
+    ndv_mask.set_missing(input_forcings.final_forcings, input_forcings.ndv_mask, ConfigOptions.globalNdv)
 
 def weighted_average_supp_pcp(supplemental_precip,ConfigOptions,MpiConfig):
     """
@@ -180,19 +182,21 @@ def weighted_average_supp_pcp(supplemental_precip,ConfigOptions,MpiConfig):
         weight2 = 1 - (abs(dtFromNext.total_seconds()) / (supplemental_precip.input_frequency * 60.0))
 
         # Calculate where we have missing data in either the previous or next forcing dataset.
-        ind1Ndv = np.where(supplemental_precip.regridded_precip1 == ConfigOptions.globalNdv)
-        ind2Ndv = np.where(supplemental_precip.regridded_precip2 == ConfigOptions.globalNdv)
+        supplemental_precip.ndv_mask = ndv_mask.missing_mask(supplemental_precip.regridded_precip1,
+                                                             ConfigOptions.globalNdv,
+                                                             out=supplemental_precip.ndv_mask)
 
-        supplemental_precip.final_supp_precip[:,:] = supplemental_precip.regridded_precip1[:,:] * weight1 + \
-                                                     supplemental_precip.regridded_precip2[:,:] * weight2
+        def kernel(rows):
+            supplemental_precip.ndv_mask[rows, :] |= supplemental_precip.regridded_precip2[rows, :] == \
+                ConfigOptions.globalNdv
+            final = supplemental_precip.final_supp_precip[rows, :]
+            np.multiply(supplemental_precip.regridded_precip1[rows, :], weight1, out=final)
+            final += supplemental_precip.regridded_precip2[rows, :] * weight2
+        row_threads.map_grid(kernel, supplemental_precip.final_supp_precip)
 
         # Set any pixel cells that were missing for either window to missing value.
-        supplemental_precip.final_supp_precip[ind1Ndv] = ConfigOptions.globalNdv
-        supplemental_precip.final_supp_precip[ind2Ndv] = ConfigOptions.globalNdv
-
-        # Reset for memory efficiency.
-        ind1Ndv = None
-        ind2Ndv = None
+        ndv_mask.set_missing(supplemental_precip.final_supp_precip, supplemental_precip.ndv_mask,
+                             ConfigOptions.globalNdv)
     else:
         # We have missing files.
         supplemental_precip.final_supp_precip[:, :] = ConfigOptions.globalNdv
@@ -0,0 +1,171 @@
+"""
+Generation of ESMF regridding weights for source grids that are too small to
+be split over every processor of the forcing engine. As ESMF decomposes its
+grids over all of MPI_COMM_WORLD, the weights are generated by a sub-job
+spawned with only as many processors as the source grid allows, and
+written to a weight file that the forcing engine applies with the sparse
+regridding engine.
+"""
+import os
+import sys
+
+import ESMF
+import numpy as np
+
+from core import config
+from core import err_handler
+from core import geoMod
+from core import parallel
+from core.parallel import MPI
+
+TAG_JOB = 1
+TAG_STATUS = 2
+
+
+class SourceGrid:
+    """
+    Abstract class holding the global size and local bounds of a source
+    grid within the weight generation sub-job.
+    """
+    def __init__(self, ny_global, nx_global):
+        self.ny_global = ny_global
+        self.nx_global = nx_global
+        self.x_lower_bound = None
+        self.x_upper_bound = None
+        self.y_lower_bound = None
+        self.y_upper_bound = None
+
+
+def generate_weights(product_name, lat_global, lon_global, grid_mask, src_mask_values, weight_file, n_procs,
+                     config_options, mpi_config):
+    """
+    Function to spawn the weight generation sub-job and wait for it to write
+    the bilinear ESMF weight file of a source grid. The global coordinates
+    (and optional source grid mask) are only needed on rank 0.
+    :param product_name:
+    :param lat_global:
+    :param lon_global:
+    :param grid_mask: Optional source grid mask, None for no masking.
+    :param src_mask_values:
+    :param weight_file:
+    :param n_procs:
+    :param config_options:
+    :param mpi_config:
+    :return:
+    """
+    root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    server_cmd = "import sys; sys.path.insert(0, {!r}); from core import weight_gen; " \
+                 "weight_gen.serve()".format(root_dir)
+    try:
+        intercomm = mpi_config.comm.Spawn(sys.executable, args=['-c', server_cmd], maxprocs=n_procs, root=0)
+    except MPI.Exception as mpi_exception:
+        config_options.errMsg = "Unable to spawn ESMF weight generation for " + product_name + \
+                                " (" + str(mpi_exception) + ")"
+        err_handler.log_critical(config_options, mpi_config)
+        return
+
+    status = None
+    if mpi_config.rank == 0:
+        config_options.statusMsg = "Generating ESMF weights for " + product_name + " on " + str(n_procs) + \
+                                   " processors"
+        err_handler.log_msg(config_options, mpi_config)
+        job = {
+            'geogrid': config_options.geogrid,
+            'parallel_reads': config_options.parallel_reads,
+            'src_mask_values': src_mask_values,
+            'weight_file': weight_file,
+            'lat': lat_global,
+            'lon': lon_global,
+            'grid_mask': grid_mask
+        }
+        intercomm.send(job, dest=0, tag=TAG_JOB)
+        status = intercomm.recv(source=0, tag=TAG_STATUS)
+    status = mpi_config.comm.bcast(status, root=0)
+    intercomm.Disconnect()
+
+    if status is not None:
+        config_options.errMsg = "Unable to generate ESMF weights for " + product_name + ": " + status
+        err_handler.log_critical(config_options, mpi_config)
+
+
+def build_weights(job, config_options, mpi_config):
+    """
+    Function run on every processor of the sub-job to create the destination
+    and source ESMF grids, and write the weight file of the regridding between them.
+    :param job:
+    :param config_options:
+    :param mpi_config:
+    :return:
+    """
+    geo_meta = geoMod.GeoMetaWrfHydro()
+    geo_meta.initialize_destination_geo(config_options, mpi_config)
+    field_out = ESMF.Field(geo_meta.esmf_grid, name="WEIGHT_GEN_DESTINATION")
+
+    shape = None
+    if mpi_config.rank == 0:
+        shape = job['lat'].shape
+    shape = mpi_config.comm.bcast(shape, root=0)
+    source = SourceGrid(shape[0], shape[1])
+
+    # noinspection PyTypeChecker
+    grid_in = ESMF.Grid(np.array([source.ny_global, source.nx_global]), staggerloc=ESMF.StaggerLoc.CENTER,
+                        coord_sys=ESMF.CoordSys.SPH_DEG)
+    source.x_lower_bound = grid_in.lower_bounds[ESMF.StaggerLoc.CENTER][1]
+    source.x_upper_bound = grid_in.upper_bounds[ESMF.StaggerLoc.CENTER][1]
+    source.y_lower_bound = grid_in.lower_bounds[ESMF.StaggerLoc.CENTER][0]
+    source.y_upper_bound = grid_in.upper_bounds[ESMF.StaggerLoc.CENTER][0]
+
+    grid_in.get_coords(1)[:, :] = mpi_config.scatter_array(source, job.get('lat'), config_options)
+    grid_in.get_coords(0)[:, :] = mpi_config.scatter_array(source, job.get('lon'), config_options)
+    if job['has_mask']:
+        mask = grid_in.add_item(ESMF.GridItem.MASK, ESMF.StaggerLoc.CENTER)
+        mask[:, :] = mpi_config.scatter_array(source, job.get('grid_mask'), config_options)
+    if config_options.errFlag:
+        raise RuntimeError(config_options.errMsg)
+
+    field_in = ESMF.Field(grid_in, name="WEIGHT_GEN_SOURCE")
+    ESMF.Regrid(field_in, field_out, src_mask_values=np.array(job['src_mask_values']),
+                regrid_method=ESMF.RegridMethod.BILINEAR, unmapped_action=ESMF.UnmappedAction.IGNORE,
+                filename=job['weight_file'])
+
+
+def serve():
+    """
+    Main program of the weight generation sub-job. Receives the source grid from
+    the forcing engine, writes the weight file, and reports back whether it succeeded.
+    :return:
+    """
+    parent = MPI.Comm.Get_parent()
+
+    job = None
+    if parent.Get_rank() == 0:
+        job = parent.recv(source=0, tag=TAG_JOB)
+
+    config_options = config.ConfigOptions(None)
+    mpi_config = parallel.MpiConfig()
+    mpi_config.initialize_comm(config_options)
+
+    # Only rank 0 holds the global source arrays, the other settings go to every processor.
+    settings = None
+    if mpi_config.rank == 0:
+        settings = {key: value for key, value in job.items() if key not in ('lat', 'lon', 'grid_mask')}
+        settings['has_mask'] = job['grid_mask'] is not None
+    settings = mpi_config.comm.bcast(settings, root=0)
+    if mpi_config.rank != 0:
+        job = settings
+    else:
+        job.update(settings)
+    config_options.geogrid = job['geogrid']
+    config_options.parallel_reads = job['parallel_reads']
+
+    status = None
+    try:
+        build_weights(job, config_options, mpi_config)
+    except Exception as err:
+        status = (config_options.errMsg or "") + " (" + str(err) + ")"
+
+    statuses = mpi_config.comm.gather(status, root=0)
+    if mpi_config.rank == 0:
+        errors = [status for status in statuses if status is not None]
+        parent.send(errors[0] if errors else None, dest=0, tag=TAG_STATUS)
+    parent.Disconnect()
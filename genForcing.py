@@ -4,10 +4,12 @@ import os
 import ESMF
 
 from core import config
+from core import cycle_groups
 from core import err_handler
 from core import forcingInputMod
 from core import forecastMod
 from core import geoMod
+from core import io_server
 from core import ioMod
 from core import parallel
 from core import suppPrecipMod
@@ -30,6 +32,9 @@ def main():
                         help='National Water Model Version Number Specification')
     parser.add_argument('nwm_config', metavar='nwm_config', type=str, nargs='?',
                         help='National Water Model Configuration')
+    parser.add_argument('--serial', action='store_true',
+                        help='Run on a single processor without MPI, for small domains and testing')
+    parser.add_argument('--cycle-group', type=int, default=0, help=argparse.SUPPRESS)
 
     # Process the input arguments into the program.
     args = parser.parse_args()
@@ -60,14 +65,33 @@ def main():
         err_handler.err_out_screen('Missing Python packages')
     except InterruptedError:
         err_handler.err_out_screen('External kill signal detected')
+    job_meta.cycle_group = args.cycle_group
 
-    # Initialize our MPI communication
-    mpi_meta = parallel.MpiConfig()
+    # Initialize our MPI communication, or the single-processor stand-in for serial runs.
+    if args.serial:
+        mpi_meta = parallel.LocalConfig()
+    else:
+        mpi_meta = parallel.MpiConfig()
     try:
         mpi_meta.initialize_comm(job_meta)
     except:
         err_handler.err_out_screen(job_meta.errMsg)
 
+    # The first cycle group spawns the other groups of concurrently processed forecast cycles.
+    cycle_group_comms = []
+    if job_meta.cycle_groups > 1 and job_meta.cycle_group == 0:
+        group_args = [arg for arg in [os.path.abspath(args.config_file), args.nwm_version, args.nwm_config]
+                      if arg is not None]
+        try:
+            cycle_group_comms = cycle_groups.spawn_groups(group_args, job_meta, mpi_meta)
+        except Exception:
+            err_handler.err_out_screen_para(job_meta.errMsg, mpi_meta)
+    if job_meta.cycle_groups > 1:
+        try:
+            cycle_groups.use_group_scratch(job_meta, mpi_meta)
+        except Exception:
+            err_handler.err_out_screen_para(job_meta.errMsg, mpi_meta)
+
     # ESMF.Manager(debug=True)
 
     # Initialize our WRF-Hydro geospatial object, which contains
@@ -101,6 +125,14 @@ def main():
         err_handler.err_out_screen_para(job_meta, mpi_meta)
     err_handler.check_program_status(job_meta, mpi_meta)
 
+    # Spawn the output servers (if requested), which write the output files asynchronously.
+    if job_meta.output_servers > 0:
+        try:
+            mpi_meta.io_servers = io_server.OutputServers(job_meta, WrfHydroGeoMeta, mpi_meta)
+        except Exception:
+            err_handler.err_out_screen_para(job_meta.errMsg, mpi_meta)
+    err_handler.check_program_status(job_meta, mpi_meta)
+
     # Next, initialize our input forcing classes. These objects will contain
     # information about our source products (I.E. data type, grid sizes, etc).
     # Information will be mapped via the options specified by the user.
@@ -134,6 +166,12 @@ def main():
     #    errMod.log_critical(jobMeta, mpiMeta)
     err_handler.check_program_status(job_meta, mpi_meta)
 
+    # Wait for the other cycle groups to finish, or let the first group know this one has.
+    if job_meta.cycle_group == 0:
+        cycle_groups.join_groups(cycle_group_comms, mpi_meta)
+    else:
+        cycle_groups.report_done(mpi_meta)
+
 
 if __name__ == "__main__":
     main()